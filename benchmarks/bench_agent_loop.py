@@ -0,0 +1,171 @@
+"""
+End-to-end agent-loop benchmark against a real MCP server and a scripted model.
+
+Runs ``--conversations`` concurrent ``CliChat`` conversations of ``--turns``
+turns each. The model is replaced by ``ScriptedOpenAITransport``, which
+answers after ``--llm-latency`` seconds: each turn mentions a document, reads
+two documents, edits one, then answers. Everything else (resource fetches,
+tool routing, MCP calls) runs for real against the document server, spawned
+on a free port unless ``--url`` is given. Run with:
+
+    uv run python benchmarks/bench_agent_loop.py --conversations 16 --turns 4
+
+Reports per-phase totals (``llm``, ``tool_routing``, ``tool_execution``,
+``resource_fetch``, ``history``), turn latency percentiles, and the mean time
+per turn spent outside the model, which is the client's own overhead.
+``--spans`` also writes every turn's timing spans as JSONL.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Optional
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from mcp_document_summary.client.mcp_client import MCPClient
+from mcp_document_summary.config import settings
+from mcp_document_summary.core.cli_chat import CliChat
+from mcp_document_summary.core.fake_openai import ScriptedOpenAITransport, scripted_conversation
+from mcp_document_summary.core.openai import OpenAIClient
+from mcp_document_summary.core.timing import PhaseTimer
+from mcp_document_summary.server.server import SAMPLE_DOCUMENTS
+
+DOC_IDS = sorted(SAMPLE_DOCUMENTS)
+
+SCRIPT = [
+    {"tool_calls": [
+        {"name": "read_documents_contents", "arguments": {"doc_id": DOC_IDS[0]}},
+        {"name": "read_documents_contents", "arguments": {"doc_id": DOC_IDS[1]}},
+    ]},
+    # Replacing a word with itself keeps the documents stable across conversations
+    {"tool_calls": [{"name": "edit_document", "arguments": {"doc_id": DOC_IDS[0], "old_str": "the", "new_str": "the"}}]},
+    {"content": "Both documents were read and the first one was updated."},
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    """Starts the document server over SSE on ``port``, with the in-memory sample documents."""
+    env = {**os.environ, "LOG_LEVEL": "WARNING"}
+    env.pop("DOCUMENT_STORE_PATH", None)
+    code = (
+        "from mcp_document_summary.server.server import mcp\n"
+        f"mcp.settings.port = {port}\n"
+        "mcp.run(transport='sse')\n"
+    )
+    return subprocess.Popen(
+        [sys.executable, "-c", code],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+async def run_conversation(chat: CliChat, index: int, turns: int, latencies: list[float]) -> None:
+    for turn in range(turns):
+        mention = DOC_IDS[(index + turn) % len(DOC_IDS)]
+        start = time.perf_counter()
+        await chat.run(f"What changed in @{mention} (conversation {index}, turn {turn})?")
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url: str, conversations: int, turns: int, llm_latency: float, spans_path: Optional[str] = None) -> dict:
+    transport = ScriptedOpenAITransport(scripted_conversation(SCRIPT), latency=llm_latency)
+    openai_service = OpenAIClient(model="scripted", api_key="benchmark", transport=transport)
+
+    client = MCPClient(url=url, max_retries=10, backoff_seconds=0.2, backoff_max_seconds=1.0)
+    previous_spans_path, settings.trace_spans_path = settings.trace_spans_path, spans_path
+    await client.connect()
+    try:
+        chats = [CliChat(doc_client=client, clients={"doc_client": client}, openai_service=openai_service) for _ in range(conversations)]
+        latencies: list[float] = []
+        start = time.perf_counter()
+        await asyncio.gather(*(run_conversation(chat, i, turns, latencies) for i, chat in enumerate(chats)))
+        wall = time.perf_counter() - start
+    finally:
+        await client.cleanup()
+        settings.trace_spans_path = previous_spans_path
+
+    timings = PhaseTimer()
+    for chat in chats:
+        timings.merge(chat.timings)
+    phases = timings.as_dict()
+    turn_count = len(latencies)
+    llm_seconds = timings.totals.get("llm", 0.0)
+
+    return {
+        "wall_seconds": round(wall, 4),
+        "turns": turn_count,
+        "turns_per_second": round(turn_count / wall, 2),
+        "model_calls": len(transport.requests),
+        "turn_latency_ms": {
+            "p50": round(percentile(latencies, 0.5) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "mean": round(statistics.mean(latencies) * 1000, 3),
+        },
+        "overhead_per_turn_ms": round((sum(latencies) - llm_seconds) / turn_count * 1000, 3),
+        "phases": phases,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=8, help="Conversations run concurrently")
+    parser.add_argument("--turns", type=int, default=4, help="Turns per conversation")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the scripted model takes per call")
+    parser.add_argument("--url", help="SSE URL of a running server (default: spawn one on a free port)")
+    parser.add_argument("--output", help="Write the results as JSON to this file (default: stdout)")
+    parser.add_argument("--spans", help="Append the timing spans of every turn to this JSONL file")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        server = start_server(port)
+        url = f"http://127.0.0.1:{port}/sse"
+
+    try:
+        results = asyncio.run(run(url, args.conversations, args.turns, args.llm_latency, args.spans))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report = {
+        "meta": {
+            "conversations": args.conversations,
+            "turns": args.turns,
+            "llm_latency_seconds": args.llm_latency,
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
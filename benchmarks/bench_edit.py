@@ -0,0 +1,133 @@
+"""
+Edit cost versus document size.
+
+Compares the old ``str.replace`` edit path against the piece-table buffer,
+then times whole edits as the server makes them: ``DocumentManager.apply_edits``
+and the ``edit_document`` tool, each over the in-memory store and the on-disk
+log store, so a change that makes edits write the whole document again shows
+up as a cost growing with the size. Run with:
+
+    uv run python benchmarks/bench_edit.py
+
+``--no-fsync`` leaves out the log store's fsync, which otherwise dominates
+small edits.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from mcp_document_summary.server import server
+from mcp_document_summary.server.documents import DocumentManager
+from mcp_document_summary.server.storage import DocumentStore, LogDocumentStore, MemoryDocumentStore
+from mcp_document_summary.server.text_buffer import PieceTable
+
+WORDS = ["load", "safety", "team", "review", "schedule", "design", "inspection", "risk"]
+
+
+def make_document(size: int) -> str:
+    rng = random.Random(size)
+    parts = []
+    total = 0
+    while total < size:
+        word = rng.choice(WORDS)
+        parts.append(word)
+        total += len(word) + 1
+    return " ".join(parts)[:size]
+
+
+def time_per_edit(fn, edits: int) -> float:
+    start = time.perf_counter()
+    for i in range(edits):
+        fn(i)
+    return (time.perf_counter() - start) / edits * 1e6
+
+
+def bench_store(store: DocumentStore, text: str, positions: list[int], edits: int) -> dict[str, float]:
+    """Per-edit time of ``DocumentManager.apply_edits`` and the ``edit_document`` tool over ``store``."""
+    store.put_many([("doc.md", text), ("marked.md", text[: len(text) // 2] + " MARKER " + text[len(text) // 2 :])])
+    docs = DocumentManager(store)
+
+    def manager_edit(i: int) -> None:
+        docs.apply_edits("doc.md", [(positions[i], 6, "edited")])
+
+    def tool_edit(i: int) -> None:
+        old, new = ("MARKER", "marker") if i % 2 == 0 else ("marker", "MARKER")
+        server.edit_document("marked.md", old, new)
+
+    original = server.DOCUMENTS
+    server.DOCUMENTS = docs
+    try:
+        docs.buffer("doc.md")  # load both buffers outside the timed loop
+        docs.buffer("marked.md")
+        return {"manager_us": time_per_edit(manager_edit, edits), "tool_us": time_per_edit(tool_edit, edits)}
+    finally:
+        server.DOCUMENTS = original
+        docs.close()
+
+
+def bench(size: int, edits: int, fsync: bool = True) -> dict[str, float]:
+    text = make_document(size)
+    rng = random.Random(0)
+    positions = [rng.randrange(0, size - 16) for _ in range(edits)]
+
+    # Old path: every edit rebuilds the whole string
+    state = {"text": text}
+
+    def string_edit(i: int) -> None:
+        pos = positions[i]
+        state["text"] = state["text"][:pos] + "edited" + state["text"][pos + 6 :]
+
+    buffer = PieceTable(text)
+
+    def piece_table_edit(i: int) -> None:
+        buffer.replace_range(positions[i], 6, "edited")
+
+    marker_text = text[: size // 2] + " MARKER " + text[size // 2 :]
+    marker_buffer = PieceTable(marker_text)
+
+    def piece_table_replace(i: int) -> None:
+        old, new = ("MARKER", "marker") if i % 2 == 0 else ("marker", "MARKER")
+        marker_buffer.replace_all(old, new)
+
+    result = {
+        "str_edit_us": time_per_edit(string_edit, edits),
+        "piece_table_edit_us": time_per_edit(piece_table_edit, edits),
+        "piece_table_replace_us": time_per_edit(piece_table_replace, edits),
+    }
+    for name, value in bench_store(MemoryDocumentStore(), text, positions, edits).items():
+        result[f"memory_{name}"] = value
+    with tempfile.TemporaryDirectory() as path:
+        for name, value in bench_store(LogDocumentStore(path, fsync=fsync), text, positions, edits).items():
+            result[f"log_{name}"] = value
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--no-fsync", action="store_true", help="Do not fsync the log store after each edit")
+    args = parser.parse_args()
+
+    columns = [
+        ("str edit", "str_edit_us"),
+        ("piece edit", "piece_table_edit_us"),
+        ("piece replace", "piece_table_replace_us"),
+        ("memory manager", "memory_manager_us"),
+        ("memory tool", "memory_tool_us"),
+        ("log manager", "log_manager_us"),
+        ("log tool", "log_tool_us"),
+    ]
+    print("Microseconds per edit")
+    print(f"{'size':>12}" + "".join(f" {label:>15}" for label, _key in columns))
+    for size in args.sizes:
+        result = bench(size, args.edits, fsync=not args.no_fsync)
+        print(f"{size:>12}" + "".join(f" {result[key]:>15.1f}" for _label, key in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Time to first prompt of the CLI, with the document server in process or spawned.
+
+Each run starts a fresh interpreter that goes through ``main.start`` (imports,
+server connection, tool and resource listing, CLI setup) and reports back as
+soon as the prompt could be shown. Run with:
+
+    uv run python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import asyncio, sys
+from contextlib import AsyncExitStack
+from mcp_document_summary.main import parse_args, start
+
+async def run():
+    async with AsyncExitStack() as stack:
+        cli = await start(parse_args(sys.argv[1:]), stack)
+        print("ready" if cli is not None else "failed", flush=True)
+
+asyncio.run(run())
+"""
+
+MODES = {
+    "in_process": [],
+    "spawn": ["--spawn"],
+}
+
+
+def time_to_prompt(args: list[str]) -> float:
+    env = {**os.environ, "LOG_LEVEL": "WARNING"}
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    start = time.perf_counter()
+    child = subprocess.Popen(
+        [sys.executable, "-c", CHILD, *args],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    line = child.stdout.readline().strip()
+    elapsed = time.perf_counter() - start
+    child.wait(timeout=30)
+    if line != "ready":
+        raise RuntimeError(f"CLI did not start with {args or 'default arguments'}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", choices=sorted(MODES), action="append", help="Modes to time (default: all)")
+    parser.add_argument("--output", help="Write the results as JSON to this file (default: stdout)")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.mode or MODES:
+        samples = [time_to_prompt(MODES[mode]) for _ in range(args.runs)]
+        results[mode] = {
+            "median_seconds": round(statistics.median(samples), 4),
+            "min_seconds": round(min(samples), 4),
+            "runs": len(samples),
+        }
+        print(f"{mode:<12} {results[mode]['median_seconds']:.3f} s", file=sys.stderr)
+
+    report = {
+        "meta": {"python": platform.python_version(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Microbenchmarks for the server tools and client helpers, with baseline comparison.
+
+Times ``read_document``, ``edit_document``, ``list_docs`` and ``fetch_doc``
+across corpus sizes and document sizes, ``UnifiedCompleter.get_completions``
+across resource counts, and ``convert_prompt_messages_to_message_params``.
+Results are written as JSON; with ``--baseline`` each result is compared to
+a stored run and the script exits non-zero if any got slower than the
+threshold. Run with:
+
+    uv run python benchmarks/bench_suite.py --output results.json --baseline benchmarks/baseline.json
+
+``--profile full`` adds the 1M-document corpus and the 100 MB document;
+``--save-baseline`` overwrites the baseline with this run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Iterator
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from mcp.types import Prompt, PromptArgument, PromptMessage, TextContent
+from prompt_toolkit.document import Document
+
+from mcp_document_summary.core.cli import UnifiedCompleter
+from mcp_document_summary.core.cli_chat import convert_prompt_messages_to_message_params
+from mcp_document_summary.server import server
+from mcp_document_summary.server.documents import DocumentManager
+from mcp_document_summary.server.storage import MemoryDocumentStore
+
+WORDS = ["load", "safety", "team", "review", "schedule", "design", "inspection", "risk"]
+
+PROFILES = {
+    "quick": {
+        "corpus_sizes": [10, 1_000, 100_000],
+        "doc_sizes": [1_000, 100_000, 10_000_000],
+        "resource_counts": [100, 10_000, 100_000],
+        "message_counts": [10, 1_000],
+    },
+    "full": {
+        "corpus_sizes": [10, 1_000, 100_000, 1_000_000],
+        "doc_sizes": [1_000, 100_000, 10_000_000, 100_000_000],
+        "resource_counts": [100, 10_000, 100_000, 1_000_000],
+        "message_counts": [10, 1_000, 10_000],
+    },
+}
+
+# Benchmark name -> zero-argument callable; the callable's setup has already run
+Case = tuple[str, Callable[[], object]]
+
+
+def make_text(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size:
+        word = rng.choice(WORDS)
+        parts.append(word)
+        total += len(word) + 1
+    return " ".join(parts)[:size]
+
+
+def use_corpus(documents: dict[str, str]) -> None:
+    """Points the server tools at a fresh document manager over ``documents``."""
+    server.DOCUMENTS = DocumentManager(MemoryDocumentStore(documents))
+
+
+def measure(fn: Callable[[], object], min_time: float, max_runs: int) -> dict:
+    """
+    Times ``fn`` in microseconds per call. Fast calls are batched so each
+    sample takes at least a millisecond; at least three samples are taken
+    and sampling continues until ``min_time`` has passed.
+    """
+    fn()  # warm-up: loads buffers, builds indexes
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= 1e-3 or number >= 100_000:
+            break
+        number *= 10
+
+    samples = [elapsed / number * 1e6]
+    deadline = time.perf_counter() + min_time
+    while len(samples) < 3 or (time.perf_counter() < deadline and len(samples) < max_runs):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "median_us": statistics.median(samples),
+        "min_us": min(samples),
+        "runs": len(samples),
+        "calls_per_run": number,
+    }
+
+
+# Cases
+
+
+def corpus_cases(corpus_size: int) -> Iterator[Case]:
+    use_corpus({f"doc_{i}.md": f"Document {i} about {WORDS[i % len(WORDS)]} and review." for i in range(corpus_size)})
+    target = f"doc_{corpus_size // 2}.md"
+    flip = {"word": "review"}
+
+    def edit():
+        old = flip["word"]
+        flip["word"] = "audit" if old == "review" else "review"
+        server.edit_document(target, old, flip["word"])
+
+    yield f"list_docs[corpus={corpus_size}]", server.list_docs
+    yield f"fetch_doc[corpus={corpus_size}]", lambda: server.fetch_doc(target)
+    yield f"read_document[corpus={corpus_size}]", lambda: server.read_document(target)
+    yield f"edit_document[corpus={corpus_size}]", edit
+
+
+def document_cases(doc_size: int) -> Iterator[Case]:
+    text = make_text(doc_size, seed=doc_size)
+    middle = doc_size // 2
+    text = text[:middle] + " MARKER " + text[middle:]
+    use_corpus({"large.md": text})
+    flip = {"word": "MARKER"}
+
+    def edit():
+        old = flip["word"]
+        flip["word"] = "marker" if old == "MARKER" else "MARKER"
+        server.edit_document("large.md", old, flip["word"])
+
+    def edit_then_read():
+        edit()
+        server.read_document("large.md")
+
+    yield f"fetch_doc[size={doc_size}]", lambda: server.fetch_doc("large.md")
+    yield f"read_document[size={doc_size}]", lambda: server.read_document("large.md")
+    yield f"edit_document[size={doc_size}]", edit
+    yield f"edit_then_read[size={doc_size}]", edit_then_read
+
+
+def completer_cases(resource_count: int) -> Iterator[Case]:
+    completer = UnifiedCompleter()
+    completer.update_prompts([
+        Prompt(name="format", description="Rewrite in markdown", arguments=[PromptArgument(name="doc_id", required=True)]),
+        Prompt(name="summarize", description="Summarize", arguments=[PromptArgument(name="doc_id", required=True)]),
+    ])
+    completer.update_resources([f"doc_{i}.md" for i in range(resource_count)])
+
+    for label, text in [
+        ("mention", f"compare @doc_{resource_count // 2}"),
+        ("mention_all", "compare @"),
+        ("command_arg", f"/summarize doc_{resource_count // 3}"),
+    ]:
+        document = Document(text)
+        yield (
+            f"get_completions[{label},resources={resource_count}]",
+            lambda document=document: list(completer.get_completions(document, None)),
+        )
+
+
+def message_cases(message_count: int) -> Iterator[Case]:
+    messages = [
+        PromptMessage(role="user" if i % 2 == 0 else "assistant", content=TextContent(type="text", text=f"message {i} " * 20))
+        for i in range(message_count)
+    ]
+    yield f"convert_prompt_messages[messages={message_count}]", lambda: convert_prompt_messages_to_message_params(messages)
+
+
+def run(profile: dict, min_time: float, max_runs: int, pattern: str) -> dict[str, dict]:
+    groups = [
+        *(corpus_cases(n) for n in profile["corpus_sizes"]),
+        *(document_cases(n) for n in profile["doc_sizes"]),
+        *(completer_cases(n) for n in profile["resource_counts"]),
+        *(message_cases(n) for n in profile["message_counts"]),
+    ]
+    original = server.DOCUMENTS
+    results = {}
+    try:
+        for group in groups:
+            for name, fn in group:
+                if pattern and pattern not in name:
+                    continue
+                results[name] = measure(fn, min_time, max_runs)
+                print(f"{name:<60} {results[name]['median_us']:>14.1f} us", file=sys.stderr)
+    finally:
+        server.DOCUMENTS = original
+    return results
+
+
+# Baseline comparison
+
+
+def compare(
+    results: dict[str, dict], baseline: dict[str, dict], threshold: float, min_delta_us: float
+) -> list[dict]:
+    """
+    Results whose median is more than ``threshold`` (a fraction) and more
+    than ``min_delta_us`` slower than the baseline. The absolute floor keeps
+    sub-microsecond timer noise from being reported.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratio = result["median_us"] / base["median_us"] if base["median_us"] else 1.0
+        if ratio > 1 + threshold and result["median_us"] - base["median_us"] > min_delta_us:
+            regressions.append({
+                "name": name,
+                "baseline_us": base["median_us"],
+                "median_us": result["median_us"],
+                "ratio": round(ratio, 2),
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds to spend on each benchmark")
+    parser.add_argument("--max-runs", type=int, default=1000)
+    parser.add_argument("--output", help="Write the results as JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Allowed slowdown before a result is a regression")
+    parser.add_argument("--min-delta-us", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run to --baseline instead of comparing")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "profile": args.profile,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": run(PROFILES[args.profile], args.min_time, args.max_runs, args.filter),
+    }
+
+    if args.baseline and not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        report["regressions"] = compare(report["results"], baseline, args.threshold, args.min_delta_us)
+
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+    if args.save_baseline and args.baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+
+    for regression in report.get("regressions", []):
+        print(
+            f"REGRESSION {regression['name']}: {regression['median_us']:.1f} us "
+            f"vs {regression['baseline_us']:.1f} us baseline ({regression['ratio']}x)",
+            file=sys.stderr,
+        )
+    sys.exit(1 if report.get("regressions") else 0)
+
+
+if __name__ == "__main__":
+    main()
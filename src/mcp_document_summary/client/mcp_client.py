@@ -1,84 +1,329 @@
 import sys
 import asyncio
-from typing import Optional, Any
-from contextlib import AsyncExitStack
+import inspect
+import time
+from typing import TYPE_CHECKING, Optional, Any, Awaitable, Callable, TypeVar
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import timedelta
+
+import anyio
+import httpx
 from mcp import ClientSession, StdioServerParameters, types
-from mcp.client.stdio import stdio_client
-from mcp.client.sse import sse_client
+from mcp.shared.exceptions import McpError
 
 import json
 from pydantic import AnyUrl
 
+from ..config import settings
+from ..logger import setup_logger
+from ..tracing import span
+
+if TYPE_CHECKING:
+    from mcp.server.fastmcp import FastMCP
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+# Errors that mean the connection is gone rather than that the request failed
+_DISCONNECT_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+    httpx.TransportError,
+)
+
+
+def _is_disconnect(error: BaseException) -> bool:
+    if isinstance(error, McpError):
+        return error.error.code == types.CONNECTION_CLOSED
+    return isinstance(error, _DISCONNECT_ERRORS)
+
+
+@asynccontextmanager
+async def memory_transport(server: "FastMCP"):
+    """
+    Streams to ``server`` running in this process on the caller's event loop,
+    with no subprocess or socket in between.
+    """
+    from mcp.shared.memory import create_client_server_memory_streams
+
+    lowlevel = server._mcp_server
+    async with create_client_server_memory_streams() as (client_streams, server_streams):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(lambda: lowlevel.run(*server_streams, lowlevel.create_initialization_options()))
+            try:
+                yield client_streams
+            finally:
+                tg.cancel_scope.cancel()
+
+
+class _Connection:
+    """
+    One session to the server, owned by a dedicated task.
+
+    The transport and session contexts are entered and exited by that task,
+    so connections can be opened concurrently and closed from anywhere.
+    """
+
+    def __init__(self, client: "MCPClient"):
+        self._client = client
+        self.session: Optional[ClientSession] = None
+        self.lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and not self._closing.is_set()
+
+    async def open(self) -> None:
+        ready = asyncio.get_running_loop().create_future()
+        self._closing = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready))
+        await ready
+
+    async def _run(self, ready: asyncio.Future) -> None:
+        try:
+            async with AsyncExitStack() as stack:
+                _read, _write = await stack.enter_async_context(self._client._transport())
+                session = await stack.enter_async_context(
+                    ClientSession(
+                        _read,
+                        _write,
+                        read_timeout_seconds=self._client._request_timeout,
+                        message_handler=self._handle_message,
+                    )
+                )
+                await session.initialize()
+                self.session = session
+                ready.set_result(None)
+                await self._closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.debug(f"Connection to {self._client.name} closed with an error: {e!r}")
+        finally:
+            self.session = None
+            if not ready.done():
+                ready.cancel()
+
+    async def _handle_message(self, message) -> None:
+        # Transports report a broken connection by passing the exception along
+        if isinstance(message, Exception):
+            logger.warning(f"Connection to {self._client.name} failed: {message!r}")
+            self.drop()
+            return
+        await self._client._handle_message(message)
+
+    def drop(self) -> None:
+        """Closes the session; requests still waiting on it fail with a connection error."""
+        self._closing.set()
+
+    async def close(self) -> None:
+        self.drop()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
 
 class MCPClient:
+    """
+    Client for one MCP server, over SSE (``url``), a spawned stdio process
+    (``command``) or in memory to a FastMCP server in this process (``server``).
+
+    Dropped connections are reopened on the next request, retrying with
+    exponential backoff. Requests that failed because the connection went
+    away are retried once on the new connection, except tool calls, which
+    may already have run on the server. For SSE servers, ``pool_size``
+    sessions can be opened and are used round-robin so independent requests
+    travel over separate connections.
+    """
+
     def __init__(
         self,
         command: str = None,
         args: list[str] = None,
         env: Optional[dict] = None,
         url: str = None,
+        server: Optional["FastMCP"] = None,
+        pool_size: int = 1,
+        max_retries: int = settings.mcp_connect_retries,
+        backoff_seconds: float = settings.mcp_backoff_seconds,
+        backoff_max_seconds: float = settings.mcp_backoff_max_seconds,
+        request_timeout_seconds: Optional[float] = settings.mcp_request_timeout_seconds,
     ):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        if pool_size > 1 and not (url or server):
+            # Every stdio connection spawns its own server process with its own state.
+            raise ValueError("A session pool is only supported for SSE and in-process servers")
+
         self._command = command
         self._args = args or []
         self._env = env
         self._url = url
-        self._session: Optional[ClientSession] = None
-        self._exit_stack: AsyncExitStack = AsyncExitStack()
+        self._server = server
+        self.name = url or (f"in-process {server.name}" if server else " ".join([command or ""] + self._args).strip())
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._request_timeout = (
+            timedelta(seconds=request_timeout_seconds) if request_timeout_seconds is not None else None
+        )
+        self._connections = [_Connection(self) for _ in range(pool_size)]
+        self._next = 0
+        self._connected = False
+        self._notification_handlers: list[Callable[[Any], Any]] = []
 
-    async def connect(self):
+        self.connect_seconds: Optional[float] = None
+        self.reconnects = 0
+
+    def add_notification_handler(self, handler: Callable[[Any], Any]) -> None:
+        """
+        Registers a callback (sync or async) for server notifications such as
+        ``ToolListChangedNotification`` or ``ResourceUpdatedNotification``.
+        """
+        self._notification_handlers.append(handler)
+
+    async def _handle_message(self, message) -> None:
+        if not isinstance(message, types.ServerNotification):
+            return
+        for handler in self._notification_handlers:
+            result = handler(message.root)
+            if inspect.isawaitable(result):
+                await result
+
+    def _transport(self):
+        """Returns an async context manager yielding the read and write streams of a new connection."""
+        # Transport modules are imported on use; only one of them is ever needed.
+        if self._server is not None:
+            return memory_transport(self._server)
         if self._url:
-            sse_transport = await self._exit_stack.enter_async_context(
-                sse_client(self._url)
-            )
-            _read, _write = sse_transport
-            self._session = await self._exit_stack.enter_async_context(
-                ClientSession(_read, _write)
-            )
-        elif self._command:
+            from mcp.client.sse import sse_client
+
+            return sse_client(self._url)
+        if self._command:
+            from mcp.client.stdio import stdio_client
+
             server_params = StdioServerParameters(
                 command=self._command,
                 args=self._args,
                 env=self._env,
             )
-            stdio_transport = await self._exit_stack.enter_async_context(
-                stdio_client(server_params)
-            )
-            _stdio, _write = stdio_transport
-            self._session = await self._exit_stack.enter_async_context(
-                ClientSession(_stdio, _write)
-            )
-        else:
-            raise ValueError("Either command or url must be provided")
-            
-        await self._session.initialize()
+            return stdio_client(server_params)
+        raise ValueError("One of command, url or server must be provided")
 
-    def session(self) -> ClientSession:
-        if self._session is None:
+    async def _open(self, connection: _Connection) -> None:
+        delay = self.backoff_seconds
+        for attempt in range(self.max_retries + 1):
+            try:
+                await connection.open()
+                return
+            except ValueError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise ConnectionError(
+                        f"Could not connect to {self.name} after {attempt + 1} attempts: {e}"
+                    ) from e
+                logger.warning(f"Connecting to {self.name} failed ({e!r}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.backoff_max_seconds)
+
+    async def connect(self):
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(self._open(connection) for connection in self._connections))
+        except BaseException:
+            await self.cleanup()
+            raise
+        self._connected = True
+        self.connect_seconds = time.perf_counter() - start
+        logger.info(
+            f"Connected to {self.name} in {self.connect_seconds:.2f}s "
+            f"({len(self._connections)} session{'s' if len(self._connections) > 1 else ''})"
+        )
+
+    async def _reconnect(self, connection: _Connection) -> None:
+        async with connection.lock:
+            if connection.alive:
+                return
+            await connection.close()
+            await self._open(connection)
+            self.reconnects += 1
+            logger.warning(f"Reconnected to {self.name} ({self.reconnects} reconnects so far)")
+
+    async def _connection(self) -> _Connection:
+        if not self._connected:
             raise ConnectionError(
                 "Client session not initialized or cache not populated. Call connect_to_server first."
             )
-        return self._session
+        connection = self._connections[self._next % len(self._connections)]
+        self._next += 1
+        if not connection.alive:
+            await self._reconnect(connection)
+        return connection
+
+    async def _request(self, operation: Callable[[ClientSession], Awaitable[T]], retry: bool = True) -> T:
+        connection = await self._connection()
+        try:
+            return await operation(connection.session)
+        except Exception as e:
+            if not _is_disconnect(e):
+                raise
+            logger.warning(f"Lost connection to {self.name} during a request: {e!r}")
+            connection.drop()
+            if not retry:
+                raise
 
+        await self._reconnect(connection)
+        return await operation(connection.session)
+
+    def session(self) -> ClientSession:
+        for _ in range(len(self._connections)):
+            connection = self._connections[self._next % len(self._connections)]
+            self._next += 1
+            if connection.alive:
+                return connection.session
+        raise ConnectionError(
+            "Client session not initialized or cache not populated. Call connect_to_server first."
+        )
+
+    def stats(self) -> dict:
+        return {
+            "connect_seconds": self.connect_seconds,
+            "reconnects": self.reconnects,
+            "sessions": len(self._connections),
+        }
 
     async def list_tools(self) -> list[types.Tool]:
-        result = await self.session().list_tools()
+        with span("list_tools", server=self.name):
+            result = await self._request(lambda session: session.list_tools())
         return result.tools
 
     async def call_tool(
         self, tool_name: str, tool_input
     ) -> types.CallToolResult | None:
-        return await self.session().call_tool(tool_name, tool_input)
+        # Not retried: the call may have run before the connection dropped.
+        with span("call_tool", server=self.name, tool=tool_name):
+            return await self._request(lambda session: session.call_tool(tool_name, tool_input), retry=False)
 
     async def list_prompts(self) -> list[types.Prompt]:
-        result = await self.session().list_prompts()
+        with span("list_prompts", server=self.name):
+            result = await self._request(lambda session: session.list_prompts())
         return result.prompts
 
     async def get_prompt(self, prompt_name, args: dict[str, str]):
-        result = await self.session().get_prompt(prompt_name, args)
+        with span("get_prompt", server=self.name, prompt=prompt_name):
+            result = await self._request(lambda session: session.get_prompt(prompt_name, args))
         return result.messages
 
     async def read_resource(self, uri: str) -> Any:
-        result = await self.session().read_resource(AnyUrl(uri))
+        with span("read_resource", server=self.name, uri=uri):
+            result = await self._request(lambda session: session.read_resource(AnyUrl(uri)))
         resource = result.contents[0]
 
         if isinstance(resource, types.TextResourceContents):
@@ -87,9 +332,15 @@ class MCPClient:
 
             return resource.text
 
+    async def subscribe_resource(self, uri: str) -> None:
+        await self._request(lambda session: session.subscribe_resource(AnyUrl(uri)))
+
+    async def unsubscribe_resource(self, uri: str) -> None:
+        await self._request(lambda session: session.unsubscribe_resource(AnyUrl(uri)))
+
     async def cleanup(self):
-        await self._exit_stack.aclose()
-        self._session = None
+        self._connected = False
+        await asyncio.gather(*(connection.close() for connection in self._connections))
 
     async def __aenter__(self):
         await self.connect()
@@ -0,0 +1,127 @@
+import json
+from collections import OrderedDict
+from typing import Any, Optional
+
+from mcp import types
+from mcp.shared.exceptions import McpError
+
+from ..logger import setup_logger
+from .mcp_client import MCPClient
+
+logger = setup_logger(__name__)
+
+
+def _size_of(value: Any) -> int:
+    """Approximate memory taken by a cached value, in bytes of its text or JSON."""
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+class ResourceCache:
+    """
+    Client-side cache of resource contents keyed by URI.
+
+    The first read of a URI subscribes to it and then fetches it; later reads
+    are answered locally until the server sends ``resources/updated`` for the
+    URI. Every invalidation bumps the URI's version, and a fetch that started
+    before the latest invalidation is returned but not stored, so a stale
+    read never lands in the cache. Subscriptions do not survive a reconnect,
+    so the cache starts over after one. Servers that reject subscriptions
+    are read through without caching.
+
+    Contents are kept in an LRU bounded by ``max_bytes``; a resource larger
+    than the whole budget is returned but not kept.
+    """
+
+    def __init__(self, client: MCPClient, max_bytes: int = 32 * 1024 * 1024):
+        self.client = client
+        self.max_bytes = max_bytes
+        # URI -> (size, contents), least recently used first
+        self._entries: OrderedDict[str, tuple[int, Any]] = OrderedDict()
+        self._size = 0
+        self._versions: dict[str, int] = {}
+        self._subscribed: set[str] = set()
+        self._supported: Optional[bool] = None
+        self._reconnects = client.reconnects
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+        client.add_notification_handler(self._handle_notification)
+
+    def _handle_notification(self, notification) -> None:
+        if isinstance(notification, types.ResourceUpdatedNotification):
+            self.invalidate(str(notification.params.uri))
+        elif isinstance(notification, types.ResourceListChangedNotification):
+            self.clear()
+
+    def __contains__(self, uri: str) -> bool:
+        """Whether the contents of ``uri`` are cached, and so known to be current."""
+        return uri in self._entries
+
+    def version(self, uri: str) -> int:
+        """Number of times ``uri`` has been invalidated."""
+        return self._versions.get(uri, 0)
+
+    def invalidate(self, uri: str) -> None:
+        self._versions[uri] = self.version(uri) + 1
+        entry = self._entries.pop(uri, None)
+        if entry is not None:
+            self._size -= entry[0]
+            self.stats["invalidations"] += 1
+
+    def _remember(self, uri: str, value: Any) -> None:
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        self._entries[uri] = (size, value)
+        self._size += size
+        while self._size > self.max_bytes:
+            _uri, (evicted, _value) = self._entries.popitem(last=False)
+            self._size -= evicted
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        for uri in list(self._entries):
+            self.invalidate(uri)
+
+    async def _subscribe(self, uri: str) -> bool:
+        if self._supported is False:
+            return False
+        if uri in self._subscribed:
+            return True
+        try:
+            await self.client.subscribe_resource(uri)
+        except McpError as e:
+            logger.info(f"Server does not support resource subscriptions; not caching resources: {e}")
+            self._supported = False
+            return False
+        self._supported = True
+        self._subscribed.add(uri)
+        return True
+
+    def _check_reconnect(self) -> None:
+        if self.client.reconnects != self._reconnects:
+            self._reconnects = self.client.reconnects
+            self._subscribed.clear()
+            self.clear()
+
+    async def watch(self, uri: str) -> bool:
+        """Subscribes to ``uri`` without reading it, so the client hears of changes; False if unsupported."""
+        self._check_reconnect()
+        return await self._subscribe(uri)
+
+    async def read(self, uri: str) -> Any:
+        """Returns the contents of ``uri`` (parsed JSON or text), from the cache when it is current."""
+        self._check_reconnect()
+
+        if uri in self._entries:
+            self.stats["hits"] += 1
+            self._entries.move_to_end(uri)
+            return self._entries[uri][1]
+
+        self.stats["misses"] += 1
+        # Subscribe before reading so an update right after the read is not missed.
+        subscribed = await self._subscribe(uri)
+        version = self.version(uri)
+        value = await self.client.read_resource(uri)
+        if subscribed and version == self.version(uri):
+            self._remember(uri, value)
+        return value
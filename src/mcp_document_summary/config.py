@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -5,6 +7,87 @@ class Settings(BaseSettings):
     openai_model_name: str = "gpt-4o"
     log_level: str = "INFO"
 
+    # OpenAI HTTP client
+    openai_timeout_seconds: float = 120.0
+    openai_connect_timeout_seconds: float = 10.0
+    openai_max_connections: int = 20
+
+    # Document store: in-memory when no path is set, otherwise an on-disk log directory
+    document_store_path: Optional[str] = None
+    document_store_segment_mb: int = 64
+    # Share of the on-disk log taken by superseded records that triggers a background compaction; above 1 to never compact
+    document_store_compact_ratio: Optional[float] = 0.5
+    # Edit history kept per document for undo, revert and reads of earlier versions
+    document_history_max_revisions: int = 1000
+    document_history_checkpoint_interval: int = 16
+
+    # Corpus-wide find/replace: worker processes (default: one per CPU) and the corpus size, in MiB of
+    # stored UTF-8 text, that uses them
+    corpus_replace_workers: Optional[int] = None
+    corpus_replace_parallel_mb: float = 16.0
+
+    # Bulk import of files: worker processes (default: one per CPU), the directory the ingest tool may
+    # read from (default: none, which disables the tool) and the manifest of ingested file hashes
+    # (default: next to the on-disk document store)
+    ingest_workers: Optional[int] = None
+    ingest_root: Optional[str] = None
+    ingest_manifest_path: Optional[str] = None
+
+    # MCP server connections: retries with exponential backoff, and sessions per SSE server
+    mcp_connect_retries: int = 3
+    mcp_backoff_seconds: float = 0.5
+    mcp_backoff_max_seconds: float = 10.0
+    mcp_request_timeout_seconds: Optional[float] = None
+    mcp_pool_size: int = 1
+
+    # Memory for document contents the client caches between server change notifications
+    resource_cache_max_mb: int = 32
+    # How long the client trusts its cached tool list without a list_changed notification
+    tool_catalog_ttl_seconds: Optional[float] = 300.0
+    # Parallel tool calls from one model response that may run at the same time
+    tool_max_concurrency: int = 8
+
+    # Append per-turn timing spans (LLM calls, tool calls, resource reads) to this JSONL file
+    trace_spans_path: Optional[str] = None
+
+    # Profile chat turns and server requests: "deterministic" (cProfile) or "sampling"; unset to disable
+    profile_mode: Optional[str] = None
+    profile_dir: str = "profiles"
+    # Only turns or requests at least this slow are written out
+    profile_threshold_ms: float = 0.0
+    profile_interval_ms: float = 5.0
+
+    # Token budget for each request, including the system prompt and tool schemas; unset to never compact
+    history_max_tokens: Optional[int] = 32000
+    # Most recent turns that compaction leaves untouched
+    history_keep_turns: int = 2
+    # Compaction steps, applied in order until the history fits; "summarize" costs an extra LLM call
+    history_policies: list[str] = ["tool_outputs", "documents"]
+    # Token budget for the transcript of old turns sent to be summarized; unset to use history_max_tokens
+    history_summary_max_tokens: Optional[int] = None
+
+    # Token budget for documents mentioned with @ in a query; larger ones are cut to their most relevant chunks
+    context_max_tokens: Optional[int] = 6000
+    context_chunk_tokens: int = 400
+
+    # Also complete document IDs that contain the typed text anywhere, after the prefix matches
+    completion_fuzzy: bool = False
+    # Document IDs loaded for completion at startup; beyond that, completions are fetched per typed prefix
+    completion_preload: int = 10000
+
+    # Map-reduce summarization of long documents
+    summary_chunk_tokens: int = 3000
+    summary_fan_out: int = 4
+    summary_reduce_group: int = 8
+
+    # Opt-in cache of chat completions; only temperature 0 requests unless nondeterministic caching is allowed
+    llm_cache_enabled: bool = False
+    llm_cache_dir: Optional[str] = None
+    llm_cache_max_mb: int = 64
+    llm_cache_disk_max_mb: int = 512
+    llm_cache_ttl_seconds: Optional[float] = None
+    llm_cache_nondeterministic: bool = False
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
 settings = Settings()
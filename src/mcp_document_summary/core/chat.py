@@ -1,31 +1,73 @@
+import uuid
+from contextlib import nullcontext
+
 from .openai import OpenAIClient
 from ..client.mcp_client import MCPClient
-from .tools import ToolManager
-from typing import List, Dict, Any
+from ..config import settings
+from ..logger import setup_logger
+from ..profiling import Profiler
+from ..tracing import Trace, trace_turn
+from .history import HistoryManager
+from .timing import PhaseTimer
+from .tools import ToolCatalog, ToolManager
+from typing import List, Dict, Any, Optional
+
+logger = setup_logger(__name__)
 
 class Chat:
     def __init__(self, openai_service: OpenAIClient, clients: dict[str, MCPClient]):
         self.openai_service: OpenAIClient = openai_service
         self.clients: dict[str, MCPClient] = clients
         self.messages: List[Dict[str, Any]] = []
+        self.tool_catalog = ToolCatalog(clients, ttl=settings.tool_catalog_ttl_seconds)
+        self.history = HistoryManager(
+            max_tokens=settings.history_max_tokens,
+            keep_turns=settings.history_keep_turns,
+            policies=settings.history_policies,
+            openai_service=openai_service,
+            summary_max_tokens=settings.history_summary_max_tokens,
+        )
+        # Time spent per phase across every turn of this conversation
+        self.timings = PhaseTimer()
+        # Timing spans of each turn; also appended to settings.trace_spans_path when set
+        self.conversation_id = uuid.uuid4().hex[:12]
+        self.turns = 0
+        self.last_trace: Optional[Trace] = None
+        # Set to profile each turn; slow turns are written to the profiler's directory
+        self.profiler: Optional[Profiler] = None
 
     async def _process_query(self, query: str):
         self.messages.append({"role": "user", "content": query})
 
     async def run(self, query: str) -> str:
+        self.turns += 1
+        profile = self.profiler.profile(f"turn-{self.conversation_id}-{self.turns}") if self.profiler else nullcontext()
+        with trace_turn(self.conversation_id, self.turns) as trace, profile:
+            try:
+                return await self._turn(query)
+            finally:
+                self.last_trace = trace
+                if settings.trace_spans_path:
+                    trace.write_jsonl(settings.trace_spans_path)
+
+    async def _turn(self, query: str) -> str:
         final_text_response = ""
 
         await self._process_query(query)
 
         while True:
             # 1. Get available tools
-            tools = await ToolManager.get_all_tools(self.clients)
+            with self.timings.phase("tool_routing"):
+                tools = await ToolManager.get_all_tools(self.tool_catalog)
             
-            # 2. Call OpenAI
-            response = self.openai_service.chat(
-                messages=self.messages,
-                tools=tools if tools else None,
-            )
+            # 2. Call OpenAI with the history trimmed to its token budget
+            with self.timings.phase("history"):
+                await self.history.compact(self.messages, tools=tools)
+            with self.timings.phase("llm"):
+                response = await self.openai_service.achat(
+                    messages=self.messages,
+                    tools=tools if tools else None,
+                )
 
             # 3. Add Assistant Response to History (Includes tool_calls if any)
             self.openai_service.add_assistant_message(self.messages, response)
@@ -34,11 +76,14 @@ class Chat:
 
             # 4. Check if the model wants to call tools
             if finish_reason == "tool_calls":
-                print(f"DEBUG: Tool calls requested...")
+                logger.debug(f"Model requested {len(response.choices[0].message.tool_calls or [])} tool call(s)")
                 
                 # Execute tools
                 tool_result_messages = await ToolManager.execute_tool_requests(
-                    self.clients, response
+                    self.tool_catalog,
+                    response,
+                    max_concurrency=settings.tool_max_concurrency,
+                    timings=self.timings,
                 )
 
                 # Add tool results to history
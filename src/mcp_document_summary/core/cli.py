@@ -1,4 +1,7 @@
-from typing import List, Optional
+import asyncio
+import concurrent.futures
+import threading
+from typing import Callable, List, Optional
 from prompt_toolkit import PromptSession
 from prompt_toolkit.completion import Completer, Completion
 from prompt_toolkit.key_binding import KeyBindings
@@ -8,7 +11,11 @@ from prompt_toolkit.auto_suggest import AutoSuggest, Suggestion
 from prompt_toolkit.document import Document
 from prompt_toolkit.buffer import Buffer
 
+from mcp import types
+
 from .cli_chat import CliChat
+from .completion import PrefixIndex
+from ..config import settings
 
 
 class CommandAutoSuggest(AutoSuggest):
@@ -37,17 +44,63 @@ class CommandAutoSuggest(AutoSuggest):
 
 
 class UnifiedCompleter(Completer):
-    def __init__(self):
+    # Completions offered at once; type more of the ID to narrow them down
+    MAX_COMPLETIONS = 100
+
+    def __init__(self, fuzzy: bool = False, fetch: Optional[Callable[[str], tuple[list[str], bool]]] = None):
         self.prompts = []
         self.prompt_dict = {}
-        self.resources = []
+        self.fuzzy = fuzzy
+        self.index = PrefixIndex()
+        # Completions run on prompt_toolkit's thread and refreshes on the event loop; both take this lock
+        self._lock = threading.Lock()
+        # For corpora too large to load up front: fetch(prefix) returns IDs starting with prefix from
+        # the server and whether those are all of them
+        self.fetch = fetch
+        self.complete = True
+        self._fetched: set[str] = set()
+
+    @property
+    def resources(self) -> list[str]:
+        with self._lock:
+            return list(self.index)
 
     def update_prompts(self, prompts: List):
         self.prompts = prompts
         self.prompt_dict = {prompt.name: prompt for prompt in prompts}
 
-    def update_resources(self, resources: List):
-        self.resources = resources
+    def update_resources(self, resources: List, complete: bool = True):
+        """Replaces the known IDs; ``complete`` is False when they are only the first of the documents."""
+        with self._lock:
+            self.index.update(resources)
+            self.complete = complete
+            self._fetched.clear()
+
+    def _fetch_prefix(self, prefix: str) -> None:
+        prefix = prefix.lower()
+        if self.complete or self.fetch is None or any(prefix.startswith(done) for done in self._fetched):
+            return
+        try:
+            ids, complete = self.fetch(prefix)
+        except Exception:
+            return
+        with self._lock:
+            for resource_id in ids:
+                self.index.add(resource_id)
+            if complete:
+                self._fetched.add(prefix)
+
+    def _resource_completions(self, prefix: str, display_meta: Optional[str] = None):
+        self._fetch_prefix(prefix)
+        with self._lock:
+            matches = self.index.complete(prefix, self.MAX_COMPLETIONS, self.fuzzy)
+        for resource_id in matches:
+            yield Completion(
+                resource_id,
+                start_position=-len(prefix),
+                display=resource_id,
+                display_meta=display_meta,
+            )
 
     def get_completions(self, document, complete_event):
         text = document.text
@@ -57,14 +110,7 @@ class UnifiedCompleter(Completer):
             last_at_pos = text_before_cursor.rfind("@")
             prefix = text_before_cursor[last_at_pos + 1 :]
 
-            for resource_id in self.resources:
-                if resource_id.lower().startswith(prefix.lower()):
-                    yield Completion(
-                        resource_id,
-                        start_position=-len(prefix),
-                        display=resource_id,
-                        display_meta="Resource",
-                    )
+            yield from self._resource_completions(prefix, "Resource")
             return
 
         if text.startswith("/"):
@@ -87,36 +133,29 @@ class UnifiedCompleter(Completer):
                 cmd = parts[0]
 
                 if cmd in self.prompt_dict:
-                    for id in self.resources:
-                        yield Completion(
-                            id,
-                            start_position=0,
-                            display=id,
-                        )
+                    yield from self._resource_completions("")
                 return
 
             if len(parts) >= 2:
-                doc_prefix = parts[-1]
-
-                for resource in self.resources:
-                    if "id" in resource and resource["id"].lower().startswith(
-                        doc_prefix.lower()
-                    ):
-                        yield Completion(
-                            resource["id"],
-                            start_position=-len(doc_prefix),
-                            display=resource["id"],
-                        )
+                yield from self._resource_completions(parts[-1])
                 return
 
 
 class CliApp:
+    # Seconds a completion waits for the server before showing the IDs already known
+    FETCH_TIMEOUT = 0.3
+
     def __init__(self, agent: CliChat):
         self.agent = agent
         self.resources = []
         self.prompts = []
 
-        self.completer = UnifiedCompleter()
+        self.completer = UnifiedCompleter(fuzzy=settings.completion_fuzzy, fetch=self._fetch_ids)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresh: Optional[asyncio.Task] = None
+        self._refresh_again = False
+        # Keep the completions current as documents are added, e.g. by an ingest
+        agent.doc_client.add_notification_handler(self._handle_notification)
 
         self.command_autosuggester = CommandAutoSuggest([])
 
@@ -177,13 +216,56 @@ class CliApp:
         )
 
     async def initialize(self):
-        await self.refresh_resources()
-        await self.refresh_prompts()
+        self._loop = asyncio.get_running_loop()
+        await asyncio.gather(self.refresh_resources(), self.refresh_prompts())
+
+    def _handle_notification(self, notification) -> None:
+        if isinstance(notification, types.ResourceListChangedNotification) or (
+            isinstance(notification, types.ResourceUpdatedNotification)
+            and str(notification.params.uri) == "docs://documents"
+        ):
+            if self._refresh is not None and not self._refresh.done():
+                # Changes often come in bursts; read the list once more after the current read
+                self._refresh_again = True
+                return
+            self._refresh = asyncio.get_running_loop().create_task(self._refresh_until_current())
+
+    async def _refresh_until_current(self):
+        self._refresh_again = True
+        while self._refresh_again:
+            self._refresh_again = False
+            await self.refresh_resources()
+
+    def _fetch_ids(self, prefix: str) -> tuple[list[str], bool]:
+        """Runs on the completion thread: asks the server for the IDs starting with ``prefix``."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            # On the event loop thread, which cannot wait for its own request
+            return [], False
+        if self._loop is None:
+            return [], False
+
+        future = asyncio.run_coroutine_threadsafe(
+            self.agent.list_docs_page(prefix=prefix, limit=UnifiedCompleter.MAX_COMPLETIONS), self._loop
+        )
+        try:
+            page = future.result(timeout=self.FETCH_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            # Not marked as fetched, so the next keystroke asks again
+            future.cancel()
+            return [], False
+        return [entry["id"] for entry in page["documents"]], page["next_cursor"] is None
 
     async def refresh_resources(self):
         try:
-            self.resources = await self.agent.list_docs_ids()
-            self.completer.update_resources(self.resources)
+            # Large corpora are not loaded whole; the completer asks for more as the user types
+            limit = settings.completion_preload
+            ids = await self.agent.list_docs_ids(limit=limit + 1)
+            self.resources = ids[:limit]
+            self.completer.update_resources(self.resources, complete=len(ids) <= limit)
         except Exception as e:
             print(f"Error refreshing resources: {e}")
 
@@ -1,13 +1,29 @@
-from typing import List, Tuple
-from mcp.types import Prompt, PromptMessage, EmbeddedResource
-# Updated Import for OpenAI Types
-from openai.types.chat import ChatCompletionMessageParam
+from __future__ import annotations
 
-from openai.types.chat import ChatCompletionMessageParam
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+from mcp.shared.exceptions import McpError
+from mcp.types import Prompt, PromptArgument, PromptMessage, EmbeddedResource
 
 from .chat import Chat
 from .openai import OpenAIClient
+from .retrieval import ContextPacker
+from .summarize import SummaryPipeline
 from ..client.mcp_client import MCPClient
+from ..client.resource_cache import ResourceCache
+from ..config import settings
+from ..tracing import span
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionMessageParam
+
+# Handled locally with the map-reduce pipeline instead of a server prompt
+SUMMARIZE_PROMPT = Prompt(
+    name="summarize",
+    description="Summarizes a document of any length.",
+    arguments=[PromptArgument(name="doc_id", description="ID of the document to summarize", required=True)],
+)
 
 
 class CliChat(Chat):
@@ -19,15 +35,70 @@ class CliChat(Chat):
     ):
         super().__init__(clients=clients, openai_service=openai_service)
         self.doc_client: MCPClient = doc_client
+        # Document list and contents, refreshed only when the server reports a change
+        self.resources = ResourceCache(doc_client, max_bytes=settings.resource_cache_max_mb * 1024 * 1024)
+        self.summarizer = SummaryPipeline(
+            openai_service,
+            chunk_tokens=settings.summary_chunk_tokens,
+            fan_out=settings.summary_fan_out,
+            reduce_group=settings.summary_reduce_group,
+        )
+        # Mentioned documents over the budget are cut down to the chunks most relevant to the query
+        self.context = ContextPacker(
+            max_tokens=settings.context_max_tokens,
+            chunk_tokens=settings.context_chunk_tokens,
+        )
 
     async def list_prompts(self) -> list[Prompt]:
-        return await self.doc_client.list_prompts()
-
-    async def list_docs_ids(self) -> list[str]:
-        return await self.doc_client.read_resource("docs://documents")
+        prompts = await self.doc_client.list_prompts()
+        if not any(prompt.name == SUMMARIZE_PROMPT.name for prompt in prompts):
+            prompts.append(SUMMARIZE_PROMPT)
+        return prompts
+
+    async def list_docs_page(
+        self, prefix: str = "", glob: Optional[str] = None, cursor: Optional[str] = None, limit: int = 100
+    ) -> dict:
+        """One page of the document listing: ``{"documents": [...], "next_cursor": ...}``."""
+        params = {"limit": limit, "prefix": prefix, "glob": glob, "cursor": cursor}
+        query = urlencode({name: value for name, value in params.items() if value not in (None, "")})
+        return await self.doc_client.read_resource(f"docs://documents/page/{quote(query, safe='')}")
+
+    async def iter_docs(
+        self, prefix: str = "", glob: Optional[str] = None, page_size: int = 100
+    ) -> AsyncIterator[dict]:
+        """Listing entries (ID, size, version, last modified), fetched a page at a time as they are consumed."""
+        cursor = None
+        while True:
+            page = await self.list_docs_page(prefix, glob, cursor, page_size)
+            for entry in page["documents"]:
+                yield entry
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+
+    async def list_docs_ids(self, limit: Optional[int] = None) -> list[str]:
+        """Document IDs in listing order, at most ``limit`` of them."""
+        # Updates to docs://documents announce changes to the list
+        await self.resources.watch("docs://documents")
+        ids = []
+        page_size = min(limit, 1000) if limit is not None else 1000
+        async for entry in self.iter_docs(page_size=page_size):
+            if limit is not None and len(ids) >= limit:
+                break
+            ids.append(entry["id"])
+        return ids
 
     async def get_doc_content(self, doc_id: str) -> str:
-        return await self.doc_client.read_resource(f"docs://documents/{doc_id}")
+        return await self.resources.read(f"docs://documents/{quote(doc_id, safe='')}")
+
+    async def _find_doc(self, doc_id: str) -> Optional[str]:
+        """Returns the document's contents, or None when the server has no such document."""
+        try:
+            return await self.get_doc_content(doc_id)
+        except McpError as e:
+            if "not found" in e.error.message:
+                return None
+            raise
 
     async def get_prompt(
         self, command: str, doc_id: str
@@ -37,18 +108,15 @@ class CliChat(Chat):
     async def _extract_resources(self, query: str) -> str:
         mentions = [word[1:] for word in query.split() if word.startswith("@")]
 
-        doc_ids = await self.list_docs_ids()
-        mentioned_docs: list[Tuple[str, str]] = []
+        # Fetch every mentioned document at once; cached ones cost no round trip and unknown IDs are skipped.
+        mentions = list(dict.fromkeys(mentions))
+        contents = await asyncio.gather(*(self._find_doc(doc_id) for doc_id in mentions))
+        mentioned_docs: list[Tuple[str, str]] = [
+            (doc_id, content) for doc_id, content in zip(mentions, contents) if content is not None
+        ]
 
-        for doc_id in doc_ids:
-            if doc_id in mentions:
-                content = await self.get_doc_content(doc_id)
-                mentioned_docs.append((doc_id, content))
-
-        return "".join(
-            f'\n<document id="{doc_id}">\n{content}\n</document>\n'
-            for doc_id, content in mentioned_docs
-        )
+        with span("context_pack", documents=len(mentioned_docs)):
+            return self.context.pack(query, mentioned_docs)
 
     async def _process_command(self, query: str) -> bool:
         if not query.startswith("/"):
@@ -68,11 +136,31 @@ class CliChat(Chat):
         self.messages += convert_prompt_messages_to_message_params(messages)
         return True
 
+    async def _turn(self, query: str) -> str:
+        words = query.split()
+        if len(words) >= 2 and words[0] == f"/{SUMMARIZE_PROMPT.name}":
+            return await self._summarize(words[1])
+
+        return await super()._turn(query)
+
+    async def _summarize(self, doc_id: str) -> str:
+        with self.timings.phase("resource_fetch"):
+            content = await self._find_doc(doc_id)
+            if content is None:
+                return f"Doc with id {doc_id} not found. Type '/summarize ' to pick one of the documents."
+        with self.timings.phase("llm"):
+            summary = await self.summarizer.summarize(content, doc_id=doc_id)
+
+        self.messages.append({"role": "user", "content": f"Summarize the document {doc_id}."})
+        self.messages.append({"role": "assistant", "content": summary})
+        return summary
+
     async def _process_query(self, query: str):
         if await self._process_command(query):
             return
 
-        added_resources = await self._extract_resources(query)
+        with self.timings.phase("resource_fetch"):
+            added_resources = await self._extract_resources(query)
 
         prompt = f"""
         The user has a question:
@@ -88,6 +176,8 @@ class CliChat(Chat):
         Note the user's query might contain references to documents like "@report.docx". The "@" is only
         included as a way of mentioning the doc. The actual name of the document would be "report.docx".
         If the document content is included in this prompt, you don't need to use an additional tool to read the document.
+        A document with an "excerpt" attribute holds only the parts most relevant to the query, with [...] marking
+        skipped text; use a tool to read other parts if you need them.
         Answer the user's question directly and concisely. Start with the exact information they need. 
         Don't refer to or mention the provided context in any way - just use it to inform your answer.
         """
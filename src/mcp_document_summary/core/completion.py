@@ -0,0 +1,111 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, Iterator
+
+
+class PrefixIndex:
+    """
+    Case-insensitive prefix and fuzzy lookup over a large set of IDs.
+
+    IDs are kept sorted by their lowercased form, so the IDs starting with a
+    prefix are one contiguous run found by binary search; a lookup costs
+    ``O(log n)`` plus the results returned, however many IDs there are. IDs
+    can be added and removed one at a time, and ``update`` applies only the
+    difference to a new set of IDs.
+
+    Fuzzy lookup also matches IDs that contain the query anywhere (``q1``
+    matches ``reports/q1.md``). It searches all lowercased IDs joined into
+    one string, rebuilt after the IDs change, with ``str.find``, and stops
+    as soon as it has enough results; when few IDs match it scans them all,
+    which takes a few milliseconds per 100k IDs.
+    """
+
+    def __init__(self, ids: Iterable[str] = ()):
+        self._keys: list[tuple[str, str]] = []
+        self._ids: set[str] = set()
+        self._joined = ""
+        self._starts: list[int] = []
+        self._stale = True
+        self.update(ids)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return (doc_id for _key, doc_id in self._keys)
+
+    def add(self, doc_id: str) -> None:
+        if doc_id not in self._ids:
+            self._ids.add(doc_id)
+            insort(self._keys, (doc_id.lower(), doc_id))
+            self._stale = True
+
+    def remove(self, doc_id: str) -> None:
+        if doc_id in self._ids:
+            self._ids.discard(doc_id)
+            del self._keys[bisect_left(self._keys, (doc_id.lower(), doc_id))]
+            self._stale = True
+
+    def update(self, ids: Iterable[str]) -> None:
+        """Makes the index hold exactly ``ids``, adding and removing only what changed."""
+        ids = set(ids)
+        added = ids - self._ids
+        removed = self._ids - ids
+        if len(added) + len(removed) > len(self._keys) // 16:
+            # Many changes: sorting from scratch beats inserting one by one
+            self._ids = ids
+            self._keys = sorted((doc_id.lower(), doc_id) for doc_id in ids)
+            self._stale = True
+            return
+        for doc_id in removed:
+            self.remove(doc_id)
+        for doc_id in added:
+            self.add(doc_id)
+
+    def prefix(self, prefix: str, limit: int = 100) -> list[str]:
+        """IDs starting with ``prefix``, ignoring case, in sorted order."""
+        prefix = prefix.lower()
+        start = bisect_left(self._keys, (prefix,))
+        results = []
+        for key, doc_id in self._keys[start : start + limit]:
+            if not key.startswith(prefix):
+                break
+            results.append(doc_id)
+        return results
+
+    def fuzzy(self, query: str, limit: int = 100) -> list[str]:
+        """IDs containing ``query`` anywhere, ignoring case, in sorted order."""
+        if self._stale:
+            self._joined = "\n".join(key for key, _doc_id in self._keys)
+            self._starts = []
+            offset = 0
+            for key, _doc_id in self._keys:
+                self._starts.append(offset)
+                offset += len(key) + 1
+            self._stale = False
+
+        query = query.lower()
+        results = []
+        position = 0
+        while len(results) < limit:
+            found = self._joined.find(query, position)
+            if found == -1:
+                break
+            line = bisect_right(self._starts, found) - 1
+            results.append(self._keys[line][1])
+            if line + 1 == len(self._starts):
+                break
+            position = self._starts[line + 1]
+        return results
+
+    def complete(self, text: str, limit: int = 100, fuzzy: bool = False) -> list[str]:
+        """Prefix matches first, then, with ``fuzzy``, other IDs containing ``text``."""
+        results = self.prefix(text, limit)
+        if fuzzy and text and len(results) < limit:
+            seen = set(results)
+            results += [doc_id for doc_id in self.fuzzy(text, limit + len(results)) if doc_id not in seen][
+                : limit - len(results)
+            ]
+        return results
@@ -0,0 +1,102 @@
+import asyncio
+import itertools
+import json
+import time
+from typing import Callable, Sequence, Union
+
+import httpx
+
+# A scripted reply: {"content": str} and/or {"tool_calls": [{"name": ..., "arguments": {...}}]},
+# or a callable that builds one from the request body.
+Step = Union[dict, Callable[[dict], dict]]
+Responder = Callable[[dict], dict]
+
+
+def scripted_conversation(steps: Sequence[Step]) -> Responder:
+    """
+    Responder that answers the n-th model call of a turn with ``steps[n]``.
+
+    The position is the number of assistant messages after the last user
+    message, so the same script serves any number of turns and any number of
+    concurrent conversations. Once the script runs out the last step repeats.
+    """
+    if not steps:
+        raise ValueError("A scripted conversation needs at least one step")
+
+    def respond(body: dict) -> dict:
+        messages = body.get("messages", [])
+        position = 0
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                break
+            if message.get("role") == "assistant":
+                position += 1
+        step = steps[min(position, len(steps) - 1)]
+        return step(body) if callable(step) else step
+
+    return respond
+
+
+class ScriptedOpenAITransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    HTTP transport that answers chat-completion requests locally.
+
+    Pass it as ``transport`` to ``OpenAIClient`` to run conversations, tests
+    and benchmarks deterministically and without network access. Each request
+    waits ``latency`` seconds, standing in for the model, and is answered with
+    the reply ``responder`` builds from the request body. Every request body
+    is kept in ``requests``.
+    """
+
+    def __init__(self, responder: Responder, latency: float = 0.0, model: str = "scripted"):
+        self.responder = responder
+        self.latency = latency
+        self.model = model
+        self.requests: list[dict] = []
+        self._ids = itertools.count(1)
+
+    def _complete(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/chat/completions"):
+            return httpx.Response(404, json={"error": {"message": f"Not scripted: {request.url.path}"}})
+
+        body = json.loads(request.content or b"{}")
+        self.requests.append(body)
+        reply = self.responder(body)
+
+        n = next(self._ids)
+        message = {"role": "assistant", "content": reply.get("content")}
+        tool_calls = reply.get("tool_calls") or []
+        if tool_calls:
+            message["tool_calls"] = [
+                {
+                    "id": call.get("id", f"call_{n}_{i}"),
+                    "type": "function",
+                    "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))},
+                }
+                for i, call in enumerate(tool_calls)
+            ]
+
+        return httpx.Response(200, json={
+            "id": f"chatcmpl-scripted-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or self.model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls" if tool_calls else "stop",
+                "message": message,
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._complete(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._complete(request)
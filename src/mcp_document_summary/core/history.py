@@ -0,0 +1,210 @@
+import re
+from typing import Optional, Sequence
+
+from ..logger import setup_logger
+from .openai import OpenAIClient
+from .tokens import (
+    CHARS_PER_TOKEN,
+    estimate_message_tokens,
+    estimate_messages_tokens,
+    estimate_request_overhead_tokens,
+    estimate_tokens,
+)
+
+logger = setup_logger(__name__)
+
+POLICIES = ("tool_outputs", "documents", "summarize")
+# Summarizing costs an extra model call, so it only runs when asked for
+DEFAULT_POLICIES = ("tool_outputs", "documents")
+
+_DOCUMENT = re.compile(r'(<document id="([^"]*)"(?: excerpt="[^"]*")?>)\n.*?\n(</document>)', re.DOTALL)
+
+SUMMARY_SYSTEM = (
+    "You condense the earlier part of a conversation between a user and an assistant that "
+    "reads and edits documents. Keep the user's goals, decisions, document IDs, edits that "
+    "were made and open questions. Drop pleasantries and anything already superseded."
+)
+SUMMARY_TAG = "conversation_summary"
+# Stands in for transcript entries left out to fit the summarization budget
+OMITTED = "[Earlier messages omitted]"
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    """Cuts ``text`` to at most ``max_tokens`` tokens, keeping its start."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # Shrink until it fits, since tokenizers do not map characters to tokens evenly.
+    limit = max_tokens * CHARS_PER_TOKEN
+    while limit > 0 and estimate_tokens(text[:limit]) > max_tokens:
+        limit = limit * 3 // 4
+    return f"{text[:limit]} [...]"
+
+
+def _elide_tool_output(message: dict) -> Optional[dict]:
+    content = message.get("content") or ""
+    if message.get("role") != "tool" or content.startswith("[Tool output removed"):
+        return None
+    tokens = estimate_message_tokens(message)
+    return {**message, "content": f"[Tool output removed to save space ({tokens} tokens). Call the tool again if needed.]"}
+
+
+def _elide_documents(message: dict) -> Optional[dict]:
+    content = message.get("content")
+    if message.get("role") != "user" or not isinstance(content, str) or "<document " not in content:
+        return None
+    elided = _DOCUMENT.sub(
+        lambda m: f'<document id="{m.group(2)}" omitted="true">\n'
+        f"[Content omitted; read the document again if needed.]\n{m.group(3)}",
+        content,
+    )
+    return {**message, "content": elided} if elided != content else None
+
+
+class HistoryManager:
+    """
+    Keeps the conversation sent to the model under ``max_tokens``, counting
+    the system prompt and tool schemas sent along with it.
+
+    When the history is over budget, the enabled policies run in order on
+    the turns older than the last ``keep_turns``, until it fits again:
+
+    - ``tool_outputs`` replaces old tool results with a short placeholder,
+    - ``documents`` replaces inlined ``<document>`` bodies with a reference,
+    - ``summarize`` folds the old turns into a single summary message, or
+      drops them when no OpenAI client is available. The transcript sent to
+      be summarized is cut to ``summary_max_tokens`` (default:
+      ``max_tokens``): no message takes more than a quarter of it, an
+      earlier summary is always kept, and the newest messages that still
+      fit come after it. It is not among the default policies, since it
+      costs a model call of its own.
+
+    A turn starts at a user message and holds every assistant and tool
+    message that follows, so an assistant message and the tool results for
+    its ``tool_calls`` are always kept or removed together. Compaction edits
+    the history in place; what was removed is not sent again.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int],
+        keep_turns: int = 2,
+        policies: Sequence[str] = DEFAULT_POLICIES,
+        openai_service: Optional[OpenAIClient] = None,
+        summary_max_tokens: Optional[int] = None,
+    ):
+        unknown = set(policies) - set(POLICIES)
+        if unknown:
+            raise ValueError(f"Unknown history policies {sorted(unknown)}; expected some of {', '.join(POLICIES)}")
+
+        self.max_tokens = max_tokens
+        self.keep_turns = max(keep_turns, 1)
+        self.policies = list(policies)
+        self.openai_service = openai_service
+        self.summary_max_tokens = summary_max_tokens or max_tokens
+        self.stats = {"compactions": 0, "tokens_removed": 0}
+
+    def _recent_start(self, messages: list[dict]) -> int:
+        """Index of the first message in the last ``keep_turns`` turns."""
+        turns = 0
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].get("role") == "user":
+                turns += 1
+                if turns == self.keep_turns:
+                    return i
+        return 0
+
+    def _rewrite(self, messages: list[dict], end: int, rewrite, total: int, budget: int) -> int:
+        """Rewrites messages before ``end``, oldest first, until the history fits ``budget``."""
+        for i in range(end):
+            if total <= budget:
+                break
+            replacement = rewrite(messages[i])
+            if replacement is not None:
+                total += estimate_message_tokens(replacement) - estimate_message_tokens(messages[i])
+                messages[i] = replacement
+        return total
+
+    async def _summarize(self, old: list[dict]) -> str:
+        transcript = []
+        for message in old:
+            content = message.get("content")
+            if isinstance(content, str) and content.strip():
+                transcript.append(f"{message['role']}: {content.strip()}")
+            for call in message.get("tool_calls") or []:
+                function = call["function"] if isinstance(call, dict) else call.function
+                name = function["name"] if isinstance(function, dict) else function.name
+                transcript.append(f"assistant called the tool {name}")
+
+        if self.summary_max_tokens is not None:
+            transcript = self._fit(transcript, self.summary_max_tokens)
+
+        response = await self.openai_service.achat(
+            messages=[{"role": "user", "content": "\n\n".join(transcript)}],
+            system=SUMMARY_SYSTEM,
+            temperature=0,
+        )
+        return self.openai_service.text_from_message(response)
+
+    @staticmethod
+    def _fit(transcript: list[str], budget: int) -> list[str]:
+        """Cuts the transcript to about ``budget`` tokens (see the class docstring)."""
+        transcript = [_clip(entry, max(budget // 4, 1)) for entry in transcript]
+        head = []
+        if transcript and transcript[0].startswith(f"user: <{SUMMARY_TAG}>"):
+            head = transcript[:1]
+            transcript = transcript[1:]
+
+        used = sum(estimate_tokens(entry) for entry in head)
+        tail = []
+        for entry in reversed(transcript):
+            used += estimate_tokens(entry)
+            if used > budget:
+                tail.append(OMITTED)
+                break
+            tail.append(entry)
+        return head + tail[::-1]
+
+    async def compact(
+        self, messages: list[dict], system: Optional[str] = None, tools: Optional[list] = None
+    ) -> list[dict]:
+        """
+        Shrinks ``messages`` in place until it fits the budget left after the
+        ``system`` prompt and ``tools`` sent with it, and returns it.
+        """
+        if self.max_tokens is None:
+            return messages
+
+        budget = self.max_tokens - estimate_request_overhead_tokens(system, tools)
+        before = total = estimate_messages_tokens(messages)
+        if total <= budget:
+            return messages
+
+        recent = self._recent_start(messages)
+        for policy in self.policies:
+            if total <= budget:
+                break
+            if policy == "tool_outputs":
+                total = self._rewrite(messages, recent, _elide_tool_output, total, budget)
+            elif policy == "documents":
+                total = self._rewrite(messages, recent, _elide_documents, total, budget)
+            elif policy == "summarize" and recent > 0:
+                old = messages[:recent]
+                replacement = []
+                if self.openai_service is not None:
+                    summary = await self._summarize(old)
+                    replacement = [{"role": "user", "content": f"<{SUMMARY_TAG}>\n{summary}\n</{SUMMARY_TAG}>"}]
+                messages[:recent] = replacement
+                recent = len(replacement)
+                total = estimate_messages_tokens(messages)
+
+        # The recent turns alone are over budget: elide inside them too, except the latest message.
+        if total > budget:
+            for rewrite in (_elide_tool_output, _elide_documents):
+                total = self._rewrite(messages, len(messages) - 1, rewrite, total, budget)
+            if total > budget:
+                logger.warning(f"Conversation is {total} tokens after compaction; budget is {budget}")
+
+        self.stats["compactions"] += 1
+        self.stats["tokens_removed"] += before - total
+        logger.info(f"Compacted conversation history from {before} to {total} tokens")
+        return messages
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Optional
+
+from ..logger import setup_logger
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion
+
+logger = setup_logger(__name__)
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    raise TypeError(f"Cannot hash {type(value).__name__} in a chat request")
+
+
+def request_key(params: dict) -> str:
+    """Stable content hash of a chat request (model, messages, tools, sampling options)."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=_jsonable)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of chat completions keyed by request hash.
+
+    Responses are kept as serialized JSON in an in-memory LRU bounded by
+    ``max_bytes``, and optionally in ``directory`` so they survive restarts.
+    The directory is an LRU too, bounded by ``disk_max_bytes``: hits refresh
+    a file's modification time and the least recently used files are
+    deleted. Entries older than ``ttl`` seconds are treated as misses.
+    Requests with a non-zero temperature bypass the cache unless
+    ``allow_nondeterministic``.
+
+    ``aget`` and ``aput`` reach the disk tier from a worker thread, so the
+    event loop never waits on file I/O.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        directory: Optional[str] = None,
+        ttl: Optional[float] = None,
+        allow_nondeterministic: bool = False,
+        disk_max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.ttl = ttl
+        self.allow_nondeterministic = allow_nondeterministic
+        self.disk_max_bytes = disk_max_bytes
+
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._size = 0
+        # Files in the disk tier and their sizes, least recently used first; listed on first use
+        self._files: Optional[OrderedDict[str, int]] = None
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "bypasses": 0, "evictions": 0, "disk_evictions": 0}
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def cacheable(self, params: dict) -> bool:
+        if self.allow_nondeterministic or params.get("temperature", 1.0) == 0:
+            return True
+        self.stats["bypasses"] += 1
+        return False
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key: str) -> Optional[ChatCompletion]:
+        payload = self._get_memory(key)
+        if payload is None:
+            payload = self._get_disk(key)
+        return self._decode(payload)
+
+    async def aget(self, key: str) -> Optional[ChatCompletion]:
+        payload = self._get_memory(key)
+        if payload is None:
+            payload = await asyncio.to_thread(self._get_disk, key) if self.directory else self._get_disk(key)
+        return self._decode(payload)
+
+    def put(self, key: str, response: ChatCompletion) -> None:
+        payload = response.model_dump_json()
+        created = time.time()
+        self._remember(key, created, payload)
+        self._write_disk(key, created, payload)
+
+    async def aput(self, key: str, response: ChatCompletion) -> None:
+        payload = response.model_dump_json()
+        created = time.time()
+        self._remember(key, created, payload)
+        if self.directory:
+            await asyncio.to_thread(self._write_disk, key, created, payload)
+
+    @staticmethod
+    def _decode(payload: Optional[str]) -> Optional[ChatCompletion]:
+        from openai.types.chat import ChatCompletion
+
+        return ChatCompletion.model_validate_json(payload) if payload is not None else None
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                self._discard(key)
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        entry = self._read_disk(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["disk_hits"] += 1
+        self._remember(key, *entry)
+        return entry[1]
+
+    def _remember(self, key: str, created: float, payload: str) -> None:
+        with self._lock:
+            self._discard(key)
+            if len(payload) > self.max_bytes:
+                return
+            self._entries[key] = (created, payload)
+            self._size += len(payload)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.stats["evictions"] += 1
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def _disk_files(self) -> OrderedDict[str, int]:
+        """The files in the disk tier, listed from the directory on first use. Call with the lock held."""
+        if self._files is None:
+            found = []
+            for folder in os.scandir(self.directory):
+                if not folder.is_dir():
+                    continue
+                for entry in os.scandir(folder.path):
+                    if entry.name.endswith(".json"):
+                        stat = entry.stat()
+                        found.append((stat.st_mtime, entry.name[: -len(".json")], stat.st_size))
+            self._files = OrderedDict((key, size) for _mtime, key, size in sorted(found))
+            self._disk_size = sum(self._files.values())
+        return self._files
+
+    def _read_disk(self, key: str) -> Optional[tuple[float, str]]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if self._expired(record["created"]):
+            self._remove_files([key])
+            return None
+
+        try:
+            os.utime(path)  # keeps the file's place in the LRU order across restarts
+        except OSError:
+            pass
+        with self._lock:
+            files = self._disk_files()
+            if key in files:
+                files.move_to_end(key)
+        return record["created"], record["response"]
+
+    def _write_disk(self, key: str, created: float, payload: str) -> None:
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": created, "response": payload}, f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not persist cached response {key}: {e}")
+            return
+
+        with self._lock:
+            files = self._disk_files()
+            self._disk_size += size - files.pop(key, 0)
+            files[key] = size
+            evicted = []
+            while self._disk_size > self.disk_max_bytes and len(files) > 1:
+                oldest, oldest_size = files.popitem(last=False)
+                self._disk_size -= oldest_size
+                evicted.append(oldest)
+            self.stats["disk_evictions"] += len(evicted)
+        self._remove_files(evicted, forget=False)
+
+    def _remove_files(self, keys: list[str], forget: bool = True) -> None:
+        if forget:
+            with self._lock:
+                files = self._disk_files()
+                for key in keys:
+                    self._disk_size -= files.pop(key, 0)
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
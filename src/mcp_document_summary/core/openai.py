@@ -1,13 +1,79 @@
-import os
-from openai import OpenAI
-from openai.types.chat import ChatCompletion
+from __future__ import annotations
+
+import threading
+from functools import cached_property
+from typing import TYPE_CHECKING, Optional
+import httpx
 from ..config import settings
+from ..tracing import span
+from .llm_cache import ResponseCache, request_key
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+    from openai.types.chat import ChatCompletion
+
+
+def preload() -> threading.Thread:
+    """Imports the OpenAI SDK in the background, so the first request does not wait for it."""
+    thread = threading.Thread(target=lambda: __import__("openai"), name="openai-preload", daemon=True)
+    thread.start()
+    return thread
+
 
 class OpenAIClient:
-    def __init__(self, model: str, api_key: str = None):
-        self.client = OpenAI(api_key=api_key or settings.openai_api_key)
+    def __init__(
+        self,
+        model: str,
+        api_key: str = None,
+        cache: Optional[ResponseCache] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        ``transport`` replaces the HTTP layer of both clients, e.g. with a
+        ``ScriptedOpenAITransport`` to run without the API. It must support
+        synchronous requests as well if ``chat`` is used.
+
+        The OpenAI SDK takes a noticeable part of a second to import, so it is
+        imported and the clients are created on first use.
+        """
+        self._api_key = api_key or settings.openai_api_key
+        self._timeout = httpx.Timeout(settings.openai_timeout_seconds, connect=settings.openai_connect_timeout_seconds)
+        self._transport = transport
         self.model = model or settings.openai_model_name
+        self.cache = cache
+
+    @cached_property
+    def client(self) -> OpenAI:
+        from openai import DefaultHttpxClient, OpenAI
+
+        return OpenAI(
+            api_key=self._api_key,
+            timeout=self._timeout,
+            http_client=(
+                DefaultHttpxClient(timeout=self._timeout, transport=self._transport)
+                if self._transport is not None
+                else None
+            ),
+        )
 
+    @cached_property
+    def async_client(self) -> AsyncOpenAI:
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        transport_options = {"transport": self._transport} if self._transport is not None else {}
+        # One pooled HTTP client shared by every async request (conversations, summaries, ...)
+        return AsyncOpenAI(
+            api_key=self._api_key,
+            timeout=self._timeout,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.openai_max_connections,
+                    max_keepalive_connections=settings.openai_max_connections,
+                ),
+                timeout=self._timeout,
+                **transport_options,
+            ),
+        )
 
     def add_user_message(self, messages: list, message):
         """Adds a user message or a list of tool results to the history."""
@@ -43,15 +109,14 @@ class OpenAIClient:
             return message.choices[0].message.content
         return ""
 
-    def chat(
+    def _build_params(
         self,
         messages,
         system=None,
         temperature=1.0,
         stop_sequences=None,
         tools=None,
-    ) -> ChatCompletion:
-        
+    ) -> dict:
         request_messages = messages.copy()
         
         if system:
@@ -70,5 +135,68 @@ class OpenAIClient:
             params["tools"] = tools
             params["tool_choice"] = "auto"
 
-        response = self.client.chat.completions.create(**params)
-        return response
\ No newline at end of file
+        return params
+
+    @staticmethod
+    def _llm_span(params: dict):
+        return span("llm", model=params["model"], messages=len(params["messages"]), tools=len(params.get("tools", ())))
+
+    def _cache_key(self, params: dict) -> Optional[str]:
+        if self.cache is None or not self.cache.cacheable(params):
+            return None
+        return request_key(params)
+
+    def chat(
+        self,
+        messages,
+        system=None,
+        temperature=1.0,
+        stop_sequences=None,
+        tools=None,
+    ) -> ChatCompletion:
+        params = self._build_params(messages, system, temperature, stop_sequences, tools)
+
+        key = self._cache_key(params)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            return cached
+
+        with self._llm_span(params):
+            response = self.client.chat.completions.create(**params)
+
+        if key is not None:
+            self.cache.put(key, response)
+        return response
+
+    async def achat(
+        self,
+        messages,
+        system=None,
+        temperature=1.0,
+        stop_sequences=None,
+        tools=None,
+    ) -> ChatCompletion:
+        """
+        Async variant of ``chat`` that never blocks the event loop. Cancelling
+        the awaiting task aborts the HTTP request.
+        """
+        params = self._build_params(messages, system, temperature, stop_sequences, tools)
+
+        key = self._cache_key(params)
+        cached = await self.cache.aget(key) if key is not None else None
+        if cached is not None:
+            return cached
+
+        with self._llm_span(params):
+            response = await self.async_client.chat.completions.create(**params)
+
+        if key is not None:
+            await self.cache.aput(key, response)
+        return response
+
+    async def aclose(self):
+        # Only the clients that were used have been created
+        if "async_client" in self.__dict__:
+            await self.async_client.close()
+        if "client" in self.__dict__:
+            self.client.close()
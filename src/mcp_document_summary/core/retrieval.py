@@ -0,0 +1,176 @@
+import heapq
+import math
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; scores are then summed in plain Python
+    np = None
+
+from ..text import tokenize
+from .summarize import split_into_chunks
+from .tokens import estimate_tokens
+
+# Marks text left out between the chunks of a document that were packed
+GAP = "\n[...]\n"
+
+
+class ChunkIndex:
+    """
+    BM25 over the chunks of one document.
+
+    The document is split into chunks of about ``chunk_tokens`` tokens at
+    paragraph, line or sentence boundaries. Because the chunks never change,
+    the whole BM25 term weight, IDF included, is computed once per term and
+    chunk when the index is built; scoring a query only adds up one weight
+    array per query term.
+    """
+
+    def __init__(self, text: str, chunk_tokens: int = 400, k1: float = 1.2, b: float = 0.75):
+        self.text = text
+        self.chunks = split_into_chunks(text, chunk_tokens)
+        self.tokens = [estimate_tokens(chunk) for chunk in self.chunks]
+
+        # term -> {chunk: term frequency}
+        frequencies: dict[str, dict[int, int]] = {}
+        lengths = []
+        for i, chunk in enumerate(self.chunks):
+            terms = tokenize(chunk)
+            lengths.append(len(terms))
+            for term in terms:
+                postings = frequencies.setdefault(term, {})
+                postings[i] = postings.get(i, 0) + 1
+
+        count = len(self.chunks)
+        average = sum(lengths) / count if count else 0.0
+        # term -> (chunk indices, weight of the term in each of those chunks)
+        self._weights: dict[str, tuple] = {}
+        for term, postings in frequencies.items():
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            chunks = list(postings)
+            weights = [
+                idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[i] / average))
+                for i, tf in postings.items()
+            ]
+            if np is not None:
+                self._weights[term] = (np.array(chunks, dtype=np.intp), np.array(weights))
+            else:
+                self._weights[term] = (chunks, weights)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def ranked(self, terms: set[str]) -> list[tuple[float, int]]:
+        """``(score, chunk)`` for every chunk, best first; equal scores keep the document order."""
+        postings = [self._weights[term] for term in terms if term in self._weights]
+        if np is not None:
+            scores = np.zeros(len(self.chunks))
+            for chunks, weights in postings:
+                scores[chunks] += weights
+            order = np.argsort(-scores, kind="stable")
+            return list(zip(scores[order].tolist(), order.tolist()))
+
+        scores = [0.0] * len(self.chunks)
+        for chunks, weights in postings:
+            for i, weight in zip(chunks, weights):
+                scores[i] += weight
+        order = sorted(range(len(scores)), key=lambda i: -scores[i])
+        return [(scores[i], i) for i in order]
+
+
+class ContextPacker:
+    """
+    Builds the ``<context>`` block for the documents mentioned in a query.
+
+    When the documents fit in ``max_tokens`` they are included whole.
+    Otherwise each is split into chunks, the chunks of all documents are
+    ranked against the query with BM25, and the best ones are packed until
+    the budget is spent, starting with the best chunk of every document so
+    none is left out entirely. Packed chunks are shown in document order
+    with ``[...]`` where text was skipped. Chunk indexes are cached for the
+    ``max_cached`` most recently mentioned documents and rebuilt only when a
+    document's text changes.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = 6000, chunk_tokens: int = 400, max_cached: int = 64):
+        self.max_tokens = max_tokens
+        self.chunk_tokens = chunk_tokens
+        self.max_cached = max_cached
+        self._indexes: OrderedDict[str, ChunkIndex] = OrderedDict()
+        self.stats = {"index_hits": 0, "index_builds": 0}
+
+    def index(self, doc_id: str, text: str) -> ChunkIndex:
+        index = self._indexes.get(doc_id)
+        if index is not None and (index.text is text or index.text == text):
+            self.stats["index_hits"] += 1
+            self._indexes.move_to_end(doc_id)
+            return index
+
+        self.stats["index_builds"] += 1
+        index = self._indexes[doc_id] = ChunkIndex(text, self.chunk_tokens)
+        self._indexes.move_to_end(doc_id)
+        while len(self._indexes) > self.max_cached:
+            self._indexes.popitem(last=False)
+        return index
+
+    def _tokens(self, doc_id: str, text: str) -> int:
+        index = self._indexes.get(doc_id)
+        if index is not None and index.text is text:
+            return sum(index.tokens)
+        return estimate_tokens(text)
+
+    def pack(self, query: str, documents: list[tuple[str, str]]) -> str:
+        if self.max_tokens is None or sum(self._tokens(doc_id, text) for doc_id, text in documents) <= self.max_tokens:
+            return "".join(f'\n<document id="{doc_id}">\n{text}\n</document>\n' for doc_id, text in documents)
+
+        terms = set(tokenize(" ".join(word for word in query.split() if not word.startswith("@"))))
+        indexes = [self.index(doc_id, text) for doc_id, text in documents]
+        ranked = [index.ranked(terms) for index in indexes]
+        selected: list[set[int]] = [set() for _ in documents]
+        budget = self.max_tokens
+
+        def fits(d: int, i: int) -> bool:
+            nonlocal budget
+            if indexes[d].tokens[i] > budget:
+                return False
+            budget -= indexes[d].tokens[i]
+            selected[d].add(i)
+            return True
+
+        for d, chunks in enumerate(ranked):
+            if chunks:
+                fits(d, chunks[0][1])
+
+        # Lists, not generators: a generator would see the loop's last ``d`` and ``chunks``.
+        remaining: Iterator[tuple[float, int, int]] = heapq.merge(
+            *([(-score, d, i) for score, i in chunks[1:]] for d, chunks in enumerate(ranked))
+        )
+        smallest = min((min(index.tokens) for index in indexes if len(index)), default=0)
+        for _negated, d, i in remaining:
+            # A chunk over the remaining budget is skipped; a smaller, lower-ranked one may still fit
+            if not fits(d, i) and budget < smallest:
+                break
+
+        return "".join(
+            f"\n{self._tag(doc_id, index, chosen)}\n{self._join(index, sorted(chosen))}\n</document>\n"
+            for (doc_id, _text), index, chosen in zip(documents, indexes, selected)
+        )
+
+    @staticmethod
+    def _tag(doc_id: str, index: ChunkIndex, chosen: set[int]) -> str:
+        """The opening tag; only excerpts say how much of the document they hold."""
+        if len(chosen) == len(index):
+            return f'<document id="{doc_id}">'
+        return f'<document id="{doc_id}" excerpt="{len(chosen)} of {len(index)} parts">'
+
+    @staticmethod
+    def _join(index: ChunkIndex, chosen: list[int]) -> str:
+        parts = [GAP.lstrip("\n")] if chosen and chosen[0] > 0 else []
+        for previous, i in zip([None, *chosen], chosen):
+            if previous is not None and i != previous + 1:
+                parts.append(GAP)
+            parts.append(index.chunks[i])
+        if chosen and chosen[-1] < len(index) - 1:
+            parts.append(GAP.rstrip("\n"))
+        return "".join(parts)
@@ -0,0 +1,151 @@
+import asyncio
+import re
+from typing import Optional
+
+from .openai import OpenAIClient
+from .tokens import CHARS_PER_TOKEN, estimate_tokens
+
+MAP_SYSTEM = (
+    "You summarize one part of a longer document. Keep every fact, figure, name and "
+    "decision that could matter for the document as a whole. Do not add commentary."
+)
+REDUCE_SYSTEM = (
+    "You combine partial summaries of consecutive parts of one document into a single "
+    "coherent summary. Merge overlapping points, keep the original order, and drop repetition."
+)
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list[str]:
+    """
+    Splits ``text`` into chunks of at most ``max_tokens`` tokens, breaking at
+    paragraph boundaries where possible, then at lines and sentences, and only
+    cutting mid-sentence when a single sentence is over the budget.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text] if text.strip() else []
+
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+
+    def pieces(block: str, separators: list[str]):
+        if estimate_tokens(block) <= max_tokens:
+            yield block
+            return
+        if not separators:
+            step = max_tokens * CHARS_PER_TOKEN
+            for i in range(0, len(block), step):
+                yield block[i : i + step]
+            return
+        for part in re.split(f"(?<={separators[0]})", block):
+            if part:
+                yield from pieces(part, separators[1:])
+
+    for piece in pieces(text, [r"\n\n", r"\n", r"[.!?] "]):
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+
+    if current:
+        chunks.append("".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+class SummaryPipeline:
+    """
+    Map-reduce summarization for documents larger than one model call.
+
+    The document is split into token-bounded chunks that are summarized
+    concurrently (at most ``fan_out`` calls in flight). The partial summaries
+    are then merged in groups, level by level, until one summary is left, so
+    wall-clock time grows with the depth of that tree rather than with the
+    length of the document.
+    """
+
+    def __init__(
+        self,
+        openai_service: OpenAIClient,
+        chunk_tokens: int = 3000,
+        fan_out: int = 4,
+        reduce_group: int = 8,
+        temperature: float = 0.2,
+    ):
+        if reduce_group < 2:
+            raise ValueError("reduce_group must be at least 2")
+
+        self.openai_service = openai_service
+        self.chunk_tokens = chunk_tokens
+        self.fan_out = fan_out
+        self.reduce_group = reduce_group
+        self.temperature = temperature
+
+    async def _complete(self, semaphore: asyncio.Semaphore, system: str, prompt: str) -> str:
+        async with semaphore:
+            response = await self.openai_service.achat(
+                messages=[{"role": "user", "content": prompt}],
+                system=system,
+                temperature=self.temperature,
+            )
+        return self.openai_service.text_from_message(response)
+
+    def _group(self, summaries: list[str]) -> list[list[str]]:
+        """Groups consecutive summaries so each group fits in one reduce call."""
+        groups: list[list[str]] = []
+        current: list[str] = []
+        current_tokens = 0
+        for summary in summaries:
+            tokens = estimate_tokens(summary)
+            if current and (len(current) >= self.reduce_group or current_tokens + tokens > self.chunk_tokens):
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += tokens
+        groups.append(current)
+
+        # Always make progress, even if every summary came back oversized.
+        if len(groups) == len(summaries) and len(summaries) > 1:
+            groups = [summaries[i : i + 2] for i in range(0, len(summaries), 2)]
+        return groups
+
+    async def summarize(self, text: str, doc_id: str = "document", instructions: Optional[str] = None) -> str:
+        chunks = split_into_chunks(text, self.chunk_tokens)
+        if not chunks:
+            return ""
+
+        semaphore = asyncio.Semaphore(self.fan_out)
+        focus = f"\n{instructions}" if instructions else ""
+
+        if len(chunks) == 1:
+            return await self._complete(
+                semaphore,
+                MAP_SYSTEM,
+                f'Summarize the document "{doc_id}".{focus}\n<document>\n{chunks[0]}\n</document>',
+            )
+
+        summaries = await asyncio.gather(*(
+            self._complete(
+                semaphore,
+                MAP_SYSTEM,
+                f'Summarize part {i + 1} of {len(chunks)} of the document "{doc_id}".{focus}\n'
+                f"<part>\n{chunk}\n</part>",
+            )
+            for i, chunk in enumerate(chunks)
+        ))
+
+        while len(summaries) > 1:
+            summaries = await asyncio.gather(*(
+                self._complete(
+                    semaphore,
+                    REDUCE_SYSTEM,
+                    f'Combine these summaries of consecutive parts of the document "{doc_id}".{focus}\n'
+                    + "".join(f"<summary>\n{s}\n</summary>\n" for s in group),
+                )
+                if len(group) > 1
+                else asyncio.sleep(0, result=group[0])
+                for group in self._group(list(summaries))
+            ))
+
+        return summaries[0]
@@ -0,0 +1,44 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class PhaseTimer:
+    """
+    Accumulated wall-clock time per named phase of a conversation turn, such
+    as ``llm``, ``tool_routing``, ``tool_execution`` or ``resource_fetch``.
+
+    Phases that overlap (concurrent tool calls, concurrent conversations
+    sharing a timer) are each counted in full.
+    """
+
+    def __init__(self):
+        self.totals: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def merge(self, other: "PhaseTimer") -> None:
+        for name, seconds in other.totals.items():
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + other.counts[name]
+
+    def as_dict(self) -> dict[str, dict]:
+        return {
+            name: {
+                "seconds": round(seconds, 6),
+                "count": self.counts[name],
+                "mean_ms": round(seconds / self.counts[name] * 1000, 3),
+            }
+            for name, seconds in sorted(self.totals.items())
+        }
@@ -0,0 +1,60 @@
+import json
+import math
+from typing import Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a character-based estimate
+    tiktoken = None
+
+# Average characters per token for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Counts tokens with tiktoken when installed, otherwise estimates from the length."""
+    global _encoding
+
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+# Framing tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_message_tokens(message: dict) -> int:
+    """Estimates the prompt tokens of one chat message, including tool call arguments."""
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    content = message.get("content")
+    if isinstance(content, str):
+        tokens += estimate_tokens(content)
+    elif isinstance(content, list):
+        tokens += sum(estimate_tokens(part.get("text", "")) for part in content if isinstance(part, dict))
+
+    for call in message.get("tool_calls") or []:
+        function = call["function"] if isinstance(call, dict) else call.function
+        if isinstance(function, dict):
+            tokens += estimate_tokens(function.get("name", "")) + estimate_tokens(function.get("arguments", ""))
+        else:
+            tokens += estimate_tokens(function.name) + estimate_tokens(function.arguments)
+    return tokens
+
+
+def estimate_messages_tokens(messages: list[dict]) -> int:
+    return sum(estimate_message_tokens(message) for message in messages)
+
+
+def estimate_request_overhead_tokens(system: Optional[str] = None, tools: Optional[list] = None) -> int:
+    """Estimates the prompt tokens a request spends on its system prompt and tool schemas."""
+    tokens = estimate_message_tokens({"role": "system", "content": system}) if system else 0
+    if tools:
+        tokens += estimate_tokens(json.dumps(tools, default=str))
+    return tokens
@@ -1,45 +1,144 @@
+from __future__ import annotations
+
+import asyncio
 import json
-from typing import Optional, List, Any
-from mcp.types import CallToolResult, TextContent
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, List, Any
+from mcp.types import CallToolResult, TextContent, Tool, ToolListChangedNotification
 from ..client.mcp_client import MCPClient
+from ..logger import setup_logger
+from ..tracing import span
+from .timing import PhaseTimer
 
-from openai.types.chat import (
-    ChatCompletion, 
-    ChatCompletionToolMessageParam,
-    ChatCompletionToolParam
-)
+if TYPE_CHECKING:
+    from openai.types.chat import (
+        ChatCompletion,
+        ChatCompletionToolMessageParam,
+        ChatCompletionToolParam
+    )
+
+logger = setup_logger(__name__)
+
+
+class ToolCatalog:
+    """
+    Cached view of the tools offered by a set of MCP clients.
+
+    Tool lists are fetched from all clients concurrently and kept, together
+    with a ``tool name -> client`` routing table, until a client sends
+    ``notifications/tools/list_changed`` or ``ttl`` seconds pass. When two
+    clients offer the same tool name, the first client wins and the
+    collision is logged.
+    """
+
+    def __init__(self, clients: dict[str, MCPClient], ttl: Optional[float] = 300.0):
+        self.clients = clients
+        self.ttl = ttl
+        self.collisions: dict[str, list[str]] = {}
+        self._tools: list[ChatCompletionToolParam] = []
+        self._routes: dict[str, MCPClient] = {}
+        self._models: dict[str, Tool] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
 
-class ToolManager:
-    @classmethod
-    async def get_all_tools(cls, clients: dict[str, MCPClient]) -> list[ChatCompletionToolParam]:
-        """Gets all tools from the provided clients and formats them for OpenAI."""
-        tools: list[ChatCompletionToolParam] = []
         for client in clients.values():
-            tool_models = await client.list_tools()
-            tools += [
-                {
+            if hasattr(client, "add_notification_handler"):
+                client.add_notification_handler(self._on_notification)
+
+    def _on_notification(self, notification) -> None:
+        if isinstance(notification, ToolListChangedNotification):
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def _stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl
+
+    async def refresh(self) -> None:
+        names = list(self.clients)
+        with span("tool_list", servers=len(names)):
+            results = await asyncio.gather(*(self.clients[name].list_tools() for name in names))
+
+        tools: list[ChatCompletionToolParam] = []
+        routes: dict[str, MCPClient] = {}
+        models: dict[str, Tool] = {}
+        owners: dict[str, list[str]] = {}
+        for name, tool_models in zip(names, results):
+            for t in tool_models:
+                owners.setdefault(t.name, []).append(name)
+                if t.name in routes:
+                    continue
+                routes[t.name] = self.clients[name]
+                models[t.name] = t
+                tools.append({
                     "type": "function",
                     "function": {
                         "name": t.name,
                         "description": t.description,
-                        "parameters": t.inputSchema,  
+                        "parameters": t.inputSchema,
                     }
-                }
-                for t in tool_models
-            ]
-        return tools
+                })
+
+        self.collisions = {tool: clients for tool, clients in owners.items() if len(clients) > 1}
+        for tool, clients in self.collisions.items():
+            logger.warning(f"Tool '{tool}' is offered by {', '.join(clients)}; using {clients[0]}")
+
+        self._tools, self._routes, self._models = tools, routes, models
+        self._loaded_at = time.monotonic()
+
+    async def _ensure_fresh(self) -> None:
+        if not self._stale():
+            return
+        async with self._lock:
+            if self._stale():
+                await self.refresh()
+
+    async def tools(self) -> list[ChatCompletionToolParam]:
+        await self._ensure_fresh()
+        return self._tools
+
+    async def route(self, tool_name: str) -> Optional[MCPClient]:
+        await self._ensure_fresh()
+        return self._routes.get(tool_name)
+
+    async def tool(self, tool_name: str) -> Optional[Tool]:
+        await self._ensure_fresh()
+        return self._models.get(tool_name)
+
+
+@dataclass
+class _PlannedCall:
+    """A tool call resolved to its client, ready to be scheduled."""
+
+    tool_use_id: str
+    tool_name: str
+    tool_input: Any = None
+    client: Optional[MCPClient] = None
+    doc_id: Optional[str] = None
+    read_only: bool = False
+    error: Optional[str] = None
+
+
+class ToolManager:
+    @classmethod
+    async def get_all_tools(cls, catalog: ToolCatalog) -> list[ChatCompletionToolParam]:
+        """
+        Gets all tools of the catalog's clients, formatted for OpenAI. Create
+        one catalog per set of clients and reuse it: each catalog subscribes
+        to its clients' notifications.
+        """
+        return await catalog.tools()
 
     @classmethod
     async def _find_client_with_tool(
-        cls, clients: list[MCPClient], tool_name: str
+        cls, catalog: ToolCatalog, tool_name: str
     ) -> Optional[MCPClient]:
-        """Finds the first client that has the specified tool."""
-        for client in clients:
-            tools = await client.list_tools()
-            tool = next((t for t in tools if t.name == tool_name), None)
-            if tool:
-                return client
-        return None
+        """Finds the client that serves the specified tool."""
+        return await catalog.route(tool_name)
 
     @classmethod
     def _build_tool_result_part(
@@ -54,76 +153,117 @@ class ToolManager:
             "content": text,
         }
 
+    @classmethod
+    def _conflicts(cls, earlier: _PlannedCall, later: _PlannedCall) -> bool:
+        """
+        Whether ``later`` must wait for ``earlier``. Calls conflict when they go
+        to the same server, at least one of them writes, and they touch the same
+        document or one of them is not scoped to a single document.
+        """
+        if earlier.client is None or earlier.client is not later.client:
+            return False
+        if earlier.read_only and later.read_only:
+            return False
+        return earlier.doc_id is None or later.doc_id is None or earlier.doc_id == later.doc_id
+
+    @classmethod
+    async def _plan(cls, catalog: ToolCatalog, tool_call) -> _PlannedCall:
+        planned = _PlannedCall(tool_call.id, tool_call.function.name)
+
+        try:
+            planned.tool_input = json.loads(tool_call.function.arguments)
+        except json.JSONDecodeError:
+            planned.error = "Error: Invalid JSON arguments provided by model."
+            return planned
+
+        planned.client = await cls._find_client_with_tool(catalog, planned.tool_name)
+        if not planned.client:
+            planned.error = f"Error: Could not find tool '{planned.tool_name}'"
+            return planned
+
+        tool = await catalog.tool(planned.tool_name)
+        planned.read_only = bool(tool and tool.annotations and tool.annotations.readOnlyHint)
+        if isinstance(planned.tool_input, dict) and isinstance(planned.tool_input.get("doc_id"), str):
+            planned.doc_id = planned.tool_input["doc_id"]
+        return planned
+
+    @classmethod
+    async def _execute_tool(cls, planned: _PlannedCall) -> ChatCompletionToolMessageParam:
+        tool_use_id = planned.tool_use_id
+        tool_name = planned.tool_name
+
+        try:
+            with span("tool_call", tool=tool_name, doc_id=planned.doc_id):
+                tool_output: CallToolResult | None = await planned.client.call_tool(
+                    tool_name, planned.tool_input
+                )
+            
+            content_str = ""
+            if tool_output and tool_output.content:
+                # Extract text from MCP content list
+                texts = [
+                    item.text for item in tool_output.content 
+                    if isinstance(item, TextContent)
+                ]
+                content_str = "\n".join(texts)
+            
+            if tool_output and tool_output.isError:
+                content_str = f"Tool Execution Error: {content_str}"
+
+            if not content_str:
+                content_str = "Tool executed successfully but returned no content."
+
+            return cls._build_tool_result_part(tool_use_id, content_str)
+
+        except Exception as e:
+            error_message = f"Error executing tool '{tool_name}': {str(e)}"
+            print(error_message)
+            return cls._build_tool_result_part(
+                tool_use_id, error_message
+            )
+
     @classmethod
     async def execute_tool_requests(
-        cls, clients: dict[str, MCPClient], message: ChatCompletion
+        cls,
+        catalog: ToolCatalog,
+        message: ChatCompletion,
+        max_concurrency: int = 8,
+        timings: Optional[PhaseTimer] = None,
     ) -> List[ChatCompletionToolMessageParam]:
-        """Executes tool calls found in the OpenAI ChatCompletion response."""
-        
+        """
+        Executes tool calls found in the OpenAI ChatCompletion response.
+
+        Calls run concurrently, at most ``max_concurrency`` at a time, except
+        that a call waits for every earlier call it conflicts with (see
+        ``_conflicts``), so reads after writes on a document see the write.
+        Results are returned in the order the model requested the calls.
+        Time spent routing and executing the calls is added to ``timings``.
+        """
+        timings = timings or PhaseTimer()
+
         choice = message.choices[0]
         if not choice.message.tool_calls:
             return []
-            
-        tool_calls = choice.message.tool_calls
-        tool_result_messages: list[ChatCompletionToolMessageParam] = []
-
-        for tool_call in tool_calls:
-            tool_use_id = tool_call.id
-            tool_name = tool_call.function.name
-            
-            try:
-                tool_input = json.loads(tool_call.function.arguments)
-            except json.JSONDecodeError:
-                tool_result_messages.append(
-                    cls._build_tool_result_part(
-                        tool_use_id, "Error: Invalid JSON arguments provided by model."
-                    )
-                )
-                continue
 
-            client = await cls._find_client_with_tool(
-                list(clients.values()), tool_name
-            )
+        with timings.phase("tool_routing"):
+            planned_calls = [await cls._plan(catalog, tool_call) for tool_call in choice.message.tool_calls]
+        semaphore = asyncio.Semaphore(max_concurrency)
+        tasks: list[asyncio.Task] = []
 
-            if not client:
-                tool_result_messages.append(
-                    cls._build_tool_result_part(
-                        tool_use_id, f"Error: Could not find tool '{tool_name}'"
-                    )
-                )
-                continue
+        async def run(planned: _PlannedCall, dependencies: list[asyncio.Task]):
+            if planned.error:
+                return cls._build_tool_result_part(planned.tool_use_id, planned.error)
+            if dependencies:
+                await asyncio.wait(dependencies)
+            async with semaphore:
+                return await cls._execute_tool(planned)
 
-            try:
-                tool_output: CallToolResult | None = await client.call_tool(
-                    tool_name, tool_input
-                )
-                
-                content_str = ""
-                if tool_output and tool_output.content:
-                    # Extract text from MCP content list
-                    texts = [
-                        item.text for item in tool_output.content 
-                        if isinstance(item, TextContent)
-                    ]
-                    content_str = "\n".join(texts)
-                
-                if tool_output and tool_output.isError:
-                    content_str = f"Tool Execution Error: {content_str}"
-
-                if not content_str:
-                    content_str = "Tool executed successfully but returned no content."
-
-                tool_result_messages.append(
-                    cls._build_tool_result_part(tool_use_id, content_str)
-                )
+        for i, planned in enumerate(planned_calls):
+            dependencies = [
+                tasks[j] for j in range(i) if cls._conflicts(planned_calls[j], planned)
+            ]
+            tasks.append(asyncio.create_task(run(planned, dependencies)))
 
-            except Exception as e:
-                error_message = f"Error executing tool '{tool_name}': {str(e)}"
-                print(error_message)
-                tool_result_messages.append(
-                    cls._build_tool_result_part(
-                        tool_use_id, error_message
-                    )
-                )
+        with timings.phase("tool_execution"):
+            return list(await asyncio.gather(*tasks))
 
-        return tool_result_messages
\ No newline at end of file
@@ -7,7 +7,8 @@ def setup_logger(name: str) -> logging.Logger:
     logger.setLevel(settings.log_level.upper())
     
     if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
+        # stderr, so logs never mix with a stdio MCP transport or JSON output
+        handler = logging.StreamHandler(sys.stderr)
         formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
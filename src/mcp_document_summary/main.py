@@ -1,80 +1,157 @@
+import time
+
+# Taken before the remaining imports, so the reported startup time includes them
+_STARTED = time.perf_counter()
+
 import asyncio
 import sys
 import os
 from contextlib import AsyncExitStack
 
 from .client.mcp_client import MCPClient
-from .core.openai import OpenAIClient
+from .core.openai import OpenAIClient, preload as preload_openai
 from .core.cli_chat import CliChat
 from .core.cli import CliApp
 from .config import settings
 from .logger import setup_logger
+from .profiling import MODES as PROFILE_MODES, Profiler
 
 import argparse
 
 logger = setup_logger(__name__)
 
-async def main():
+
+def parse_args(argv=None) -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument("--url", help="URL of the SSE server to connect to (e.g. http://127.0.0.1:8000/sse)")
+    parser.add_argument(
+        "--spawn",
+        action="store_true",
+        help="Run the document server in a separate process over stdio instead of in this process",
+    )
     parser.add_argument("additional_servers", nargs="*", help="Additional server scripts to run")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        default=settings.profile_mode,
+        help="Profile each turn; turns slower than PROFILE_THRESHOLD_MS are written to PROFILE_DIR",
+    )
+    return parser.parse_args(argv)
+
+
+async def start(args: argparse.Namespace, stack: AsyncExitStack) -> CliApp | None:
+    """Connects to the servers and builds the CLI, ready to show the first prompt."""
+    cache = None
+    if settings.llm_cache_enabled:
+        from .core.llm_cache import ResponseCache
 
-    openai_service = OpenAIClient(model=settings.openai_model_name, api_key=settings.openai_api_key)
+        cache = ResponseCache(
+            max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+            disk_max_bytes=settings.llm_cache_disk_max_mb * 1024 * 1024,
+            directory=settings.llm_cache_dir,
+            ttl=settings.llm_cache_ttl_seconds,
+            allow_nondeterministic=settings.llm_cache_nondeterministic,
+        )
+
+    openai_service = OpenAIClient(model=settings.openai_model_name, api_key=settings.openai_api_key, cache=cache)
+    stack.push_async_callback(openai_service.aclose)
     clients = {}
 
-    async with AsyncExitStack() as stack:
-        # 1. Initialize the documentation/main client
-        if args.url:
-             logger.info(f"Connecting to server at: {args.url}")
-             try:
-                doc_client = await stack.enter_async_context(
-                    MCPClient(url=args.url)
-                )
-                clients["doc_client"] = doc_client
-             except Exception as e:
-                logger.error(f"Failed to connect to server at {args.url}: {e}")
-                return
-        else:
-             # Default: Spawn internal server
-             default_server_script = "src/mcp_document_summary/server/server.py"
-             cmd, cmd_args = (
-                ("uv", ["run", "python", "-m", "mcp_document_summary.server.server"])
-                if os.getenv("USE_UV", "0") == "1"
-                else ("python", ["-m", "mcp_document_summary.server.server"])
+    # 1. Initialize the documentation/main client
+    if args.url:
+         logger.info(f"Connecting to server at: {args.url}")
+         clients["doc_client"] = MCPClient(url=args.url, pool_size=settings.mcp_pool_size)
+    elif args.spawn:
+         cmd, cmd_args = (
+            ("uv", ["run", "python", "-m", "mcp_document_summary.server.server", "--transport", "stdio"])
+            if os.getenv("USE_UV", "0") == "1"
+            else (sys.executable, ["-m", "mcp_document_summary.server.server", "--transport", "stdio"])
+         )
+         logger.info(f"Spawning default server: {cmd} {cmd_args}")
+         # The server reads its settings from the environment too
+         clients["doc_client"] = MCPClient(command=cmd, args=cmd_args, env=dict(os.environ))
+    else:
+         # Default: run the document server in this process, connected through memory streams
+         from .server.storage import StoreLocked
+
+         try:
+             from .server.server import mcp as document_server
+         except StoreLocked as e:
+             # A spawned server would open the same store, so only connecting to the running one helps
+             logger.error(
+                 f"{e}. Connect to the server that has it open with --url "
+                 "(e.g. http://127.0.0.1:8000/sse), or stop that server first."
              )
-             logger.info(f"Spawning default server: {cmd} {cmd_args}")
-             try:
-                doc_client = await stack.enter_async_context(
-                    MCPClient(command=cmd, args=cmd_args)
-                )
-                clients["doc_client"] = doc_client
-             except Exception as e:
-                logger.error(f"Failed to spawn default server: {e}")
-                return
-
-        # 2. Initialize additional clients from command line args
-        for i, server_script in enumerate(args.additional_servers):
-            client_id = f"client_{i}_{server_script}"
-            logger.info(f"Connecting to additional server: {server_script}")
-            client = await stack.enter_async_context(
-                MCPClient(command="uv", args=["run", server_script])
-            )
-            clients[client_id] = client
-
-        # 3. Initialize Chat Logic
-        chat = CliChat(
-            doc_client=doc_client,
-            clients=clients,
-            openai_service=openai_service,
+             return None
+
+         clients["doc_client"] = MCPClient(server=document_server)
+
+    # 2. Initialize additional clients from command line args
+    for i, server_script in enumerate(args.additional_servers):
+        client_id = f"client_{i}_{server_script}"
+        logger.info(f"Connecting to additional server: {server_script}")
+        clients[client_id] = MCPClient(command="uv", args=["run", server_script])
+
+    # Connect to every server at once so startup takes as long as the slowest one
+    t0 = time.perf_counter()
+    results = await asyncio.gather(
+        *(client.connect() for client in clients.values()), return_exceptions=True
+    )
+    for client_id, result in zip(list(clients), results):
+        if isinstance(result, BaseException):
+            logger.error(f"Failed to connect to {clients[client_id].name}: {result}")
+            del clients[client_id]
+        else:
+            stack.push_async_callback(clients[client_id].cleanup)
+    logger.info(f"Connected to {len(clients)} server(s) in {time.perf_counter() - t0:.2f}s")
+
+    if "doc_client" not in clients:
+        return None
+    doc_client = clients["doc_client"]
+
+    # 3. Initialize Chat Logic
+    chat = CliChat(
+        doc_client=doc_client,
+        clients=clients,
+        openai_service=openai_service,
+    )
+
+    if args.profile:
+        chat.profiler = Profiler(
+            mode=args.profile,
+            output_dir=settings.profile_dir,
+            threshold_ms=settings.profile_threshold_ms,
+            interval_ms=settings.profile_interval_ms,
+            prefix="client",
         )
 
-        # 4. Initialize UI
-        cli = CliApp(chat)
-        await cli.initialize()
-        await cli.run()
+    # 4. Initialize UI
+    cli = CliApp(chat)
+    await cli.initialize()
+    return cli
+
+
+async def main():
+    args = parse_args()
+
+    async with AsyncExitStack() as stack:
+        cli = await start(args, stack)
+        if cli is None:
+            return
+        logger.info(f"Ready for input {time.perf_counter() - _STARTED:.2f}s after start")
+
+        # The OpenAI SDK is only needed for the first question; load it while the user types.
+        preload_openai()
+        chat = cli.agent
+        try:
+            await cli.run()
+        finally:
+            if chat.openai_service.cache is not None:
+                logger.info(f"LLM cache stats: {chat.openai_service.cache.stats}")
+            for client in chat.clients.values():
+                logger.info(f"MCP connection stats for {client.name}: {client.stats()}")
 
 if __name__ == "__main__":
     if sys.platform == "win32":
         asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+import asyncio
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from types import CodeType, FrameType
+from typing import Iterator, Optional
+
+from mcp import types
+from mcp.server.lowlevel import Server
+
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MODES = ("deterministic", "sampling")
+
+
+def _label(code: CodeType) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _frame_stack(frame: Optional[FrameType]) -> list[str]:
+    """Labels of ``frame`` and its callers, outermost first."""
+    stack = []
+    while frame is not None:
+        stack.append(_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _task_stack(task: asyncio.Task) -> list[str]:
+    """Labels of the coroutines a suspended task is awaiting, outermost first."""
+    stack = [f"<task {task.get_name()}>"]
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_label(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return stack
+
+
+def _idle(frame: Optional[FrameType]) -> bool:
+    """Whether the event loop thread is blocked waiting for I/O."""
+    return frame is not None and frame.f_code.co_filename.endswith("selectors.py")
+
+
+class _Sampler(threading.Thread):
+    """
+    Samples the stack of one thread every ``interval`` seconds.
+
+    While that thread's event loop is waiting for I/O, the sample is instead
+    attributed to every task started during the recording, at the point it
+    is suspended, so time spent awaiting the model or an MCP server shows up
+    under the coroutine that awaits it. Tasks are not thread-safe to inspect,
+    so those samples are taken by a callback scheduled on the loop itself and
+    counted separately until the sampler stops.
+    """
+
+    def __init__(self, thread_id: int, interval: float, loop: Optional[asyncio.AbstractEventLoop]):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.loop = loop
+        self.stacks: Counter[str] = Counter()
+        # Written only on the loop thread
+        self._task_stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._ignored = set(asyncio.all_tasks(loop)) if loop is not None else set()
+        self._ignored.discard(asyncio.current_task(loop) if loop is not None else None)
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = ";".join(_frame_stack(frame))
+            if self.loop is not None and _idle(frame):
+                try:
+                    self.loop.call_soon_threadsafe(self._sample_tasks, stack)
+                    continue
+                except RuntimeError:
+                    pass  # the loop is closed
+            self.stacks[stack] += 1
+
+    def _sample_tasks(self, idle_stack: str) -> None:
+        """Runs on the loop: counts the stacks of the recorded tasks, or the idle loop if there are none."""
+        if self._stopped.is_set():
+            return
+        tasks = [task for task in asyncio.all_tasks(self.loop) if task not in self._ignored]
+        for task in tasks:
+            self._task_stacks[";".join(_task_stack(task))] += 1
+        if not tasks:
+            self._task_stacks[idle_stack] += 1
+
+    def stop(self) -> None:
+        """Stops sampling; call it on the loop thread so no task sample is still being taken."""
+        self._stopped.set()
+        self.join()
+        self.stacks.update(self._task_stacks)
+
+
+class Profiler:
+    """
+    Records a profile of each turn or request and keeps only the slow ones.
+
+    ``deterministic`` mode traces every call with ``cProfile`` and writes a
+    ``.pstats`` file; ``sampling`` mode samples the stack every
+    ``interval_ms`` of wall-clock time, including where suspended coroutines
+    are waiting, and writes collapsed stacks (``frame;frame;... count``) for
+    flame graph tools. Files are written only when the block took at least
+    ``threshold_ms``.
+
+    ``cProfile`` traces the whole thread, so a deterministic profile also
+    covers other tasks running on the loop meanwhile; only one deterministic
+    profile runs at a time, and overlapping blocks run unprofiled.
+    """
+
+    def __init__(
+        self,
+        mode: str = "sampling",
+        output_dir: str = "profiles",
+        threshold_ms: float = 0.0,
+        interval_ms: float = 5.0,
+        prefix: str = "profile",
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}; expected one of {', '.join(MODES)}")
+
+        self.mode = mode
+        self.output_dir = output_dir
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.prefix = prefix
+        self.written: list[str] = []
+        self._active = False
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profiles the block; call it on the thread that runs the event loop."""
+        if self.mode == "deterministic":
+            if self._active:
+                yield
+                return
+            profiler = cProfile.Profile()
+            self._active = True
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                self._active = False
+                self._finish(name, time.perf_counter() - start, profiler)
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        sampler = _Sampler(threading.get_ident(), self.interval, loop)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            self._finish(name, time.perf_counter() - start, sampler.stacks)
+
+    def _finish(self, name: str, seconds: float, result) -> None:
+        if seconds < self.threshold:
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = re.sub(r"[^\w.-]+", "_", f"{self.prefix}-{name}-{seconds * 1000:.0f}ms")
+        if isinstance(result, cProfile.Profile):
+            path = os.path.join(self.output_dir, f"{stem}.pstats")
+            result.dump_stats(path)
+        else:
+            path = os.path.join(self.output_dir, f"{stem}.collapsed")
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in result.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        self.written.append(path)
+        logger.info(f"{name} took {seconds * 1000:.0f} ms; profile written to {path}")
+
+
+def profile_requests(server: Server, profiler: Profiler) -> None:
+    """Profiles every tool call, resource read and prompt request handled by ``server``."""
+    for request_type in (types.CallToolRequest, types.ReadResourceRequest, types.GetPromptRequest):
+        handler = server.request_handlers.get(request_type)
+        if handler is None:
+            continue
+
+        async def profiled(request, handler=handler):
+            name = getattr(request.params, "name", None) or str(getattr(request.params, "uri", ""))
+            with profiler.profile(f"{request.method}-{name}"):
+                return await handler(request)
+
+        server.request_handlers[request_type] = profiled
@@ -0,0 +1,233 @@
+import asyncio
+import atexit
+import fnmatch
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from ..logger import setup_logger
+from .documents import DocumentManager, VersionConflict
+
+logger = setup_logger(__name__)
+
+# (position, length, text), as taken by DocumentManager.apply_edits
+Edit = tuple[int, int, str]
+
+
+@lru_cache(maxsize=32)
+def compile_pattern(pattern: str, regex: bool, ignore_case: bool) -> Optional[re.Pattern]:
+    """The compiled pattern, or None for a case-sensitive literal, which is searched with ``str.find``."""
+    if not pattern:
+        raise ValueError("The pattern must not be empty")
+    if not regex and not ignore_case:
+        return None
+    try:
+        return re.compile(pattern if regex else re.escape(pattern), re.IGNORECASE if ignore_case else 0)
+    except re.error as e:
+        raise ValueError(f"Invalid regular expression {pattern!r}: {e}") from None
+
+
+def find_edits(text: str, pattern: str, replacement: str, regex: bool = False, ignore_case: bool = False) -> list[Edit]:
+    """
+    Edits replacing every non-overlapping match in ``text``, left to right,
+    with the same matches as ``str.replace`` or ``re.sub``. For regular
+    expressions, ``replacement`` may refer to groups (``\\1``, ``\\g<name>``).
+    """
+    compiled = compile_pattern(pattern, regex, ignore_case)
+    if compiled is None:
+        edits = []
+        i = text.find(pattern)
+        while i != -1:
+            edits.append((i, len(pattern), replacement))
+            i = text.find(pattern, i + len(pattern))
+        return edits
+    if regex:
+        return [(m.start(), m.end() - m.start(), m.expand(replacement)) for m in compiled.finditer(text)]
+    return [(m.start(), m.end() - m.start(), replacement) for m in compiled.finditer(text)]
+
+
+def _scan_shard(
+    documents: list[tuple[str, str]], pattern: str, replacement: str, regex: bool, ignore_case: bool
+) -> list[tuple[str, list[Edit]]]:
+    """Runs in a worker process: the edits for each document of the shard that has matches."""
+    results = []
+    for doc_id, text in documents:
+        edits = find_edits(text, pattern, replacement, regex, ignore_case)
+        if edits:
+            results.append((doc_id, edits))
+    return results
+
+
+@dataclass
+class CorpusReplaceResult:
+    documents_scanned: int = 0
+    # doc_id -> (replacements, version after the edit, or the current version in a dry run)
+    matches: dict[str, tuple[int, int]] = field(default_factory=dict)
+    parallel: bool = False
+
+    @property
+    def total_replacements(self) -> int:
+        return sum(count for count, _version in self.matches.values())
+
+
+class CorpusReplacer:
+    """
+    Find and replace across every document whose ID matches a glob.
+
+    Documents are read in batches of about ``batch_size`` characters, and
+    only while earlier batches are being scanned, so the corpus is never held
+    in memory at once. Scanning runs off the event loop: in a worker thread,
+    or for corpora of at least ``parallel_threshold`` bytes (UTF-8, as
+    stored) in a pool of ``workers`` processes, with at most two batches per
+    worker queued at a time. Workers only compute edits against the text they were given; the
+    edits are then applied in the server process, one new version per
+    document, using compare-and-swap on the version that was scanned: a
+    document edited while the scan ran is scanned again until its text holds
+    still, so every document is either fully replaced or left as it was. The
+    edits go to the store as one batch, whose sync runs off the event loop.
+    """
+
+    def __init__(
+        self,
+        documents: DocumentManager,
+        workers: int = 4,
+        parallel_threshold: int = 16 * 1024 * 1024,
+        batch_size: int = 1024 * 1024,
+    ):
+        self.documents = documents
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        self.batch_size = batch_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            atexit.register(self.close)
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def select(self, doc_glob: str = "*") -> list[str]:
+        return [doc_id for doc_id in self.documents.ids() if fnmatch.fnmatchcase(doc_id, doc_glob)]
+
+    def _batches(self, doc_ids: list[str], versions: dict[str, int]) -> Iterator[list[tuple[str, str]]]:
+        """
+        Reads the documents in batches of about ``batch_size`` characters,
+        recording the version each one was read at in ``versions``.
+        """
+        batch: list[tuple[str, str]] = []
+        size = 0
+        for doc_id in doc_ids:
+            if doc_id not in self.documents:
+                continue  # deleted since it was selected
+            versions[doc_id] = self.documents.version(doc_id)
+            text = self.documents.read(doc_id)
+            batch.append((doc_id, text))
+            size += len(text)
+            if size >= self.batch_size:
+                yield batch
+                batch, size = [], 0
+        if batch:
+            yield batch
+
+    async def _scan(
+        self,
+        doc_ids: list[str],
+        versions: dict[str, int],
+        pattern: str,
+        replacement: str,
+        regex: bool,
+        ignore_case: bool,
+    ) -> tuple[list[tuple[str, list[Edit]]], bool]:
+        found: list[tuple[str, list[Edit]]] = []
+        args = (pattern, replacement, regex, ignore_case)
+        total = sum(self.documents.store.size_of(doc_id) for doc_id in doc_ids if doc_id in self.documents)
+        if self.workers <= 1 or total < self.parallel_threshold or len(doc_ids) < 2:
+            # A thread keeps a slow regular expression from stalling the event loop.
+            for batch in self._batches(doc_ids, versions):
+                found += await asyncio.to_thread(_scan_shard, batch, *args)
+            return found, False
+
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        pending: set[asyncio.Future] = set()
+        try:
+            for batch in self._batches(doc_ids, versions):
+                if len(pending) >= self.workers * 2:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    found += [item for future in done for item in future.result()]
+                pending.add(loop.run_in_executor(pool, _scan_shard, batch, *args))
+            for future in asyncio.as_completed(pending):
+                found += await future
+        finally:
+            for future in pending:
+                future.cancel()
+        return found, True
+
+    async def _rescan(self, doc_id: str, pattern: str, replacement: str, regex: bool, ignore_case: bool) -> list[Edit]:
+        """Scans the current text in a thread and applies the edits, starting over if it changes meanwhile."""
+        while True:
+            version = self.documents.version(doc_id)
+            edits = await asyncio.to_thread(find_edits, self.documents.read(doc_id), pattern, replacement, regex, ignore_case)
+            try:
+                self.documents.apply_edits(doc_id, edits, expected_version=version)
+                return edits
+            except VersionConflict:
+                continue
+
+    async def replace(
+        self,
+        pattern: str,
+        replacement: str,
+        doc_glob: str = "*",
+        regex: bool = False,
+        ignore_case: bool = False,
+        dry_run: bool = False,
+    ) -> CorpusReplaceResult:
+        compile_pattern(pattern, regex, ignore_case)  # fail before reading the corpus
+
+        doc_ids = self.select(doc_glob)
+        versions: dict[str, int] = {}
+        found, parallel = await self._scan(doc_ids, versions, pattern, replacement, regex, ignore_case)
+
+        result = CorpusReplaceResult(documents_scanned=len(doc_ids), parallel=parallel)
+        if dry_run:
+            for doc_id, edits in found:
+                result.matches[doc_id] = (len(edits), versions[doc_id])
+        else:
+            conflicts = set(
+                self.documents.apply_edits_many(
+                    [(doc_id, edits, versions[doc_id]) for doc_id, edits in found], durable=False
+                )
+            )
+            for doc_id, edits in found:
+                if doc_id not in conflicts:
+                    result.matches[doc_id] = (len(edits), self.documents.version(doc_id))
+            await asyncio.to_thread(self.documents.sync)
+
+            # Edited during the scan: scan the current text again.
+            for doc_id in conflicts:
+                edits = await self._rescan(doc_id, pattern, replacement, regex, ignore_case)
+                if edits:
+                    result.matches[doc_id] = (len(edits), self.documents.version(doc_id))
+
+            # Documents without a match during the scan may have gained one since.
+            for doc_id, version in versions.items():
+                if doc_id in result.matches or doc_id not in self.documents:
+                    continue
+                if self.documents.version(doc_id) != version:
+                    edits = await self._rescan(doc_id, pattern, replacement, regex, ignore_case)
+                    if edits:
+                        result.matches[doc_id] = (len(edits), self.documents.version(doc_id))
+
+        logger.info(
+            f"{'Dry run: ' if dry_run else ''}{pattern!r} matched {result.total_replacements} times in "
+            f"{len(result.matches)} of {len(doc_ids)} documents{' (process pool)' if parallel else ''}"
+        )
+        return result
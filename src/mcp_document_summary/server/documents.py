@@ -0,0 +1,420 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from .history import Edit, EditHistory, Revision, diff_edit, reverse_edits
+from .matcher import AhoCorasick, piece_chunks
+from .offsets import OffsetIndex
+from .storage import DocumentStore, utf8_size
+from .text_buffer import PieceTable
+
+
+class VersionConflict(ValueError):
+    """Raised when an edit expects a document version other than the current one."""
+
+    def __init__(self, doc_id: str, expected: int, current: int):
+        super().__init__(
+            f"Doc {doc_id} is at version {current}, not {expected}; read it again and retry the edit"
+        )
+        self.doc_id = doc_id
+        self.expected = expected
+        self.current = current
+
+
+class _Snapshot:
+    """A version of a document and, once needed, its offset index."""
+
+    __slots__ = ("buffer", "offsets")
+
+    def __init__(self, buffer: PieceTable):
+        self.buffer = buffer
+        self.offsets: Optional[OffsetIndex] = None
+
+
+class DocumentManager:
+    """
+    Editing layer between the server tools and the document store.
+
+    Documents being edited are held as piece tables so an edit only touches
+    the affected range. The edits, not the whole text, are written to the
+    store before the edit returns, so an edit that succeeded survives a
+    crash; if the write fails, the buffer is restored and the edit is not
+    applied.
+
+    Every change creates a new version and is recorded in an ``EditHistory``
+    as a reverse delta, so the last ``max_history`` versions can still be
+    read, reverted to or undone while newer edits land. Edits may pass
+    ``expected_version`` to apply only if nobody else edited the document
+    since it was read. Tools run one at a time on the server's event loop,
+    so the check and the edit are atomic without any locking.
+    """
+
+    # Rebuilt old versions kept for repeated reads, e.g. paging through one snapshot
+    MAX_CACHED_VIEWS = 8
+
+    def __init__(
+        self,
+        store: DocumentStore,
+        max_open_buffers: int = 256,
+        max_history: int = 1000,
+        checkpoint_interval: int = 16,
+    ):
+        self.store = store
+        self.max_open_buffers = max_open_buffers
+        self.history = EditHistory(max_history, checkpoint_interval)
+        self._buffers: OrderedDict[str, PieceTable] = OrderedDict()
+        self._views: OrderedDict[tuple[str, int], _Snapshot] = OrderedDict()
+        self._offsets: dict[str, OffsetIndex] = {}
+        self._listeners: list[Callable[[str], None]] = []
+        # Time of the latest change to each document made through this manager
+        self._modified: dict[str, float] = {}
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._buffers or doc_id in self.store
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Registers a callback invoked with the document ID after every change."""
+        self._listeners.append(listener)
+
+    def ids(self) -> list[str]:
+        return list(self.store)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "documents": len(self.store),
+            "open_buffers": len(self._buffers),
+            "cached_views": len(self._views),
+            "revisions": sum(len(self.history.revisions(doc_id)) for doc_id in self._modified),
+        }
+
+    def info(self, doc_id: str) -> dict:
+        """
+        Listing metadata: size in UTF-8 bytes, version, and the time of the
+        latest change, or None if the document has not changed since it was
+        loaded.
+        """
+        return {
+            "id": doc_id,
+            "size": self.store.size_of(doc_id),
+            "version": self.version(doc_id),
+            "modified": self._modified.get(doc_id),
+        }
+
+    def version(self, doc_id: str) -> int:
+        """
+        Returns the document's version, which starts at 1 and increases with
+        every change. The store keeps it, so it survives a restart.
+        """
+        return self.store.version_of(doc_id)
+
+    def buffer(self, doc_id: str) -> PieceTable:
+        """Returns the editable buffer for a document, loading it on first use."""
+        buffer = self._buffers.get(doc_id)
+        if buffer is None:
+            buffer = PieceTable(self.store[doc_id])
+            self._buffers[doc_id] = buffer
+            self._evict()
+        else:
+            self._buffers.move_to_end(doc_id)
+        return buffer
+
+    def offsets(self, doc_id: str) -> OffsetIndex:
+        """Returns the document's offset index, building it on first use."""
+        buffer = self.buffer(doc_id)
+        index = self._offsets.get(doc_id)
+        if index is None:
+            index = OffsetIndex(buffer.text())
+            self._offsets[doc_id] = index
+        return index
+
+    # Versions
+
+    def _check_version(self, doc_id: str, expected_version: Optional[int]) -> None:
+        if expected_version is not None and expected_version != self.version(doc_id):
+            raise VersionConflict(doc_id, expected_version, self.version(doc_id))
+
+    def snapshot(self, doc_id: str, version: Optional[int] = None) -> tuple[int, PieceTable]:
+        """
+        Returns a read-only view of the document at ``version`` (default: the
+        current one) together with that version number. Later edits do not
+        change the view.
+        """
+        version, view = self._view(doc_id, version)
+        return version, view.buffer
+
+    def _view(self, doc_id: str, version: Optional[int]) -> tuple[int, _Snapshot]:
+        current = self.version(doc_id)
+        if version is None or version == current:
+            return current, _Snapshot(self.buffer(doc_id).snapshot())
+
+        view = self._views.get((doc_id, version))
+        if view is None:
+            view = _Snapshot(self.history.reconstruct(doc_id, version, current, self.buffer(doc_id)))
+            self._views[(doc_id, version)] = view
+            while len(self._views) > self.MAX_CACHED_VIEWS:
+                self._views.popitem(last=False)
+        else:
+            self._views.move_to_end((doc_id, version))
+        return version, view
+
+    def _view_offsets(self, doc_id: str, version: int, view: _Snapshot) -> OffsetIndex:
+        if version == self.version(doc_id):
+            return self.offsets(doc_id)
+        if view.offsets is None:
+            view.offsets = OffsetIndex(view.buffer.text())
+        return view.offsets
+
+    # Reads
+
+    def length(self, doc_id: str, unit: str = "char", version: Optional[int] = None) -> int:
+        """Length of the document in characters or UTF-8 bytes."""
+        version, view = self._view(doc_id, version)
+        if unit == "char":
+            return len(view.buffer)
+        return self._view_offsets(doc_id, version, view).byte_length(view.buffer.slice)
+
+    def count(self, doc_id: str, unit: str, version: Optional[int] = None) -> int:
+        """Number of lines, paragraphs or sections in the document."""
+        version, view = self._view(doc_id, version)
+        return self._view_offsets(doc_id, version, view).count(unit)
+
+    def read_range(
+        self, doc_id: str, start: int, length: int, unit: str = "char", version: Optional[int] = None
+    ) -> tuple[int, int, str]:
+        """
+        Reads ``length`` characters (or UTF-8 bytes) from ``start`` and returns
+        the character range actually read along with its text. Byte offsets
+        are rounded down to character boundaries. ``version`` reads an
+        earlier version that is still kept.
+        """
+        if start < 0 or length < 0:
+            raise ValueError("Offset and length must not be negative")
+
+        version, view = self._view(doc_id, version)
+        buffer = view.buffer
+        if unit == "byte":
+            index = self._view_offsets(doc_id, version, view)
+            begin = index.char_offset(start, buffer.slice)
+            end = index.char_offset(start + length, buffer.slice)
+        elif unit == "char":
+            begin = min(start, len(buffer))
+            end = min(start + length, len(buffer))
+        else:
+            raise ValueError(f"Unknown unit {unit!r}; expected 'char' or 'byte'")
+
+        return begin, end, buffer.slice(begin, end)
+
+    def read_units(
+        self, doc_id: str, unit: str, start: int, count: int = 1, version: Optional[int] = None
+    ) -> tuple[int, int, str]:
+        """Reads ``count`` lines, paragraphs or sections from index ``start``."""
+        version, view = self._view(doc_id, version)
+        begin, end = self._view_offsets(doc_id, version, view).span(unit, start, count)
+        return begin, end, view.buffer.slice(begin, end)
+
+    def read(self, doc_id: str, version: Optional[int] = None) -> str:
+        if version is not None and version != self.version(doc_id):
+            return self._view(doc_id, version)[1].buffer.text()
+
+        buffer = self._buffers.get(doc_id)
+        if buffer is None:
+            return self.store[doc_id]
+        return buffer.text()
+
+    # Edits
+
+    def replace(self, doc_id: str, old: str, new: str, expected_version: Optional[int] = None) -> int:
+        """Replaces every occurrence of ``old`` and returns how many were replaced."""
+        if not old:
+            raise ValueError("The string to replace must not be empty")
+        self._check_version(doc_id, expected_version)
+
+        positions = list(self.buffer(doc_id).find_all(old))
+        self.apply_edits(doc_id, [(pos, len(old), new) for pos in positions])
+        return len(positions)
+
+    def replace_many(
+        self, doc_id: str, replacements: list[tuple[str, str]], expected_version: Optional[int] = None
+    ) -> list[int]:
+        """
+        Applies several replacements in a single pass and returns the number
+        of replacements made for each pair.
+
+        Matching runs against the text as it was before the call, leftmost
+        match first and the longest pattern among matches at the same
+        position. Inserted text is never rescanned, so pairs cannot cascade
+        (e.g. ``a -> b`` and ``b -> c`` turn "ab" into "bc").
+        """
+        self._check_version(doc_id, expected_version)
+        matcher = AhoCorasick([old for old, _new in replacements])
+        matches = matcher.find_non_overlapping(piece_chunks(self.buffer(doc_id).pieces()))
+
+        counts = [0] * len(replacements)
+        edits = []
+        for start, index in matches:
+            old, new = replacements[index]
+            counts[index] += 1
+            edits.append((start, len(old), new))
+
+        self.apply_edits(doc_id, edits)
+        return counts
+
+    def apply_edits(
+        self, doc_id: str, edits: list[tuple[int, int, str]], expected_version: Optional[int] = None
+    ) -> None:
+        """
+        Applies ``(position, length, text)`` edits given in ascending,
+        non-overlapping positions of the current text, as one new version.
+        Raises ``VersionConflict`` if ``expected_version`` is given and is
+        not the current version.
+        """
+        self._check_version(doc_id, expected_version)
+        revision = self._apply(doc_id, edits, "edit")
+        if revision is not None:
+            self.history.push_undo(doc_id, revision)
+
+    def apply_edits_many(self, items: Iterable[tuple[str, list[Edit], int]], durable: bool = True) -> list[str]:
+        """
+        Applies ``(doc_id, edits, expected_version)`` items, each as a new
+        version of its document, and writes them to the store as one batch.
+        Documents that are no longer at their expected version are left as
+        they are and their IDs returned. If the write fails, none of the
+        edits are applied.
+
+        With ``durable=False`` the batch is written but not synced yet, so the
+        caller can run ``sync`` off the event loop; reads see the new versions
+        meanwhile.
+        """
+        conflicts = []
+        applied: list[tuple[str, list[Edit], list[Edit]]] = []
+        batch = []
+        try:
+            for doc_id, edits, expected_version in items:
+                if self.version(doc_id) != expected_version:
+                    conflicts.append(doc_id)
+                elif edits:
+                    reverse, size = self._edit_buffer(doc_id, edits)
+                    applied.append((doc_id, edits, reverse))
+                    batch.append((doc_id, edits, size))
+            self.store.apply_edits_many(batch, durable=durable)
+        except BaseException:
+            # The store still has the old text; buffers evicted meanwhile cannot be reverted in place.
+            for doc_id, _edits, _reverse in applied:
+                self._buffers.pop(doc_id, None)
+                self._offsets.pop(doc_id, None)
+            raise
+
+        for doc_id, edits, reverse in applied:
+            self.history.push_undo(doc_id, self._record(doc_id, edits, reverse, "edit"))
+        return conflicts
+
+    def put_many(self, items: Iterable[tuple[str, str]]) -> list[str]:
+        """
+        Writes whole documents, e.g. freshly imported files, and returns the
+        IDs of the ones that did not exist yet. New documents go to the store
+        in one batch; an existing document whose text differs gets a new
+        version, which can be undone like any edit.
+        """
+        added = []
+        for doc_id, text in items:
+            if doc_id in self:
+                revision = self._apply(doc_id, diff_edit(self.read(doc_id), text), "ingest")
+                if revision is not None:
+                    self.history.push_undo(doc_id, revision)
+            else:
+                added.append((doc_id, text))
+
+        self.store.put_many(added)
+        now = time.time()
+        for doc_id, _text in added:
+            self._modified[doc_id] = now
+            for listener in self._listeners:
+                listener(doc_id)
+        return [doc_id for doc_id, _text in added]
+
+    def undo(self, doc_id: str, expected_version: Optional[int] = None) -> int:
+        """Reverts the latest edit that has not been undone, as a new version, and returns it."""
+        self._check_version(doc_id, expected_version)
+        revision = self.history.pop_undo(doc_id)
+        if revision is None:
+            raise ValueError(f"Nothing to undo in doc {doc_id}")
+        self._apply(doc_id, revision.reverse, "undo")
+        self.history.push_redo(doc_id, revision)
+        return self.version(doc_id)
+
+    def redo(self, doc_id: str, expected_version: Optional[int] = None) -> int:
+        """Applies the most recently undone edit again, as a new version, and returns it."""
+        self._check_version(doc_id, expected_version)
+        undone = self.history.pop_redo(doc_id)
+        if undone is None:
+            raise ValueError(f"Nothing to redo in doc {doc_id}")
+        revision = self._apply(doc_id, undone.edits, "redo")
+        if revision is not None:
+            self.history.push_undo(doc_id, revision, clear_redo=False)
+        return self.version(doc_id)
+
+    def revert_to_version(self, doc_id: str, version: int, expected_version: Optional[int] = None) -> int:
+        """Restores the text of an earlier version as a new version, and returns it."""
+        self._check_version(doc_id, expected_version)
+        old = self._view(doc_id, version)[1].buffer.text()
+        revision = self._apply(doc_id, diff_edit(self.buffer(doc_id).text(), old), "revert")
+        if revision is not None:
+            self.history.push_undo(doc_id, revision)
+        return self.version(doc_id)
+
+    def _apply(self, doc_id: str, edits: list[tuple[int, int, str]], kind: str) -> Optional[Revision]:
+        if not edits:
+            return None
+
+        reverse, size = self._edit_buffer(doc_id, edits)
+        try:
+            self.store.apply_edits(doc_id, edits, size)
+        except BaseException:
+            self._edit_buffer(doc_id, reverse)
+            raise
+        return self._record(doc_id, edits, reverse, kind)
+
+    def _edit_buffer(self, doc_id: str, edits: list[Edit]) -> tuple[list[Edit], int]:
+        """Edits the buffer only; returns the reverse edits and the new size in UTF-8 bytes."""
+        buffer = self.buffer(doc_id)
+        removed = [buffer.slice(pos, pos + length) for pos, length, _text in edits]
+        size = (
+            self.store.size_of(doc_id)
+            + sum(utf8_size(text) for _pos, _length, text in edits)
+            - sum(utf8_size(text) for text in removed)
+        )
+        # Right to left so earlier positions stay valid.
+        for pos, length, text in reversed(edits):
+            buffer.replace_range(pos, length, text)
+        return reverse_edits(edits, removed), size
+
+    def _record(self, doc_id: str, edits: list[Edit], reverse: list[Edit], kind: str) -> Revision:
+        """Brings the offset index and history up to date with edits the store has, and notifies listeners."""
+        buffer = self.buffer(doc_id)
+        index = self._offsets.get(doc_id)
+        if index is not None:
+            index.update(edits, buffer.slice)
+
+        self._modified[doc_id] = time.time()
+        revision = Revision(self.version(doc_id), kind, list(edits), reverse)
+        self.history.record(doc_id, revision, buffer)
+
+        for listener in self._listeners:
+            listener(doc_id)
+        return revision
+
+    def _evict(self) -> None:
+        while len(self._buffers) > self.max_open_buffers:
+            doc_id, _buffer = self._buffers.popitem(last=False)
+            self._offsets.pop(doc_id, None)
+
+    def sync(self) -> None:
+        """Makes every edit so far durable. Safe to call from another thread."""
+        self.store.sync()
+
+    def flush(self) -> None:
+        self.store.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.store.close()
@@ -0,0 +1,157 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .text_buffer import PieceTable
+
+# (position, length, text): replace ``length`` characters at ``position`` with ``text``
+Edit = tuple[int, int, str]
+
+
+def reverse_edits(edits: list[Edit], removed: list[str]) -> list[Edit]:
+    """
+    Given edits in ascending positions of the old text and the text each one
+    removed, returns the edits that turn the new text back into the old one,
+    in ascending positions of the new text.
+    """
+    reverse = []
+    shift = 0
+    for (pos, length, text), old in zip(edits, removed):
+        reverse.append((pos + shift, len(text), old))
+        shift += len(text) - length
+    return reverse
+
+
+def diff_edit(old: str, new: str) -> list[Edit]:
+    """A single edit turning ``old`` into ``new``, covering only the range that differs."""
+    limit = min(len(old), len(new))
+    lo, hi = 0, limit
+    # Binary search on slice comparisons keeps the scanning in C.
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = lo
+
+    lo, hi = 0, limit - prefix
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid :] == new[len(new) - mid :]:
+            lo = mid
+        else:
+            hi = mid - 1
+    suffix = lo
+
+    if prefix == len(old) == len(new):
+        return []
+    return [(prefix, len(old) - prefix - suffix, new[prefix : len(new) - suffix])]
+
+
+@dataclass
+class Revision:
+    version: int  # the version this revision produced
+    kind: str  # "edit", "undo", "redo", "revert" or "ingest"
+    edits: list[Edit]  # forward edits, in positions of version - 1
+    reverse: list[Edit]  # edits back to version - 1, in positions of version
+    timestamp: float = field(default_factory=time.time)
+    # Full view of the document at ``version``, kept every few revisions
+    checkpoint: Optional[PieceTable] = None
+
+    @property
+    def inserted(self) -> int:
+        return sum(len(text) for _pos, _length, text in self.edits)
+
+    @property
+    def removed(self) -> int:
+        return sum(length for _pos, length, _text in self.edits)
+
+
+class EditHistory:
+    """
+    Per-document revision log with undo and redo.
+
+    Each revision stores its forward edits and the reverse edits that undo
+    it, so memory grows with the size of the edits rather than the size of
+    the document. Every ``checkpoint_interval`` versions the revision also
+    keeps a piece-table snapshot, which shares all unchanged pieces with the
+    live document. Rebuilding an old version starts from the nearest later
+    checkpoint, or from the current text, and replays at most
+    ``checkpoint_interval`` reverse deltas.
+
+    Undo and redo are recorded as new revisions, so versions only increase
+    and readers of earlier versions are unaffected.
+    """
+
+    def __init__(self, max_revisions: int = 1000, checkpoint_interval: int = 16):
+        if checkpoint_interval < 1:
+            raise ValueError("checkpoint_interval must be at least 1")
+        self.max_revisions = max_revisions
+        self.checkpoint_interval = checkpoint_interval
+        self._revisions: dict[str, deque[Revision]] = {}
+        self._undo: dict[str, deque[Revision]] = {}
+        self._redo: dict[str, list[Revision]] = {}
+
+    def record(self, doc_id: str, revision: Revision, document: PieceTable) -> None:
+        """Adds ``revision`` after it has been applied to ``document``."""
+        if revision.version % self.checkpoint_interval == 0:
+            revision.checkpoint = document.snapshot()
+        self._revisions.setdefault(doc_id, deque(maxlen=self.max_revisions)).append(revision)
+
+    def revisions(self, doc_id: str) -> list[Revision]:
+        return list(self._revisions.get(doc_id, ()))
+
+    def oldest_version(self, doc_id: str, current_version: int) -> int:
+        revisions = self._revisions.get(doc_id)
+        return revisions[0].version - 1 if revisions else current_version
+
+    def reconstruct(self, doc_id: str, version: int, current_version: int, current: PieceTable) -> PieceTable:
+        """Returns a piece table holding the document as it was at ``version``."""
+        oldest = self.oldest_version(doc_id, current_version)
+        if not oldest <= version <= current_version:
+            raise ValueError(
+                f"Version {version} of doc {doc_id} is not available; "
+                f"versions {oldest} to {current_version} can be read"
+            )
+
+        revisions = self._revisions.get(doc_id, deque())
+        # Versions are consecutive, so a revision's index follows from its version.
+        first = version + 1 - revisions[0].version if revisions else 0
+        end = len(revisions)
+        start = current
+        for i in range(first, len(revisions)):
+            if revisions[i].checkpoint is not None:
+                start, end = revisions[i].checkpoint, i + 1
+                break
+
+        document = start.snapshot()
+        for revision in reversed([revisions[i] for i in range(first, end)]):
+            for pos, length, text in reversed(revision.reverse):
+                document.replace_range(pos, length, text)
+        return document
+
+    # Undo and redo stacks
+
+    def push_undo(self, doc_id: str, revision: Revision, clear_redo: bool = True) -> None:
+        self._undo.setdefault(doc_id, deque(maxlen=self.max_revisions)).append(revision)
+        if clear_redo:
+            self._redo.pop(doc_id, None)
+
+    def pop_undo(self, doc_id: str) -> Optional[Revision]:
+        stack = self._undo.get(doc_id)
+        return stack.pop() if stack else None
+
+    def push_redo(self, doc_id: str, revision: Revision) -> None:
+        self._redo.setdefault(doc_id, []).append(revision)
+
+    def pop_redo(self, doc_id: str) -> Optional[Revision]:
+        stack = self._redo.get(doc_id)
+        return stack.pop() if stack else None
+
+    def can_undo(self, doc_id: str) -> bool:
+        return bool(self._undo.get(doc_id))
+
+    def can_redo(self, doc_id: str) -> bool:
+        return bool(self._redo.get(doc_id))
@@ -0,0 +1,342 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from ..config import settings
+from ..logger import setup_logger
+from .documents import DocumentManager
+
+logger = setup_logger(__name__)
+
+# (doc_id, path, size, mtime_ns, content hash of the ingested copy or None)
+Job = tuple[str, str, int, int, Optional[str]]
+# (doc_id, size, mtime_ns, content hash, text or None if unchanged, error or None)
+Extracted = tuple[str, int, int, str, Optional[str], Optional[str]]
+# (path relative to the root, path, size, mtime_ns)
+Listed = tuple[str, str, int, int]
+
+
+def _plain_text(data: bytes) -> str:
+    return data.decode("utf-8-sig", errors="replace")
+
+
+def _pdf_text(data: bytes) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ValueError("PDF files need the optional pypdf package (pip install pypdf)") from None
+
+    reader = PdfReader(io.BytesIO(data))
+    return "\n\n".join((page.extract_text() or "").strip() for page in reader.pages)
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _docx_text(data: bytes) -> str:
+    """Paragraphs of a Word document, with headings as markdown headings so sections can be read."""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        root = ET.fromstring(archive.read("word/document.xml"))
+
+    paragraphs = []
+    for paragraph in root.iter(f"{_W}p"):
+        parts = []
+        for element in paragraph.iter():
+            if element.tag == f"{_W}t":
+                parts.append(element.text or "")
+            elif element.tag == f"{_W}tab":
+                parts.append("\t")
+            elif element.tag in (f"{_W}br", f"{_W}cr"):
+                parts.append("\n")
+        text = "".join(parts).strip()
+        if not text:
+            continue
+
+        style = paragraph.find(f"{_W}pPr/{_W}pStyle")
+        name = style.get(f"{_W}val", "") if style is not None else ""
+        if name.lower().startswith("heading") and name[7:].isdigit():
+            text = "#" * min(int(name[7:]), 6) + " " + text
+        elif name.lower() == "title":
+            text = "# " + text
+        paragraphs.append(text)
+    return "\n\n".join(paragraphs)
+
+
+# Text extractors by file suffix; files with other suffixes are not ingested
+EXTRACTORS: dict[str, Callable[[bytes], str]] = {
+    ".md": _plain_text,
+    ".markdown": _plain_text,
+    ".txt": _plain_text,
+    ".pdf": _pdf_text,
+    ".docx": _docx_text,
+}
+
+
+def extract_text(name: str, data: bytes) -> str:
+    extractor = EXTRACTORS.get(os.path.splitext(name)[1].lower())
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: {name}")
+    return extractor(data)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _extract_batch(jobs: list[Job]) -> list[Extracted]:
+    """Runs in a worker process: reads each file and extracts its text unless its content is unchanged."""
+    results = []
+    for doc_id, path, size, mtime_ns, known in jobs:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = content_hash(data)
+            text = None if digest == known else extract_text(path, data)
+            results.append((doc_id, size, mtime_ns, digest, text, None))
+        except Exception as e:
+            results.append((doc_id, size, mtime_ns, "", None, str(e) or type(e).__name__))
+    return results
+
+
+def walk(root: str) -> Iterator[tuple[str, os.DirEntry]]:
+    """Ingestible files under ``root`` as (path relative to root, entry); hidden entries are skipped."""
+    stack = [""]
+    while stack:
+        relative = stack.pop()
+        with os.scandir(os.path.join(root, relative)) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.name.startswith("."):
+                    continue
+                path = f"{relative}/{entry.name}" if relative else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(path)
+                elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in EXTRACTORS:
+                    yield path, entry
+
+
+def _listing(root: str, chunk: int) -> Iterator[list[Listed]]:
+    """The files ``walk`` finds, with their size and modification time, ``chunk`` at a time."""
+    files: list[Listed] = []
+    for relative, entry in walk(root):
+        stat = entry.stat()
+        files.append((relative, entry.path, stat.st_size, stat.st_mtime_ns))
+        if len(files) >= chunk:
+            yield files
+            files = []
+    if files:
+        yield files
+
+
+@dataclass
+class IngestResult:
+    files: int = 0
+    added: list[str] = field(default_factory=list)
+    updated: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    failed: dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def summary(self, max_failures: int = 20) -> dict:
+        return {
+            "files": self.files,
+            "added": len(self.added),
+            "updated": len(self.updated),
+            "unchanged": self.unchanged,
+            "failed": len(self.failed),
+            "failures": dict(list(self.failed.items())[:max_failures]),
+            "seconds": round(self.seconds, 3),
+        }
+
+
+class Ingestor:
+    """
+    Imports a directory of markdown, text, PDF and Word files as documents.
+
+    Each file becomes the document named by its path relative to the
+    directory (plus an optional prefix). Files are read and converted to
+    text by a pool of ``workers`` processes, in batches of up to
+    ``batch_files`` files or ``batch_bytes`` bytes, with at most two batches
+    per worker in flight, so memory stays bounded however large the
+    directory. Each finished batch is written to the store at once.
+
+    The size, modification time and content hash of every ingested file are
+    kept in a manifest (saved to ``manifest_path`` when given). On the next
+    run, files whose size and modification time match are skipped without
+    being read, and files whose content hash matches are not converted again,
+    so edits made to their documents since are kept. A changed file replaces
+    its document as a new version. A file enters the manifest only once its
+    document has been written.
+
+    Walking the directory and writing the manifest happen in a thread, off
+    the event loop.
+    """
+
+    def __init__(
+        self,
+        documents: DocumentManager,
+        manifest_path: Optional[str] = None,
+        workers: int = 4,
+        batch_files: int = 64,
+        batch_bytes: int = 32 * 1024 * 1024,
+        on_added: Optional[Callable[[list[str]], None]] = None,
+    ):
+        self.documents = documents
+        self.manifest_path = manifest_path
+        self.workers = workers
+        self.batch_files = batch_files
+        self.batch_bytes = batch_bytes
+        self.on_added = on_added
+        # doc_id -> (size, mtime_ns, content hash)
+        self.manifest: dict[str, tuple[int, int, str]] = {}
+        if manifest_path and os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                self.manifest = {doc_id: tuple(entry) for doc_id, entry in json.load(f).items()}
+
+    def save_manifest(self) -> None:
+        if not self.manifest_path:
+            return
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        temporary = self.manifest_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(temporary, self.manifest_path)
+
+    async def _batches(self, root: str, prefix: str, result: IngestResult) -> AsyncIterator[list[Job]]:
+        listing = _listing(root, self.batch_files)
+        batch: list[Job] = []
+        size = 0
+        while True:
+            files = await asyncio.to_thread(next, listing, None)
+            if files is None:
+                break
+            for relative, path, file_size, mtime_ns in files:
+                result.files += 1
+                doc_id = prefix + relative
+                known = self.manifest.get(doc_id) if doc_id in self.documents else None
+                if known is not None and known[:2] == (file_size, mtime_ns):
+                    result.unchanged += 1
+                    continue
+
+                batch.append((doc_id, path, file_size, mtime_ns, known[2] if known else None))
+                size += file_size
+                if len(batch) >= self.batch_files or size >= self.batch_bytes:
+                    yield batch
+                    batch, size = [], 0
+        if batch:
+            yield batch
+
+    def _store(self, extracted: list[Extracted], result: IngestResult) -> None:
+        items = []
+        entries = {}
+        for doc_id, size, mtime_ns, digest, text, error in extracted:
+            if error is not None:
+                result.failed[doc_id] = error
+                continue
+            entries[doc_id] = (size, mtime_ns, digest)
+            if text is None:
+                result.unchanged += 1
+            else:
+                items.append((doc_id, text))
+
+        added = self.documents.put_many(items)
+        # Only now, so a failed write leaves the files to be imported again on the next run.
+        self.manifest.update(entries)
+        new = set(added)
+        result.added.extend(added)
+        result.updated.extend(doc_id for doc_id, _text in items if doc_id not in new)
+        if added and self.on_added is not None:
+            self.on_added(added)
+
+    async def ingest(self, root: str, prefix: str = "") -> IngestResult:
+        if not os.path.isdir(root):
+            raise ValueError(f"Directory {root} not found")
+
+        start = time.perf_counter()
+        result = IngestResult()
+        loop = asyncio.get_running_loop()
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        pending: set[asyncio.Future] = set()
+
+        async def store_finished(limit: int) -> None:
+            nonlocal pending
+            while len(pending) > limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    self._store(future.result(), result)
+
+        try:
+            async for batch in self._batches(root, prefix, result):
+                pending.add(loop.run_in_executor(pool, _extract_batch, batch))
+                await store_finished(max(self.workers, 1) * 2 - 1)
+            await store_finished(0)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            await asyncio.to_thread(self.save_manifest)
+
+        result.seconds = time.perf_counter() - start
+        logger.info(
+            f"Ingested {root}: {result.files} files, {len(result.added)} added, {len(result.updated)} updated, "
+            f"{result.unchanged} unchanged, {len(result.failed)} failed in {result.seconds:.2f}s"
+        )
+        return result
+
+
+def default_manifest_path() -> Optional[str]:
+    """Where the ingest manifest is kept: next to the on-disk document store, or nowhere for the memory store."""
+    if settings.ingest_manifest_path:
+        return settings.ingest_manifest_path
+    if settings.document_store_path:
+        return os.path.join(settings.document_store_path, "ingest-manifest.json")
+    return None
+
+
+def main(argv=None) -> None:
+    from .storage import StoreLocked, open_store
+
+    parser = argparse.ArgumentParser(description="Import .md, .txt, .pdf and .docx files into the document store")
+    parser.add_argument("directory", help="Directory to import, recursively")
+    parser.add_argument("--prefix", default="", help="Prepended to each file's relative path to form its document ID")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.ingest_workers or os.cpu_count() or 1,
+        help="Processes extracting text (default: INGEST_WORKERS or one per CPU)",
+    )
+    args = parser.parse_args(argv)
+    if not settings.document_store_path:
+        parser.error("Set DOCUMENT_STORE_PATH to the store to import into; the in-memory store is lost on exit")
+
+    try:
+        store = open_store(
+            settings.document_store_path,
+            segment_size=settings.document_store_segment_mb * 1024 * 1024,
+            compact_ratio=settings.document_store_compact_ratio,
+        )
+    except StoreLocked:
+        parser.error(
+            f"{settings.document_store_path} is open in a running server; "
+            "import through its ingest_documents tool, or stop it first"
+        )
+    documents = DocumentManager(store)
+    try:
+        ingestor = Ingestor(documents, manifest_path=default_manifest_path(), workers=args.workers)
+        result = asyncio.run(ingestor.ingest(args.directory, args.prefix))
+    finally:
+        documents.close()
+    print(json.dumps(result.summary(), indent=2))
+    if result.failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import base64
+import binascii
+import fnmatch
+from bisect import bisect_left, bisect_right, insort
+from typing import Optional
+
+from .documents import DocumentManager
+
+# Largest page a client may ask for
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(doc_id: str) -> str:
+    return base64.urlsafe_b64encode(doc_id.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError(f"Invalid cursor {cursor!r}") from None
+
+
+class DocumentListing:
+    """
+    Paginated, filtered listing of the documents with their metadata.
+
+    IDs are kept sorted case-insensitively, built on first use and updated as
+    documents are added, so a page is a binary search plus the entries on it.
+    A cursor names the last ID scanned, so pages stay consistent while
+    documents are added. A prefix narrows the range searched; a glob is
+    checked per ID, and a page stops after scanning ``max_scan`` IDs even if
+    it is not full, so a sparse glob never scans the whole corpus in one
+    request. A page is followed by another while ``next_cursor`` is set.
+    """
+
+    def __init__(self, documents: DocumentManager, max_scan: int = 10_000):
+        self.documents = documents
+        self.max_scan = max_scan
+        self._keys: Optional[list[tuple[str, str]]] = None
+        documents.add_listener(self.document_changed)
+
+    def _sorted(self) -> list[tuple[str, str]]:
+        if self._keys is None:
+            self._keys = sorted((doc_id.lower(), doc_id) for doc_id in self.documents.ids())
+        return self._keys
+
+    def document_changed(self, doc_id: str) -> None:
+        if self._keys is None:
+            return
+        key = (doc_id.lower(), doc_id)
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            insort(self._keys, key)
+
+    def page(
+        self, prefix: str = "", glob: Optional[str] = None, cursor: Optional[str] = None, limit: int = 100
+    ) -> dict:
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"The page size must be between 1 and {MAX_PAGE_SIZE}")
+
+        keys = self._sorted()
+        prefix = prefix.lower()
+        i = bisect_left(keys, (prefix,))
+        if cursor:
+            after = decode_cursor(cursor)
+            i = max(i, bisect_right(keys, (after.lower(), after)))
+
+        entries = []
+        last = None
+        scanned = 0
+        while i < len(keys) and len(entries) < limit and scanned < self.max_scan:
+            key, doc_id = keys[i]
+            if not key.startswith(prefix):
+                i = len(keys)
+                break
+            i += 1
+            scanned += 1
+            last = doc_id
+            if doc_id not in self.documents:
+                continue
+            if glob is None or fnmatch.fnmatchcase(doc_id, glob):
+                entries.append(self.documents.info(doc_id))
+
+        more = i < len(keys) and keys[i][0].startswith(prefix)
+        return {"documents": entries, "next_cursor": encode_cursor(last) if more and last is not None else None}
@@ -0,0 +1,97 @@
+from collections import deque
+from typing import Iterable, Iterator
+
+# Characters fed to the automaton per slice, so huge pieces are never copied whole
+_SCAN_CHUNK = 64 * 1024
+
+
+class AhoCorasick:
+    """
+    Multi-pattern literal matcher.
+
+    All patterns are found in one left-to-right pass over the text,
+    independent of how many patterns there are. ``find_non_overlapping``
+    resolves overlaps leftmost-longest: the match that starts first wins,
+    and among matches starting at the same position the longest wins.
+    """
+
+    def __init__(self, patterns: list[str]):
+        if not patterns:
+            raise ValueError("At least one pattern is required")
+        if any(not p for p in patterns):
+            raise ValueError("Patterns must not be empty")
+        if len(set(patterns)) != len(patterns):
+            raise ValueError("Patterns must be unique")
+
+        self.patterns = patterns
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # Pattern indices recognized on reaching a state, including via fail links
+        self._out: list[tuple[int, ...]] = [()]
+
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] = (index,)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, chunks: Iterable[str]) -> Iterator[tuple[int, int]]:
+        """
+        Yields ``(start, pattern_index)`` for every match, overlapping ones
+        included, in order of match end. ``chunks`` are consecutive slices of
+        one text; matches spanning chunk boundaries are found.
+        """
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        state = 0
+        pos = 0
+
+        for chunk in chunks:
+            for ch in chunk:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                pos += 1
+                if out[state]:
+                    for index in out[state]:
+                        yield pos - len(patterns[index]), index
+
+    def find_non_overlapping(self, chunks: Iterable[str]) -> list[tuple[int, int]]:
+        """Returns leftmost-longest, non-overlapping ``(start, pattern_index)`` matches."""
+        matches = sorted(
+            self.iter_matches(chunks),
+            key=lambda match: (match[0], -len(self.patterns[match[1]])),
+        )
+
+        selected = []
+        next_allowed = 0
+        for start, index in matches:
+            if start >= next_allowed:
+                selected.append((start, index))
+                next_allowed = start + len(self.patterns[index])
+        return selected
+
+
+def piece_chunks(pieces: Iterable[tuple[str, int, int]]) -> Iterator[str]:
+    """Slices ``(source, start, end)`` pieces into bounded chunks for scanning."""
+    for source, start, end in pieces:
+        for offset in range(start, end, _SCAN_CHUNK):
+            yield source[offset : min(end, offset + _SCAN_CHUNK)]
@@ -0,0 +1,192 @@
+import json
+import time
+from bisect import bisect_left
+from typing import Any, Callable
+
+from mcp.server.fastmcp import FastMCP
+from pydantic import AnyUrl, BaseModel
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (kind, name): kind is "tool", "resource" or "prompt"; resources are named by URI template
+Key = tuple[str, str]
+
+
+def payload_bytes(value: Any) -> int:
+    """Approximate size of a request or response payload as UTF-8 JSON."""
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, str):
+        return len(value) if value.isascii() else len(value.encode("utf-8"))
+    if isinstance(value, BaseModel):
+        text = getattr(value, "text", None)
+        if isinstance(text, str):
+            return payload_bytes(text)
+        return len(value.model_dump_json(by_alias=True, exclude_none=True))
+    if hasattr(value, "content") and not isinstance(value, dict):
+        # ReadResourceContents
+        return payload_bytes(value.content)
+    if isinstance(value, dict):
+        return len(json.dumps(value, default=str))
+    if isinstance(value, tuple):
+        # (content, structured content) from a tool; the content already holds the JSON
+        return payload_bytes(value[0])
+    if isinstance(value, list):
+        return sum(payload_bytes(item) for item in value)
+    return len(str(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class ServerMetrics:
+    """
+    Request metrics for the MCP server, rendered in the Prometheus text format.
+
+    Every tool call, resource read and prompt request is counted with its
+    latency (a histogram), request and response payload bytes, and whether it
+    failed. Gauges are read from callbacks when the metrics are rendered, so
+    they cost nothing between scrapes.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: dict[Key, list[int]] = {}
+        self._sums: dict[Key, float] = {}
+        self._errors: dict[Key, int] = {}
+        self._bytes_in: dict[Key, int] = {}
+        self._bytes_out: dict[Key, int] = {}
+        self._gauges: list[Callable[[], dict[str, tuple[str, float]]]] = []
+
+    def observe(self, kind: str, name: str, seconds: float, bytes_in: int = 0, bytes_out: int = 0, error: bool = False) -> None:
+        key = (kind, name)
+        counts = self._histograms.get(key)
+        if counts is None:
+            # One count per bucket plus the +Inf bucket; cumulated when rendered
+            counts = self._histograms[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+            self._errors[key] = 0
+            self._bytes_in[key] = 0
+            self._bytes_out[key] = 0
+        counts[bisect_left(self.buckets, seconds)] += 1
+        self._sums[key] += seconds
+        self._bytes_in[key] += bytes_in
+        self._bytes_out[key] += bytes_out
+        if error:
+            self._errors[key] += 1
+
+    def add_gauges(self, callback: Callable[[], dict[str, tuple[str, float]]]) -> None:
+        """Registers a callback returning ``{metric name: (help text, value)}``."""
+        self._gauges.append(callback)
+
+    def count(self, kind: str, name: str) -> int:
+        return sum(self._histograms.get((kind, name), ()))
+
+    def render(self) -> str:
+        lines = [
+            "# HELP mcp_request_duration_seconds Time to handle an MCP request.",
+            "# TYPE mcp_request_duration_seconds histogram",
+        ]
+        for (kind, name), counts in sorted(self._histograms.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if isinstance(bound, str) else _number(bound)
+                lines.append(f"mcp_request_duration_seconds_bucket{_labels(kind=kind, name=name, le=le)} {cumulative}")
+            lines.append(f"mcp_request_duration_seconds_sum{_labels(kind=kind, name=name)} {self._sums[(kind, name)]!r}")
+            lines.append(f"mcp_request_duration_seconds_count{_labels(kind=kind, name=name)} {cumulative}")
+
+        lines += [
+            "# HELP mcp_request_errors_total MCP requests that failed.",
+            "# TYPE mcp_request_errors_total counter",
+        ]
+        for (kind, name), errors in sorted(self._errors.items()):
+            lines.append(f"mcp_request_errors_total{_labels(kind=kind, name=name)} {errors}")
+
+        lines += [
+            "# HELP mcp_payload_bytes_total Bytes of request arguments and response contents.",
+            "# TYPE mcp_payload_bytes_total counter",
+        ]
+        for direction, totals in (("in", self._bytes_in), ("out", self._bytes_out)):
+            for (kind, name), total in sorted(totals.items()):
+                lines.append(f"mcp_payload_bytes_total{_labels(kind=kind, name=name, direction=direction)} {total}")
+
+        for callback in self._gauges:
+            for metric, (help_text, value) in callback().items():
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge", f"{metric} {_number(value)}"]
+        return "\n".join(lines) + "\n"
+
+    def instrument(self, mcp: FastMCP) -> None:
+        """
+        Replaces the server's tool, resource and prompt request handlers with
+        ones that time each request before handing it to FastMCP.
+        """
+        server = mcp._mcp_server
+
+        async def timed(kind: str, name: str, arguments: Any, handler):
+            start = time.perf_counter()
+            result, error = None, False
+            try:
+                result = await handler()
+                return result
+            except Exception:
+                error = True
+                raise
+            finally:
+                self.observe(
+                    kind,
+                    name,
+                    time.perf_counter() - start,
+                    bytes_in=payload_bytes(arguments),
+                    bytes_out=payload_bytes(result),
+                    error=error,
+                )
+
+        async def call_tool(name: str, arguments: dict[str, Any]):
+            return await timed("tool", _tool_name(mcp, name), arguments, lambda: mcp.call_tool(name, arguments))
+
+        async def read_resource(uri: AnyUrl):
+            async def read():
+                # Consumed here so reading errors are counted against the resource
+                return list(await mcp.read_resource(uri))
+
+            return await timed("resource", _resource_name(mcp, str(uri)), None, read)
+
+        async def get_prompt(name: str, arguments: dict[str, str] | None = None):
+            return await timed("prompt", _prompt_name(mcp, name), arguments, lambda: mcp.get_prompt(name, arguments))
+
+        server.call_tool(validate_input=False)(call_tool)
+        server.read_resource()(read_resource)
+        server.get_prompt()(get_prompt)
+
+
+def _tool_name(mcp: FastMCP, name: str) -> str:
+    """The tool's name if it is registered; clients can send any name, which would grow the series without bound."""
+    return name if mcp._tool_manager.get_tool(name) is not None else "unknown"
+
+
+def _prompt_name(mcp: FastMCP, name: str) -> str:
+    return name if mcp._prompt_manager.get_prompt(name) is not None else "unknown"
+
+
+def _resource_name(mcp: FastMCP, uri: str) -> str:
+    """The resource's URI, or its URI template, so documents share one series."""
+    manager = mcp._resource_manager
+    if uri in manager._resources:
+        return uri
+    for template in manager.list_templates():
+        if template.matches(uri) is not None:
+            return template.uri_template
+    return "unknown"
@@ -0,0 +1,280 @@
+import re
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+
+_HEADING = re.compile(r"(#{1,6})[ \t]")
+
+# Characters between byte-offset checkpoints for non-ASCII documents
+_BYTE_CHECKPOINT_CHARS = 4096
+
+UNITS = ("line", "paragraph", "section")
+
+# Heading offsets are stored with the heading level in their low bits
+_LEVEL_BITS = 3
+
+
+def _scan(text: str, base: int, prev_blank: bool, stop: Optional[int]):
+    """
+    Finds line, paragraph and heading starts in ``text``, which begins at
+    document offset ``base``. Line starts at or past ``stop`` are skipped;
+    they belong to the unchanged text after a rescanned region.
+    """
+    lines: list[int] = []
+    paragraphs: list[int] = []
+    headings: list[tuple[int, int]] = []
+
+    offset = base
+    # Every "\n" opens a new line, so a trailing newline yields a final empty line.
+    for line in text.split("\n"):
+        if stop is not None and offset >= stop:
+            break
+        lines.append(offset)
+        blank = not line.strip()
+        if not blank and prev_blank:
+            paragraphs.append(offset)
+        match = _HEADING.match(line)
+        if match:
+            headings.append((offset, len(match.group(1))))
+        prev_blank = blank
+        offset += len(line) + 1
+
+    return lines, paragraphs, headings
+
+
+class _OffsetList:
+    """
+    Sorted offsets kept in blocks, each with a shift added to all of its
+    entries. Moving every offset after an edit adds to one shift per block
+    instead of rewriting each offset, so a splice costs ``O(n / block)``
+    plus the size of the block it lands in.
+    """
+
+    BLOCK = 512
+
+    def __init__(self, values: list[int]):
+        self._blocks = [values[i : i + self.BLOCK] for i in range(0, len(values), self.BLOCK)]
+        self._shifts = [0] * len(self._blocks)
+        self._len = len(values)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        for block, shift in zip(self._blocks, self._shifts):
+            for value in block:
+                yield value + shift
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, (_OffsetList, list)) and list(self) == list(other)
+
+    def __getitem__(self, i: int) -> int:
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        for block, shift in zip(self._blocks, self._shifts):
+            if i < len(block):
+                return block[i] + shift
+            i -= len(block)
+        raise IndexError(i)
+
+    def bisect_left(self, value: int) -> int:
+        index = 0
+        for block, shift in zip(self._blocks, self._shifts):
+            if block[-1] + shift >= value:
+                return index + bisect_left(block, value - shift)
+            index += len(block)
+        return index
+
+    def bisect_right(self, value: int) -> int:
+        index = 0
+        for block, shift in zip(self._blocks, self._shifts):
+            if block[-1] + shift > value:
+                return index + bisect_right(block, value - shift)
+            index += len(block)
+        return index
+
+    def splice(self, start: int, end: Optional[int], values: Iterable[int], shift: int) -> None:
+        """
+        Replaces the offsets in ``[start, end)`` (to the end when ``end`` is
+        None) with ``values`` and moves the offsets from ``end`` on by ``shift``.
+        """
+        blocks, shifts = self._blocks, self._shifts
+        first = 0
+        while first < len(blocks) and blocks[first][-1] + shifts[first] < start:
+            first += 1
+        last = first
+        while last < len(blocks) and (end is None or blocks[last][0] + shifts[last] < end):
+            last += 1
+
+        # Only the blocks overlapping the range are rewritten; later ones just get the shift.
+        old = [value + s for block, s in zip(blocks[first:last], shifts[first:last]) for value in block]
+        merged = [value for value in old if value < start]
+        merged += values
+        if end is not None:
+            merged += [value + shift for value in old if value >= end]
+
+        rebuilt = [merged[i : i + self.BLOCK] for i in range(0, len(merged), self.BLOCK)]
+        blocks[first:last] = rebuilt
+        shifts[first:last] = [0] * len(rebuilt)
+        for i in range(first + len(rebuilt), len(blocks)):
+            shifts[i] += shift
+        self._len += len(merged) - len(old)
+
+
+class OffsetIndex:
+    """
+    Line, paragraph and markdown-section start offsets for one document.
+
+    The index is built once from the full text. After an edit only the lines
+    around each changed range are rescanned; offsets after them are shifted
+    a block at a time, so an edit does not touch every line.
+    Paragraphs are runs of non-blank lines; a section runs from a heading to
+    the next heading of the same or a higher level.
+    """
+
+    def __init__(self, text: str):
+        self.length = len(text)
+        lines, paragraphs, headings = _scan(text, 0, True, None)
+        self.lines = _OffsetList(lines)
+        self.paragraphs = _OffsetList(paragraphs)
+        self._headings = _OffsetList([offset << _LEVEL_BITS | level for offset, level in headings])
+        self.is_ascii = text.isascii()
+        # Character offsets and the UTF-8 byte offsets they start at, every few thousand characters
+        self._checkpoint_chars = [0]
+        self._checkpoint_bytes = [0]
+
+    @property
+    def headings(self) -> list[tuple[int, int]]:
+        """``(offset, level)`` of every markdown heading."""
+        return [(value >> _LEVEL_BITS, value & ((1 << _LEVEL_BITS) - 1)) for value in self._headings]
+
+    # Incremental maintenance
+
+    def update(self, edits: list[tuple[int, int, str]], read: Callable[[int, int], str]) -> None:
+        """
+        Applies ``(position, length, text)`` edits, given in ascending positions
+        of the old text, after they have been applied to the document.
+        ``read(start, end)`` returns a slice of the edited document.
+        """
+        if not edits:
+            return
+
+        # Regions of old text to rescan: the lines touched by an edit plus the
+        # line after them, whose paragraph status depends on the edited lines.
+        regions: list[list] = []
+        for pos, length, text in edits:
+            i0 = self.lines.bisect_right(pos) - 1
+            i1 = self.lines.bisect_right(pos + length) + 1
+            start = self.lines[i0]
+            end = self.lines[i1] if i1 < len(self.lines) else None
+            delta = len(text) - length
+            if regions and (regions[-1][1] is None or regions[-1][1] >= start):
+                regions[-1][1] = None if end is None or regions[-1][1] is None else max(end, regions[-1][1])
+                regions[-1][2] += delta
+            else:
+                regions.append([start, end, delta])
+
+        # Regions are spliced in left to right; offsets before the current region
+        # are final, those after it are still ``shift`` short.
+        shift = 0
+        for start, end, delta in regions:
+            region_start = start + shift
+            region_end = end + shift if end is not None else None
+
+            prev_blank = True
+            previous = self.lines.bisect_left(region_start) - 1
+            if previous >= 0:
+                prev_blank = not read(self.lines[previous], region_start).strip()
+
+            shift += delta
+            new_end = end + shift if end is not None else self.length + shift
+            lines, paragraphs, headings = _scan(
+                read(region_start, new_end), region_start, prev_blank, new_end if end is not None else None
+            )
+            self.lines.splice(region_start, region_end, lines, delta)
+            self.paragraphs.splice(region_start, region_end, paragraphs, delta)
+            self._headings.splice(
+                region_start << _LEVEL_BITS,
+                region_end << _LEVEL_BITS if region_end is not None else None,
+                [offset << _LEVEL_BITS | level for offset, level in headings],
+                delta << _LEVEL_BITS,
+            )
+
+        self.length += shift
+        self.is_ascii = self.is_ascii and all(text.isascii() for _pos, _length, text in edits)
+
+        keep = max(1, bisect_right(self._checkpoint_chars, edits[0][0]))
+        del self._checkpoint_chars[keep:]
+        del self._checkpoint_bytes[keep:]
+
+    # Structural lookups
+
+    def count(self, unit: str) -> int:
+        if unit == "line":
+            return len(self.lines)
+        if unit == "paragraph":
+            return len(self.paragraphs)
+        if unit == "section":
+            return len(self._headings)
+        raise ValueError(f"Unknown unit {unit!r}; expected one of {', '.join(UNITS)}")
+
+    def span(self, unit: str, start: int, count: int = 1) -> tuple[int, int]:
+        """Returns the character range covering ``count`` units from index ``start``."""
+        total = self.count(unit)
+        if start < 0 or start >= total:
+            raise IndexError(f"{unit} {start} is out of range; the document has {total}")
+        last = min(total, start + max(count, 1)) - 1
+
+        if unit == "line":
+            end = self.lines[last + 1] if last + 1 < total else self.length
+            return self.lines[start], end
+
+        if unit == "paragraph":
+            end = self.paragraphs[last + 1] if last + 1 < total else self.length
+            return self.paragraphs[start], end
+
+        # A section ends at the next heading of the same or a higher level.
+        mask = (1 << _LEVEL_BITS) - 1
+        level = self._headings[last] & mask
+        end = self.length
+        for value in islice(self._headings, last + 1, None):
+            if value & mask <= level:
+                end = value >> _LEVEL_BITS
+                break
+        return self._headings[start] >> _LEVEL_BITS, end
+
+    # Byte offsets
+
+    def char_offset(self, byte_offset: int, read: Callable[[int, int], str]) -> int:
+        """Maps a UTF-8 byte offset to a character offset, rounding down to a character boundary."""
+        if self.is_ascii:
+            return max(0, min(byte_offset, self.length))
+
+        # Extend the checkpoint table lazily up to the requested byte offset.
+        chars, nbytes = self._checkpoint_chars[-1], self._checkpoint_bytes[-1]
+        while nbytes < byte_offset and chars < self.length:
+            step = min(_BYTE_CHECKPOINT_CHARS, self.length - chars)
+            nbytes += len(read(chars, chars + step).encode("utf-8"))
+            chars += step
+            self._checkpoint_chars.append(chars)
+            self._checkpoint_bytes.append(nbytes)
+
+        i = max(bisect_right(self._checkpoint_bytes, byte_offset) - 1, 0)
+        chars, nbytes = self._checkpoint_chars[i], self._checkpoint_bytes[i]
+        chunk = read(chars, min(self.length, chars + _BYTE_CHECKPOINT_CHARS))
+        for ch in chunk:
+            size = len(ch.encode("utf-8"))
+            if nbytes + size > byte_offset:
+                break
+            nbytes += size
+            chars += 1
+        return chars
+
+    def byte_length(self, read: Callable[[int, int], str]) -> int:
+        if self.is_ascii:
+            return self.length
+        if self._checkpoint_chars[-1] < self.length:
+            self.char_offset(float("inf"), read)
+        return self._checkpoint_bytes[-1]
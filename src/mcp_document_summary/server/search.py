@@ -0,0 +1,299 @@
+import heapq
+import math
+import re
+import threading
+from array import array
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from ..logger import setup_logger
+from ..text import WORD, tokenize
+
+logger = setup_logger(__name__)
+
+_QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+
+@dataclass
+class SearchHit:
+    doc_id: str
+    score: float
+    # (offset, length) character spans of the matched terms or phrases
+    matches: list[tuple[int, int]] = field(default_factory=list)
+
+
+def _analyze(text: str) -> tuple[array, array, dict[str, list[int]]]:
+    """Token start and end offsets, and the positions of each term, for ``InvertedIndex._insert``."""
+    starts = array("I")
+    ends = array("I")
+    positions: dict[str, list[int]] = {}
+    for i, m in enumerate(WORD.finditer(text)):
+        starts.append(m.start())
+        ends.append(m.end())
+        positions.setdefault(m.group().lower(), []).append(i)
+    return starts, ends, positions
+
+
+class InvertedIndex:
+    """
+    Positional inverted index with BM25 ranking.
+
+    Postings map ``term -> {doc_id: [token positions]}``; each document also
+    keeps the character span of every token so matches can be reported as
+    offsets into the text. Documents are added and removed individually, so an
+    edit only re-indexes the document that changed.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[str, list[int]]] = {}
+        self._doc_terms: dict[str, list[str]] = {}
+        self._doc_lengths: dict[str, int] = {}
+        self._token_starts: dict[str, array] = {}
+        self._token_ends: dict[str, array] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    def add(self, doc_id: str, text: str) -> None:
+        self._insert(doc_id, *_analyze(text))
+
+    def _insert(self, doc_id: str, starts: array, ends: array, positions: dict[str, list[int]]) -> None:
+        if doc_id in self._doc_lengths:
+            self.remove(doc_id)
+
+        for term, term_positions in positions.items():
+            self._postings.setdefault(term, {})[doc_id] = term_positions
+
+        self._doc_terms[doc_id] = list(positions)
+        self._doc_lengths[doc_id] = len(starts)
+        self._token_starts[doc_id] = starts
+        self._token_ends[doc_id] = ends
+        self._total_length += len(starts)
+
+    def remove(self, doc_id: str) -> None:
+        if doc_id not in self._doc_lengths:
+            return
+
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        del self._token_starts[doc_id]
+        del self._token_ends[doc_id]
+
+    # Querying
+
+    def _phrase_starts(self, doc_id: str, phrase: list[str]) -> list[int]:
+        """Token positions in ``doc_id`` where ``phrase`` occurs."""
+        first = self._postings[phrase[0]][doc_id]
+        rest = [set(self._postings[term][doc_id]) for term in phrase[1:]]
+        return [p for p in first if all(p + i + 1 in positions for i, positions in enumerate(rest))]
+
+    def _phrase_docs(self, phrase: list[str]) -> dict[str, list[int]]:
+        postings = [self._postings.get(term) for term in phrase]
+        if any(p is None for p in postings):
+            return {}
+
+        # Start from the rarest term to keep the candidate set small.
+        candidates = set(min(postings, key=len))
+        for p in postings:
+            candidates.intersection_update(p)
+
+        found = {}
+        for doc_id in candidates:
+            starts = self._phrase_starts(doc_id, phrase)
+            if starts:
+                found[doc_id] = starts
+        return found
+
+    def _idf(self, term: str) -> float:
+        n = len(self._doc_lengths)
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: int = 10, max_matches: int = 5) -> tuple[int, list[SearchHit]]:
+        """
+        Ranks documents against ``query`` and returns the number of matching
+        documents along with the top ``limit`` hits.
+
+        Bare words are optional and ranked with BM25; ``"quoted phrases"`` are
+        required and must occur as consecutive words.
+        """
+        words: list[str] = []
+        phrases: list[list[str]] = []
+        for phrase, word in _QUERY_PART.findall(query):
+            if phrase:
+                tokens = tokenize(phrase)
+                if tokens:
+                    phrases.append(tokens)
+            else:
+                words += tokenize(word)
+
+        words = list(dict.fromkeys(words))
+        # Phrase words count towards the score as well
+        terms = list(dict.fromkeys(words + [term for phrase in phrases for term in phrase]))
+        if not terms or not self._doc_lengths:
+            return 0, []
+
+        # Documents containing every phrase, with the span of each phrase's first occurrence
+        allowed: Optional[dict[str, list[tuple[int, int]]]] = None
+        for phrase in phrases:
+            docs = self._phrase_docs(phrase)
+            if allowed is None:
+                allowed = {doc_id: [(starts[0], len(phrase))] for doc_id, starts in docs.items()}
+            else:
+                allowed = {
+                    doc_id: spans + [(docs[doc_id][0], len(phrase))]
+                    for doc_id, spans in allowed.items()
+                    if doc_id in docs
+                }
+
+        avgdl = self._total_length / len(self._doc_lengths) or 1.0
+        scores: dict[str, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            candidates: Iterable[str] = postings if allowed is None else (d for d in allowed if d in postings)
+            for doc_id in candidates:
+                tf = len(postings[doc_id])
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        hits = [
+            SearchHit(doc_id, score, self._matches(doc_id, words, (allowed or {}).get(doc_id, []), max_matches))
+            for doc_id, score in top
+        ]
+        return len(scores), hits
+
+    def _matches(
+        self, doc_id: str, terms: list[str], phrase_spans: list[tuple[int, int]], max_matches: int
+    ) -> list[tuple[int, int]]:
+        """Character spans of the first phrase and term matches, in document order."""
+        starts = self._token_starts[doc_id]
+        ends = self._token_ends[doc_id]
+
+        token_spans = list(phrase_spans)
+        for term in terms:
+            for position in self._postings.get(term, {}).get(doc_id, [])[:max_matches]:
+                token_spans.append((position, 1))
+
+        spans = sorted({(starts[p], ends[p + n - 1] - starts[p]) for p, n in token_spans})
+        return spans[:max_matches]
+
+
+class DocumentSearch:
+    """
+    Keeps an ``InvertedIndex`` in step with a changing corpus.
+
+    ``start()`` builds the index on a background thread and then keeps
+    re-indexing changed documents there, one at a time, so neither startup
+    nor edits wait for tokenizing. A query waits for the initial build and
+    indexes whatever changes the thread has not reached yet, so results are
+    never stale. Without ``start()``, the index is built on the first query
+    and changes are indexed right before the next one.
+
+    ``load`` is called from the background thread, so it must be safe to
+    call from any thread; the document store's reads are.
+    """
+
+    def __init__(self, ids: Callable[[], Iterable[str]], load: Callable[[str], str]):
+        self._ids = ids
+        self._load = load
+        self.index = InvertedIndex()
+        self._built = threading.Event()
+        self._pending: set[str] = set()
+        # Guards the index and the pending set
+        self._lock = threading.Lock()
+        # Held from reading a document to indexing it, so an older read never replaces a newer one
+        self._indexing = threading.Lock()
+        self._changed = threading.Event()
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Builds the index and indexes later changes on a background thread."""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="search-index", daemon=True)
+            self._worker.start()
+
+    def close(self) -> None:
+        """Stops the background thread, if any."""
+        self._closed = True
+        self._changed.set()
+        if self._worker is not None:
+            self._worker.join()
+
+    def mark_changed(self, doc_id: str) -> None:
+        with self._lock:
+            self._pending.add(doc_id)
+        self._changed.set()
+
+    def _index(self, doc_id: str) -> None:
+        try:
+            analyzed = _analyze(self._load(doc_id))
+        except KeyError:
+            with self._lock:
+                self.index.remove(doc_id)
+            return
+        with self._lock:
+            self.index._insert(doc_id, *analyzed)
+
+    def _index_next(self) -> bool:
+        """Re-indexes one changed document; False when none are left."""
+        with self._indexing:
+            with self._lock:
+                if not self._pending:
+                    return False
+                doc_id = self._pending.pop()
+            self._index(doc_id)
+            return True
+
+    def _build(self) -> None:
+        for doc_id in self._ids():
+            if self._closed:
+                return
+            with self._indexing:
+                self._index(doc_id)
+        self._built.set()
+
+    def _run(self) -> None:
+        try:
+            self._build()
+            logger.info(f"Indexed {len(self.index)} documents for search")
+            while not self._closed:
+                self._changed.wait()
+                self._changed.clear()
+                while not self._closed and self._index_next():
+                    pass
+        except Exception:
+            logger.exception("Background search indexing failed; indexing on the next query instead")
+            self._worker = None
+            self._built.clear()
+
+    def refresh(self) -> None:
+        if self._worker is not None:
+            self._built.wait()
+        elif not self._built.is_set():
+            with self._lock:
+                self._pending.clear()
+            self._build()
+
+        while self._index_next():
+            pass
+
+    def search(self, query: str, limit: int = 10) -> tuple[int, list[SearchHit]]:
+        self.refresh()
+        with self._lock:
+            return self.index.search(query, limit)
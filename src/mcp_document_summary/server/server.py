@@ -1,8 +1,25 @@
+import atexit
+import os
+from typing import Annotated, Literal, Optional
+from urllib.parse import parse_qs, unquote
+
 from mcp.server.fastmcp import FastMCP
-from pydantic import Field
+from pydantic import AnyUrl, BaseModel, Field
 from mcp.server.fastmcp.prompts import base
+from mcp.types import ToolAnnotations
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 from ..config import settings
 from ..logger import setup_logger
+from ..profiling import Profiler, profile_requests
+from .corpus_replace import CorpusReplacer
+from .documents import DocumentManager
+from .ingest import Ingestor, default_manifest_path
+from .listing import DocumentListing
+from .metrics import ServerMetrics
+from .search import DocumentSearch
+from .storage import open_store
+from .subscriptions import DOCUMENTS_URI, ResourceSubscriptions, advertise_subscriptions
 
 logger = setup_logger(__name__)
 
@@ -13,8 +30,22 @@ mcp = FastMCP(
     log_level=settings.log_level
 )
 
-# In-memory text storage 
-DOCUMENT = {
+# Optional MVCC parameters: read an earlier version, or edit only if nobody else has edited since
+ReadVersion = Annotated[
+    Optional[int],
+    Field(description="Version to read, to page through one consistent snapshot; defaults to the current version"),
+]
+ExpectedVersion = Annotated[
+    Optional[int],
+    Field(description="Apply the edit only if the document is still at this version (as returned by a read or edit)"),
+]
+
+# Tool annotations; clients run read-only calls on the same document concurrently but order them around edits
+READ_ONLY = ToolAnnotations(readOnlyHint=True)
+EDITS_DOCUMENT = ToolAnnotations(readOnlyHint=False, destructiveHint=False)
+
+# Sample documents used to seed an empty store
+SAMPLE_DOCUMENTS = {
     "inspection.md": "This inspection summarizes the onsite evaluation conducted by the safety team.",
     "analysis.pdf": "The analysis examines load performance under peak operating conditions.",
     "schedule.docx": "This schedule details key milestones and delivery timelines for the project.",
@@ -27,47 +58,498 @@ DOCUMENT = {
     "review.md": "The review captures stakeholder feedback and proposed revisions.",
 }
 
+# Document storage (in-memory unless DOCUMENT_STORE_PATH points to an on-disk log)
+DOCUMENT = open_store(
+    settings.document_store_path,
+    seed=SAMPLE_DOCUMENTS,
+    segment_size=settings.document_store_segment_mb * 1024 * 1024,
+    compact_ratio=settings.document_store_compact_ratio,
+)
+
+# Editing layer over the store; edits are applied to piece tables and written through to the store
+DOCUMENTS = DocumentManager(
+    DOCUMENT,
+    max_history=settings.document_history_max_revisions,
+    checkpoint_interval=settings.document_history_checkpoint_interval,
+)
+atexit.register(DOCUMENTS.close)
+
+# Full-text index over the corpus, built and kept current by a background thread reading the store
+SEARCH = DocumentSearch(DOCUMENTS.ids, DOCUMENT.__getitem__)
+DOCUMENTS.add_listener(SEARCH.mark_changed)
+SEARCH.start()
+atexit.register(SEARCH.close)
+
+# Clients subscribed to document resources are told when a document changes
+SUBSCRIPTIONS = ResourceSubscriptions()
+DOCUMENTS.add_listener(SUBSCRIPTIONS.document_changed)
+
+# Sorted document IDs for paginated listing, kept current as documents are added
+LISTING = DocumentListing(DOCUMENTS)
+
+# Find/replace across the corpus; large corpora are scanned by a pool of worker processes
+REPLACER = CorpusReplacer(
+    DOCUMENTS,
+    workers=settings.corpus_replace_workers or os.cpu_count() or 1,
+    parallel_threshold=int(settings.corpus_replace_parallel_mb * 1024 * 1024),
+)
+
+# Imports directories of files as documents; subscribers to the document list hear of each batch added
+INGESTOR = Ingestor(
+    DOCUMENTS,
+    manifest_path=default_manifest_path(),
+    workers=settings.ingest_workers or os.cpu_count() or 1,
+    on_added=lambda doc_ids: SUBSCRIPTIONS.notify(DOCUMENTS_URI),
+)
+
 # Defining the mcp tool for reading the document contents
 @mcp.tool(
     name="read_documents_contents",
     description="Read the contents of a document and return it as a string.",
+    annotations=READ_ONLY,
 )
 def read_document(
     doc_id: str = Field(description="ID of the document to read"),
+    version: ReadVersion = None,
 ):
-    if doc_id not in DOCUMENT:
+    if doc_id not in DOCUMENTS:
         raise ValueError(f"Doc with id {doc_id} not found!")
 
-    return DOCUMENT[doc_id]
+    return DOCUMENTS.read(doc_id, version)
 
 
 # Defining the mcp tool for replacing a word in the document
 @mcp.tool(
     name="edit_document",
-    description="Edit a document by replacing a string in the documents content with a new string",
+    description=(
+        "Edit a document by replacing a string in the documents content with a new string. "
+        "Returns the number of replacements and the new document version."
+    ),
+    annotations=EDITS_DOCUMENT,
 )
 def edit_document(
     doc_id: str = Field(description="ID of the document that will be edited"),
     old_str: str = Field(description="The word to replace. Must match exactly, including whitespace"),
     new_str: str = Field(description="The new text to insert in place of the old text in the document"),
-):
-    if doc_id not in DOCUMENT:
+    expected_version: ExpectedVersion = None,
+) -> dict:
+    if doc_id not in DOCUMENTS:
+        raise ValueError(f"Doc with id {doc_id} not found!")
+
+    count = DOCUMENTS.replace(doc_id, old_str, new_str, expected_version)
+
+    return {"doc_id": doc_id, "version": DOCUMENTS.version(doc_id), "replacements": count}
+
+# Defining the mcp tool for reading part of a document by offset
+@mcp.tool(
+    name="read_document_range",
+    description=(
+        "Read part of a document by character or UTF-8 byte offset instead of the whole body. "
+        "Use it to page through large documents: pass next_offset back as offset until it is null."
+    ),
+    annotations=READ_ONLY,
+)
+def read_document_range(
+    doc_id: str = Field(description="ID of the document to read"),
+    offset: int = Field(default=0, description="Where to start reading"),
+    length: int = Field(default=4000, description="How many characters or bytes to read"),
+    unit: Literal["char", "byte"] = Field(default="char", description="Whether offset and length count characters or bytes"),
+    version: ReadVersion = None,
+) -> dict:
+    if doc_id not in DOCUMENTS:
+        raise ValueError(f"Doc with id {doc_id} not found!")
+
+    version = DOCUMENTS.version(doc_id) if version is None else version
+    begin, end, text = DOCUMENTS.read_range(doc_id, offset, length, unit, version)
+    total = DOCUMENTS.length(doc_id, unit, version)
+
+    return {
+        "doc_id": doc_id,
+        "version": version,
+        "unit": unit,
+        "offset": offset,
+        "total": total,
+        "next_offset": offset + length if offset + length < total else None,
+        "text": text,
+    }
+
+
+# Defining the mcp tool for reading lines, paragraphs or sections of a document
+@mcp.tool(
+    name="read_document_part",
+    description=(
+        "Read lines, paragraphs or markdown sections of a document by index (0-based). "
+        "Paragraphs are separated by blank lines; a section runs from a '#' heading to the next heading "
+        "of the same or higher level. Use 'document_outline' to see the headings and unit counts."
+    ),
+    annotations=READ_ONLY,
+)
+def read_document_part(
+    doc_id: str = Field(description="ID of the document to read"),
+    unit: Literal["line", "paragraph", "section"] = Field(default="paragraph", description="The structural unit to read"),
+    index: int = Field(default=0, description="Index of the first unit to read"),
+    count: int = Field(default=1, description="How many consecutive units to read"),
+    version: ReadVersion = None,
+) -> dict:
+    if doc_id not in DOCUMENTS:
+        raise ValueError(f"Doc with id {doc_id} not found!")
+
+    version = DOCUMENTS.version(doc_id) if version is None else version
+    begin, end, text = DOCUMENTS.read_units(doc_id, unit, index, count, version)
+
+    return {
+        "doc_id": doc_id,
+        "version": version,
+        "unit": unit,
+        "index": index,
+        "total": DOCUMENTS.count(doc_id, unit, version),
+        "offset": begin,
+        "length": end - begin,
+        "text": text,
+    }
+
+
+# Defining the mcp tool for describing the structure of a document
+@mcp.tool(
+    name="document_outline",
+    description="Return a document's length, line and paragraph counts, and its markdown headings with their section indexes.",
+    annotations=READ_ONLY,
+)
+def document_outline(
+    doc_id: str = Field(description="ID of the document to describe"),
+) -> dict:
+    if doc_id not in DOCUMENTS:
+        raise ValueError(f"Doc with id {doc_id} not found!")
+
+    index = DOCUMENTS.offsets(doc_id)
+    buffer = DOCUMENTS.buffer(doc_id)
+    sections = []
+    for i, (offset, level) in enumerate(index.headings):
+        line_end = buffer.slice(offset, offset + 200).split("\n", 1)[0]
+        sections.append({"index": i, "level": level, "title": line_end.lstrip("#").strip(), "offset": offset})
+
+    return {
+        "doc_id": doc_id,
+        "version": DOCUMENTS.version(doc_id),
+        "length": index.length,
+        "lines": index.count("line"),
+        "paragraphs": index.count("paragraph"),
+        "sections": sections,
+    }
+
+
+# Defining the mcp tool for searching across all documents
+@mcp.tool(
+    name="search_documents",
+    description=(
+        "Search all documents and return the best matches ranked by relevance (BM25), "
+        "each with a snippet and the character offsets of the matches. "
+        'Words are optional; wrap a phrase in double quotes to require it, e.g. "load performance".'
+    ),
+    annotations=READ_ONLY,
+)
+def search_documents(
+    query: str = Field(description="Words and/or quoted phrases to search for"),
+    limit: int = Field(default=10, description="Maximum number of documents to return"),
+) -> dict:
+    total, hits = SEARCH.search(query, limit)
+
+    results = []
+    for hit in hits:
+        first_offset, first_length = hit.matches[0] if hit.matches else (0, 0)
+        snippet_offset, _end, snippet = DOCUMENTS.read_range(
+            hit.doc_id, max(0, first_offset - 80), first_length + 160
+        )
+        results.append({
+            "doc_id": hit.doc_id,
+            "score": round(hit.score, 4),
+            "matches": [{"offset": offset, "length": length} for offset, length in hit.matches],
+            "snippet": snippet,
+            "snippet_offset": snippet_offset,
+        })
+
+    return {"query": query, "total_hits": total, "results": results}
+
+
+class Replacement(BaseModel):
+    old_str: str = Field(description="The text to replace. Must match exactly, including whitespace")
+    new_str: str = Field(description="The text to insert in place of old_str")
+
+
+# Defining the mcp tool for applying many replacements to a document at once
+@mcp.tool(
+    name="batch_edit_document",
+    description=(
+        "Edit a document by applying many replacements in a single pass. "
+        "All old_str values are matched against the original text: where matches overlap, the one "
+        "starting first wins, and at the same position the longest wins. Replaced text is not rescanned. "
+        "Returns the number of replacements per pair and the new document version."
+    ),
+    annotations=EDITS_DOCUMENT,
+)
+def batch_edit_document(
+    doc_id: str = Field(description="ID of the document that will be edited"),
+    replacements: list[Replacement] = Field(description="The (old_str, new_str) pairs to apply"),
+    expected_version: ExpectedVersion = None,
+) -> dict:
+    if doc_id not in DOCUMENTS:
         raise ValueError(f"Doc with id {doc_id} not found!")
 
-    DOCUMENT[doc_id] = DOCUMENT[doc_id].replace(old_str, new_str)
+    counts = DOCUMENTS.replace_many(doc_id, [(r.old_str, r.new_str) for r in replacements], expected_version)
 
-# Defining resources for fetching the list of the document IDs
-@mcp.resource("docs://documents", mime_type="application/json")
-def list_docs() -> list[str]:
-    return list(DOCUMENT.keys())
+    return {
+        "doc_id": doc_id,
+        "version": DOCUMENTS.version(doc_id),
+        "total_replacements": sum(counts),
+        "replacements": [
+            {"old_str": r.old_str, "new_str": r.new_str, "count": count}
+            for r, count in zip(replacements, counts)
+        ],
+    }
 
-# Defining resource for fetching the contents of a particular document
+# Defining the mcp tool for replacing text across many documents at once
+@mcp.tool(
+    name="replace_in_documents",
+    description=(
+        "Find and replace across every document, or the documents whose ID matches a glob such as "
+        "'reports/*.md'. The pattern is literal unless regex is true; with regex, the replacement may "
+        "use \\1 or \\g<name> group references. Each matching document is edited as one new version. "
+        "Use dry_run to get the match counts per document without editing anything."
+    ),
+    annotations=EDITS_DOCUMENT,
+)
+async def replace_in_documents(
+    pattern: str = Field(description="Text, or regular expression if regex is true, to replace"),
+    replacement: str = Field(description="Text to insert in place of each match"),
+    doc_glob: str = Field(default="*", description="Only documents whose ID matches this glob"),
+    regex: bool = Field(default=False, description="Treat pattern as a regular expression"),
+    ignore_case: bool = Field(default=False, description="Match regardless of case"),
+    dry_run: bool = Field(default=False, description="Only count the matches; do not edit"),
+    max_listed: int = Field(default=100, description="Most documents to list individually in the response"),
+) -> dict:
+    result = await REPLACER.replace(pattern, replacement, doc_glob, regex, ignore_case, dry_run)
+
+    listed = sorted(result.matches.items(), key=lambda item: (-item[1][0], item[0]))[:max_listed]
+    return {
+        "dry_run": dry_run,
+        "documents_scanned": result.documents_scanned,
+        "documents_matched": len(result.matches),
+        "total_replacements": result.total_replacements,
+        "documents": [
+            {"doc_id": doc_id, "replacements": count, "version": version}
+            for doc_id, (count, version) in listed
+        ],
+        "documents_not_listed": max(len(result.matches) - max_listed, 0),
+    }
+
+# Defining the mcp tool for listing documents page by page
+@mcp.tool(
+    name="list_documents",
+    description=(
+        "List documents page by page, sorted by ID ignoring case, with each document's size in bytes, "
+        "version and last-modified time (null if unchanged since the server started). Filter by ID prefix "
+        "(ignoring case) or glob such as 'reports/*.pdf'. Pass the returned next_cursor to get the next page; "
+        "it is null after the last page. A page may hold fewer entries than the limit when a glob matches "
+        "few IDs, and still be followed by more."
+    ),
+    annotations=READ_ONLY,
+)
+def list_documents(
+    prefix: str = Field(default="", description="Only IDs starting with this text, ignoring case"),
+    glob: Optional[str] = Field(default=None, description="Only IDs matching this glob"),
+    cursor: Optional[str] = Field(default=None, description="next_cursor from the previous page"),
+    limit: int = Field(default=100, description="Most documents to return, up to 1000"),
+) -> dict:
+    return LISTING.page(prefix, glob, cursor, limit)
+
+# Defining the mcp tool for importing a directory of files as documents
+@mcp.tool(
+    name="ingest_documents",
+    description=(
+        "Import the .md, .markdown, .txt, .pdf and .docx files under a directory on the server, recursively, "
+        "as documents named by their path relative to that directory. Files unchanged since they were last "
+        "imported are skipped; a changed file replaces its document as a new version. Returns counts of the "
+        "files added, updated, unchanged and failed. Only available when the server sets an ingest root."
+    ),
+    annotations=EDITS_DOCUMENT,
+)
+async def ingest_documents(
+    directory: str = Field(description="Directory to import, relative to the server's ingest root"),
+    prefix: str = Field(default="", description="Prepended to each relative path to form the document ID, e.g. 'reports/'"),
+) -> dict:
+    # Reading the server's files is opt-in: without a configured root, no directory is importable.
+    if not settings.ingest_root:
+        raise ValueError("Importing files is disabled on this server; set INGEST_ROOT to enable it")
+    root = os.path.realpath(settings.ingest_root)
+    path = os.path.realpath(os.path.join(root, directory))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Directory {directory} is outside the ingest root")
+    if not os.path.isdir(path):
+        raise ValueError(f"Directory {directory} not found")
+
+    result = await INGESTOR.ingest(path, prefix)
+    return result.summary()
+
+# Defining the mcp tool for undoing the latest edit of a document
+@mcp.tool(
+    name="undo",
+    description="Undo the latest edit to a document that has not been undone yet. The undo is saved as a new version.",
+    annotations=EDITS_DOCUMENT,
+)
+def undo(
+    doc_id: str = Field(description="ID of the document whose last edit should be undone"),
+    expected_version: ExpectedVersion = None,
+) -> dict:
+    if doc_id not in DOCUMENTS:
+        raise ValueError(f"Doc with id {doc_id} not found!")
+
+    return {"doc_id": doc_id, "version": DOCUMENTS.undo(doc_id, expected_version)}
+
+
+# Defining the mcp tool for redoing an undone edit
+@mcp.tool(
+    name="redo",
+    description="Apply the most recently undone edit to a document again. Any new edit after an undo discards the redo.",
+    annotations=EDITS_DOCUMENT,
+)
+def redo(
+    doc_id: str = Field(description="ID of the document whose undone edit should be reapplied"),
+    expected_version: ExpectedVersion = None,
+) -> dict:
+    if doc_id not in DOCUMENTS:
+        raise ValueError(f"Doc with id {doc_id} not found!")
+
+    return {"doc_id": doc_id, "version": DOCUMENTS.redo(doc_id, expected_version)}
+
+
+# Defining the mcp tool for restoring an earlier version of a document
+@mcp.tool(
+    name="revert_to_version",
+    description=(
+        "Restore a document to the text it had at an earlier version. The revert is saved as a new "
+        "version, so it can be undone. Use 'document_history' to see which versions are available."
+    ),
+    annotations=EDITS_DOCUMENT,
+)
+def revert_to_version(
+    doc_id: str = Field(description="ID of the document to revert"),
+    version: int = Field(description="The version whose text should be restored"),
+    expected_version: ExpectedVersion = None,
+) -> dict:
+    if doc_id not in DOCUMENTS:
+        raise ValueError(f"Doc with id {doc_id} not found!")
+
+    return {"doc_id": doc_id, "version": DOCUMENTS.revert_to_version(doc_id, version, expected_version)}
+
+
+# Defining the mcp tool for listing the edit history of a document
+@mcp.tool(
+    name="document_history",
+    description="List the most recent revisions of a document, newest first, with the number of characters each one inserted and removed.",
+    annotations=READ_ONLY,
+)
+def document_history(
+    doc_id: str = Field(description="ID of the document"),
+    limit: int = Field(default=20, description="Maximum number of revisions to return"),
+) -> dict:
+    if doc_id not in DOCUMENTS:
+        raise ValueError(f"Doc with id {doc_id} not found!")
+
+    current = DOCUMENTS.version(doc_id)
+    revisions = DOCUMENTS.history.revisions(doc_id)[::-1][: max(limit, 0)]
+
+    return {
+        "doc_id": doc_id,
+        "version": current,
+        "oldest_version": DOCUMENTS.history.oldest_version(doc_id, current),
+        "can_undo": DOCUMENTS.history.can_undo(doc_id),
+        "can_redo": DOCUMENTS.history.can_redo(doc_id),
+        "revisions": [
+            {
+                "version": r.version,
+                "kind": r.kind,
+                "timestamp": r.timestamp,
+                "edits": len(r.edits),
+                "inserted": r.inserted,
+                "removed": r.removed,
+            }
+            for r in revisions
+        ],
+    }
+
+# Defining resource for the first page of the document listing; subscribe to it to hear of added documents
+@mcp.resource(
+    "docs://documents",
+    mime_type="application/json",
+    description=(
+        "First page of the document listing, in the same form as docs://documents/page/{query}; "
+        "pass its next_cursor to that resource for the rest."
+    ),
+)
+def list_docs() -> dict:
+    return LISTING.page()
+
+# Defining resource for listing documents page by page; the query is a URL-encoded form such as
+# "limit=100&prefix=rep&cursor=..." with the same parameters as the list_documents tool
+@mcp.resource("docs://documents/page/{query}", mime_type="application/json")
+def list_docs_page(query: str) -> dict:
+    params = {name: values[-1] for name, values in parse_qs(unquote(query)).items()}
+    return LISTING.page(
+        prefix=params.get("prefix", ""),
+        glob=params.get("glob"),
+        cursor=params.get("cursor"),
+        limit=int(params.get("limit", 100)),
+    )
+
+# Defining resource for fetching the contents of a particular document; IDs containing "/" are percent-encoded
 @mcp.resource("docs://documents/{doc_id}", mime_type="text/plain")
 def fetch_doc(doc_id: str) -> str:
-    if doc_id not in DOCUMENT:
+    doc_id = unquote(doc_id)
+    if doc_id not in DOCUMENTS:
         raise ValueError(f"Doc with id {doc_id} not found")
     
-    return DOCUMENT[doc_id]
+    return DOCUMENTS.read(doc_id)
+
+# Defining resource for fetching a single line, paragraph or section of a document
+@mcp.resource("docs://documents/{doc_id}/{unit}/{index}", mime_type="text/plain")
+def fetch_doc_part(doc_id: str, unit: str, index: str) -> str:
+    doc_id = unquote(doc_id)
+    if doc_id not in DOCUMENTS:
+        raise ValueError(f"Doc with id {doc_id} not found")
+
+    return DOCUMENTS.read_units(doc_id, unit, int(index))[2]
+
+# Handling resource subscriptions so clients can cache document contents
+@mcp._mcp_server.subscribe_resource()
+async def subscribe_resource(uri: AnyUrl) -> None:
+    SUBSCRIPTIONS.subscribe(str(uri), mcp._mcp_server.request_context.session)
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribe_resource(uri: AnyUrl) -> None:
+    SUBSCRIPTIONS.unsubscribe(str(uri), mcp._mcp_server.request_context.session)
+
+advertise_subscriptions(mcp._mcp_server)
+
+# Request latency, payload size and error metrics, plus document store gauges, served at /metrics
+METRICS = ServerMetrics()
+METRICS.instrument(mcp)
+
+DOCUMENT_GAUGES = {
+    "documents": ("mcp_documents", "Documents in the store."),
+    "open_buffers": ("mcp_document_open_buffers", "Documents loaded into editable buffers."),
+    "cached_views": ("mcp_document_cached_views", "Rebuilt earlier versions kept for repeated reads."),
+    "revisions": ("mcp_document_revisions", "Revisions kept in the edit history."),
+}
+
+def document_gauges() -> dict[str, tuple[str, float]]:
+    stats = DOCUMENTS.stats()
+    return {metric: (help_text, stats[stat]) for stat, (metric, help_text) in DOCUMENT_GAUGES.items()}
+
+METRICS.add_gauges(document_gauges)
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
 
 # Defining a prompt to rephrase the document in a different way
 @mcp.prompt(
@@ -86,12 +568,27 @@ def rephrase_document(
     </document_id>
 
     Feel free to add concise extra texts, but don't change the meaning of the report.
-    Use the 'edit_document' tool to edit the document. After the document has been edited, respond with the final version of the doc. Don't explain your changes.
+    Use the 'batch_edit_document' tool to make all of your replacements in one call, or 'edit_document' for a single change. After the document has been edited, respond with the final version of the doc. Don't explain your changes.
     """
 
     return [base.UserMessage(prompt)]
 
 
-# Run the MCP server using streamable-http transport
+# Run the MCP server over SSE by default, or over stdio when spawned by a client
 if __name__ == "__main__":
-    mcp.run(transport="sse")
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Document MCP server")
+    parser.add_argument("--transport", choices=["sse", "stdio", "streamable-http"], default="sse")
+    args = parser.parse_args()
+
+    if settings.profile_mode:
+        # Profile each request; requests slower than PROFILE_THRESHOLD_MS are written to PROFILE_DIR
+        profile_requests(mcp._mcp_server, Profiler(
+            mode=settings.profile_mode,
+            output_dir=settings.profile_dir,
+            threshold_ms=settings.profile_threshold_ms,
+            interval_ms=settings.profile_interval_ms,
+            prefix="server",
+        ))
+    mcp.run(transport=args.transport)
\ No newline at end of file
@@ -0,0 +1,758 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+from abc import abstractmethod
+from collections.abc import MutableMapping
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; the store directory is not locked there
+    fcntl = None
+
+from ..logger import setup_logger
+from .history import Edit
+from .text_buffer import PieceTable
+
+logger = setup_logger(__name__)
+
+
+def utf8_size(text: str) -> int:
+    """Size of ``text`` in UTF-8 bytes."""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def fold_edits(text: str, batches: Iterable[list[Edit]]) -> str:
+    """Applies batches of edits in order; each batch is in ascending positions of the text it edits."""
+    buffer = PieceTable(text)
+    for edits in batches:
+        # Right to left so earlier positions stay valid.
+        for pos, length, new in reversed(edits):
+            buffer.replace_range(pos, length, new)
+    return buffer.text()
+
+
+class StoreLocked(OSError):
+    """Raised when another process already has the store directory open."""
+
+
+class DocumentStore(MutableMapping):
+    """
+    Key/value storage for document bodies, keyed by document ID.
+
+    Stores behave like a ``dict[str, str]`` so the server tools can stay
+    agnostic of where the bodies actually live. Each document also has a
+    version, which starts at 1 and goes up with every write to it.
+    Edits go through ``apply_edits``, so engines can store just the changed
+    ranges instead of the whole body.
+    """
+
+    @abstractmethod
+    def version_of(self, doc_id: str) -> int:
+        """The document's current version. Raises ``KeyError`` for unknown documents."""
+
+    def put_many(self, items: Iterable[tuple[str, str]]) -> None:
+        """Writes several documents at once. Engines may commit them as one batch."""
+        for doc_id, content in items:
+            self[doc_id] = content
+
+    def apply_edits(self, doc_id: str, edits: list[Edit], size: int) -> None:
+        """
+        Applies ``(position, length, text)`` edits, in ascending positions of
+        the current body, as the document's next version. ``size`` is the
+        edited body's size in UTF-8 bytes, which the caller knows from the
+        text it replaced. This default rewrites the whole body.
+        """
+        self[doc_id] = fold_edits(self[doc_id], [edits])
+
+    def apply_edits_many(self, items: Iterable[tuple[str, list[Edit], int]], durable: bool = True) -> None:
+        """
+        Applies ``(doc_id, edits, size)`` items as ``apply_edits`` does. Engines
+        may commit them as one batch, and with ``durable=False`` may leave
+        syncing it to a later ``sync`` call.
+        """
+        for doc_id, edits, size in items:
+            self.apply_edits(doc_id, edits, size)
+
+    def size_of(self, doc_id: str) -> int:
+        """Size of the document body in UTF-8 bytes."""
+        return utf8_size(self[doc_id])
+
+    def sync(self) -> None:
+        """Makes every write so far durable."""
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class MemoryDocumentStore(DocumentStore):
+    """
+    Process-local store backed by a plain dict. Nothing survives a restart.
+
+    Edits are queued per document and folded into the body when it is next
+    read, or once ``CHECKPOINT_EDITS`` of them have queued up.
+    """
+
+    CHECKPOINT_EDITS = 64
+
+    def __init__(self, documents: Optional[dict[str, str]] = None):
+        self._documents: dict[str, str] = dict(documents or {})
+        self._versions: dict[str, int] = dict.fromkeys(self._documents, 1)
+        self._sizes: dict[str, int] = {doc_id: utf8_size(text) for doc_id, text in self._documents.items()}
+        self._pending: dict[str, list[list[Edit]]] = {}
+        # Reads fold queued edits, so they may run on another thread (e.g. search indexing)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, doc_id: str) -> str:
+        with self._lock:
+            text = self._documents[doc_id]
+            pending = self._pending.pop(doc_id, None)
+            if pending:
+                text = self._documents[doc_id] = fold_edits(text, pending)
+            return text
+
+    def __setitem__(self, doc_id: str, content: str) -> None:
+        with self._lock:
+            self._documents[doc_id] = content
+            self._versions[doc_id] = self._versions.get(doc_id, 0) + 1
+            self._sizes[doc_id] = utf8_size(content)
+            self._pending.pop(doc_id, None)
+
+    def __delitem__(self, doc_id: str) -> None:
+        with self._lock:
+            del self._documents[doc_id]
+            del self._versions[doc_id]
+            del self._sizes[doc_id]
+            self._pending.pop(doc_id, None)
+
+    def apply_edits(self, doc_id: str, edits: list[Edit], size: int) -> None:
+        with self._lock:
+            self._versions[doc_id] += 1
+            self._sizes[doc_id] = size
+            pending = self._pending.setdefault(doc_id, [])
+            pending.append(list(edits))
+            if len(pending) >= self.CHECKPOINT_EDITS:
+                self._documents[doc_id] = fold_edits(self._documents[doc_id], self._pending.pop(doc_id))
+
+    def size_of(self, doc_id: str) -> int:
+        return self._sizes[doc_id]
+
+    def version_of(self, doc_id: str) -> int:
+        return self._versions[doc_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._documents))
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._documents
+
+
+# Record layout inside a segment file:
+#   crc32 (over everything after it) | flags | key length | value length | version | key | value
+_RECORD_HEADER = struct.Struct("<IBHIQ")
+_FLAG_PUT = 0
+_FLAG_DELETE = 1
+_FLAG_EDIT = 2
+
+# Value of an edit record: body size after the edits | edit count, then per edit
+#   position | length | text length | text
+_EDITS_HEADER = struct.Struct("<QI")
+_EDIT = struct.Struct("<QQI")
+
+# Hint file layout: magic | active segment | valid tail offset | entry count, then per entry
+#   key length | segment | value offset | value length | version | body size | edit record count | key,
+#   then per edit record: segment | value offset | value length
+_HINT_MAGIC = b"MCPDOCIX3"
+_HINT_HEADER = struct.Struct("<IQQ")
+_HINT_ENTRY = struct.Struct("<HIQIQQH")
+_HINT_EDIT = struct.Struct("<IQI")
+
+_SEGMENT_SUFFIX = ".seg"
+_HINT_FILE = "index.hint"
+_LOCK_FILE = "LOCK"
+
+# Bodies are checksummed in pieces of this size when the log is replayed
+_SCAN_CHUNK = 1024 * 1024
+
+
+class _Entry(NamedTuple):
+    """Where a document's latest full body is, and the edit records written after it."""
+
+    segment: int
+    offset: int  # of the value
+    length: int
+    version: int
+    size: int  # of the body with the edits applied
+    edits: tuple[tuple[int, int, int], ...] = ()  # (segment, value offset, value length)
+
+
+def _entry_bytes(key_len: int, entry: _Entry) -> int:
+    """Bytes taken by the records a document's entry points to."""
+    return sum(_RECORD_HEADER.size + key_len + length for _segment, _offset, length in (entry[:3], *entry.edits))
+
+
+def _encode_edits(edits: list[Edit], size: int) -> bytes:
+    parts = [_EDITS_HEADER.pack(size, len(edits))]
+    for pos, length, text in edits:
+        data = text.encode("utf-8")
+        parts.append(_EDIT.pack(pos, length, len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def _decode_edits(value: memoryview) -> list[Edit]:
+    _size, count = _EDITS_HEADER.unpack_from(value)
+    offset = _EDITS_HEADER.size
+    edits = []
+    for _ in range(count):
+        pos, length, text_len = _EDIT.unpack_from(value, offset)
+        offset += _EDIT.size
+        edits.append((pos, length, str(value[offset : offset + text_len], "utf-8")))
+        offset += text_len
+    return edits
+
+
+class LogDocumentStore(DocumentStore):
+    """
+    Append-only, log-structured document store.
+
+    Every write is appended to the active segment file, which doubles as the
+    write-ahead log: a record is fsynced before the write returns, and writers
+    on other threads that commit at the same time share a single fsync (group
+    commit). Segments roll over once they reach ``segment_size`` bytes. Once
+    the records that later writes superseded take up more than
+    ``compact_ratio`` of the log, and at least a segment's worth, the live
+    documents are compacted into fresh segments on a background thread; this
+    is also checked when the store is opened.
+
+    An edit appends only its ``(position, length, text)`` ranges. Reads apply
+    the edit records written since the document's last full body; after
+    ``CHECKPOINT_EDITS`` of them, or once they outgrow the body, the next
+    edit writes the whole edited body again instead.
+
+    Only a key index (where each document's full body and later edit records
+    are, plus its version and size) is held in memory. It is loaded at
+    startup from a hint file plus a replay of the log written after the
+    hint, which stops at the first torn or corrupted record. Each record
+    carries the document's version, so versions keep counting up across
+    restarts. Bodies are served from memory-mapped segments, leaving
+    residency to the OS page cache, and every read checks the record's CRC.
+
+    The directory is locked (``flock``) while the store is open, so a second
+    process, e.g. ``mcp-doc-ingest`` next to a running server, fails with
+    ``StoreLocked`` instead of appending to the same segments.
+    """
+
+    CHECKPOINT_EDITS = 64
+
+    def __init__(
+        self,
+        path: str,
+        segment_size: int = 64 * 1024 * 1024,
+        fsync: bool = True,
+        compact_ratio: Optional[float] = 0.5,
+    ):
+        self.path = path
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.compact_ratio = compact_ratio
+
+        os.makedirs(path, exist_ok=True)
+        self._lock_file = self._acquire_directory(path)
+
+        self._lock = threading.RLock()
+        self._sync_cond = threading.Condition()
+        self._syncing = False
+        self._written_seq = 0
+        self._synced_seq = 0
+
+        self._index: dict[str, _Entry] = {}
+        self._maps: dict[int, mmap.mmap] = {}
+        self._dirty_hint = False
+        # Bytes in all segments, and in records superseded by later writes
+        self._total_bytes = 0
+        self._dead_bytes = 0
+        self._compacting = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+
+        self._load()
+        self._maybe_compact()
+
+    @staticmethod
+    def _acquire_directory(path: str):
+        lock_file = open(os.path.join(path, _LOCK_FILE), "a+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise StoreLocked(f"Document store {path} is open in another process") from None
+        return lock_file
+
+    # Segment files
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.path, f"{segment:08d}{_SEGMENT_SUFFIX}")
+
+    def _segments(self) -> list[int]:
+        return sorted(
+            int(name[: -len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(self.path)
+            if name.endswith(_SEGMENT_SUFFIX)
+        )
+
+    def _open_active(self, segment: int) -> None:
+        self._active = segment
+        self._file = open(self._segment_path(segment), "ab")
+        self._tail = self._file.tell()
+
+    def _rotate(self) -> None:
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._drop_map(self._active)
+        self._open_active(self._active + 1)
+
+    def _drop_map(self, segment: int) -> None:
+        mapped = self._maps.pop(segment, None)
+        if mapped is not None:
+            mapped.close()
+
+    def _map(self, segment: int, end: int) -> mmap.mmap:
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            # The active segment keeps growing; remap once reads reach past the old mapping.
+            if segment == self._active:
+                self._file.flush()
+            self._drop_map(segment)
+            with open(self._segment_path(segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    # Startup
+
+    def _load(self) -> None:
+        segments = self._segments()
+        start_segment, start_offset = self._load_hint(segments)
+
+        for segment in segments:
+            if segment < start_segment:
+                continue
+            self._scan_segment(segment, start_offset if segment == start_segment else 0)
+
+        self._open_active(segments[-1] if segments else 1)
+        self._count_bytes()
+        logger.info(f"Opened document store at {self.path} with {len(self._index)} documents")
+
+    def _load_hint(self, segments: list[int]) -> tuple[int, int]:
+        hint_path = os.path.join(self.path, _HINT_FILE)
+        if not segments or not os.path.exists(hint_path):
+            return (segments[0] if segments else 1), 0
+
+        with open(hint_path, "rb") as f:
+            data = f.read()
+
+        if not data.startswith(_HINT_MAGIC):
+            logger.warning(f"Ignoring unreadable hint file {hint_path}")
+            return segments[0], 0
+
+        pos = len(_HINT_MAGIC)
+        segment, offset, count = _HINT_HEADER.unpack_from(data, pos)
+        pos += _HINT_HEADER.size
+        if segment not in segments:
+            return segments[0], 0
+
+        index = {}
+        for _ in range(count):
+            key_len, seg, value_offset, value_len, version, size, edit_count = _HINT_ENTRY.unpack_from(data, pos)
+            pos += _HINT_ENTRY.size
+            doc_id = data[pos : pos + key_len].decode("utf-8")
+            pos += key_len
+            edits = []
+            for _ in range(edit_count):
+                edits.append(_HINT_EDIT.unpack_from(data, pos))
+                pos += _HINT_EDIT.size
+            index[doc_id] = _Entry(seg, value_offset, value_len, version, size, tuple(edits))
+
+        self._index = index
+        return segment, offset
+
+    def _scan_segment(self, segment: int, offset: int) -> None:
+        """Replays records from ``offset``, checking each one's CRC."""
+        path = self._segment_path(segment)
+        size = os.path.getsize(path)
+        start = offset
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while offset < size:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+                crc, flags, key_len, value_len, version = _RECORD_HEADER.unpack(header)
+                end = offset + _RECORD_HEADER.size + key_len + value_len
+                if end > size:
+                    break
+                key = f.read(key_len)
+                checksum = zlib.crc32(key, zlib.crc32(header[4:]))
+                first = b""
+                remaining = value_len
+                while remaining:
+                    chunk = f.read(min(remaining, _SCAN_CHUNK))
+                    checksum = zlib.crc32(chunk, checksum)
+                    first = first or chunk
+                    remaining -= len(chunk)
+                if checksum != crc:
+                    break
+
+                doc_id = key.decode("utf-8")
+                location = (segment, end - value_len, value_len)
+                if flags == _FLAG_DELETE:
+                    self._index.pop(doc_id, None)
+                elif flags == _FLAG_EDIT:
+                    entry = self._index.get(doc_id)
+                    if entry is None:
+                        logger.warning(f"Skipping edit record for unknown doc {doc_id!r} at {path}:{offset}")
+                    else:
+                        body_size = _EDITS_HEADER.unpack_from(first)[0]
+                        self._index[doc_id] = entry._replace(
+                            version=version, size=body_size, edits=entry.edits + (location,)
+                        )
+                else:
+                    self._index[doc_id] = _Entry(*location, version, value_len)
+                offset = end
+
+        if offset < size:
+            # A torn or corrupted record, e.g. from an interrupted write; drop it and
+            # everything after it so appends stay aligned.
+            logger.warning(f"Truncating torn or corrupted record at {path}:{offset}")
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+
+        if offset > start:
+            self._dirty_hint = True
+
+    # Writes
+
+    def _write(self, records: list[tuple[str, int, bytes]], versions: Optional[list[int]] = None) -> int:
+        """
+        Appends ``(doc_id, flags, value)`` records to the active segment and
+        returns the sequence number to commit. Each put or edit moves the
+        document to its next version unless ``versions`` gives the ones to
+        keep, as compaction does.
+        """
+        with self._lock:
+            for i, (doc_id, flags, body) in enumerate(records):
+                key = doc_id.encode("utf-8")
+                if len(key) > 0xFFFF:
+                    raise ValueError(f"Doc id {doc_id!r} is too long")
+
+                if self._tail > 0 and self._tail + _RECORD_HEADER.size + len(key) + len(body) > self.segment_size:
+                    self._rotate()
+
+                entry = self._index.get(doc_id)
+                record_size = _RECORD_HEADER.size + len(key) + len(body)
+                self._total_bytes += record_size
+                if flags == _FLAG_DELETE:
+                    self._dead_bytes += record_size
+                if entry is not None and flags != _FLAG_EDIT:
+                    self._dead_bytes += _entry_bytes(len(key), entry)
+
+                if flags == _FLAG_DELETE:
+                    version = 0
+                elif versions is not None:
+                    version = versions[i]
+                else:
+                    version = entry.version + 1 if entry is not None else 1
+
+                header = _RECORD_HEADER.pack(0, flags, len(key), len(body), version)
+                crc = zlib.crc32(body, zlib.crc32(key, zlib.crc32(header[4:])))
+                self._file.write(_RECORD_HEADER.pack(crc, flags, len(key), len(body), version))
+                self._file.write(key)
+                self._file.write(body)
+
+                value_offset = self._tail + _RECORD_HEADER.size + len(key)
+                self._tail = value_offset + len(body)
+
+                location = (self._active, value_offset, len(body))
+                if flags == _FLAG_DELETE:
+                    self._index.pop(doc_id, None)
+                elif flags == _FLAG_EDIT:
+                    size = _EDITS_HEADER.unpack_from(body)[0]
+                    self._index[doc_id] = entry._replace(version=version, size=size, edits=entry.edits + (location,))
+                else:
+                    self._index[doc_id] = _Entry(*location, version, len(body))
+
+            self._written_seq += 1
+            self._dirty_hint = True
+            return self._written_seq
+
+    def _append(self, records: list[tuple[str, int, bytes]]) -> None:
+        self._commit(self._write(records))
+        self._maybe_compact()
+
+    def _commit(self, seq: int) -> None:
+        """
+        Makes everything up to ``seq`` durable. The first waiting writer becomes
+        the leader and fsyncs on behalf of every writer that queued up meanwhile.
+        """
+        with self._sync_cond:
+            while self._synced_seq < seq and self._syncing:
+                self._sync_cond.wait()
+            if self._synced_seq >= seq:
+                return
+            self._syncing = True
+
+        target = 0
+        try:
+            with self._lock:
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+                target = self._written_seq
+        finally:
+            with self._sync_cond:
+                self._syncing = False
+                self._synced_seq = max(self._synced_seq, target)
+                self._sync_cond.notify_all()
+
+    def __setitem__(self, doc_id: str, content: str) -> None:
+        self._append([(doc_id, _FLAG_PUT, content.encode("utf-8"))])
+
+    def __delitem__(self, doc_id: str) -> None:
+        if doc_id not in self._index:
+            raise KeyError(doc_id)
+        self._append([(doc_id, _FLAG_DELETE, b"")])
+
+    def put_many(self, items: Iterable[tuple[str, str]]) -> None:
+        self._append([(doc_id, _FLAG_PUT, content.encode("utf-8")) for doc_id, content in items])
+
+    def apply_edits(self, doc_id: str, edits: list[Edit], size: int) -> None:
+        with self._lock:
+            seq = self._write([self._edit_record(doc_id, edits, size)])
+        self._commit(seq)
+        self._maybe_compact()
+
+    def apply_edits_many(self, items: Iterable[tuple[str, list[Edit], int]], durable: bool = True) -> None:
+        with self._lock:
+            records = [self._edit_record(doc_id, edits, size) for doc_id, edits, size in items]
+            if not records:
+                return
+            seq = self._write(records)
+            if not durable:
+                # Written through to the file, so a full disk fails here rather than in sync()
+                self._file.flush()
+        if durable:
+            self._commit(seq)
+        self._maybe_compact()
+
+    def sync(self) -> None:
+        with self._lock:
+            seq = self._written_seq
+        self._commit(seq)
+
+    def _edit_record(self, doc_id: str, edits: list[Edit], size: int) -> tuple[str, int, bytes]:
+        """An edit record, or a full body when it is time for a checkpoint."""
+        entry = self._index[doc_id]
+        value = _encode_edits(edits, size)
+        if (
+            len(entry.edits) + 1 < self.CHECKPOINT_EDITS
+            and sum(length for _segment, _offset, length in entry.edits) + len(value) <= entry.length
+        ):
+            return doc_id, _FLAG_EDIT, value
+        return doc_id, _FLAG_PUT, fold_edits(self[doc_id], [edits]).encode("utf-8")
+
+    # Reads
+
+    def _records(self, doc_id: str) -> list[memoryview]:
+        """
+        The values of the document's latest full body and of the edit records
+        after it, each checked against its record's CRC. The lock is only held
+        to look up and map the records, not to copy and check them.
+        """
+        key_len = len(doc_id.encode("utf-8"))
+        while True:
+            with self._lock:
+                entry = self._index[doc_id]
+                locations = [entry[:3], *entry.edits]
+                ends: dict[int, int] = {}
+                for segment, offset, length in locations:
+                    ends[segment] = max(ends.get(segment, 0), offset + length)
+                maps = {segment: self._map(segment, end) for segment, end in ends.items()}
+            try:
+                records = [
+                    memoryview(maps[segment][offset - key_len - _RECORD_HEADER.size : offset + length])
+                    for segment, offset, length in locations
+                ]
+                break
+            except ValueError:
+                # A segment was remapped or compacted away meanwhile; look the document up again
+                continue
+
+        values = []
+        for record, (segment, _offset, _length) in zip(records, locations):
+            if zlib.crc32(record[4:]) != _RECORD_HEADER.unpack_from(record)[0]:
+                raise OSError(f"Corrupted record for doc {doc_id!r} in {self._segment_path(segment)}")
+            values.append(record[_RECORD_HEADER.size + key_len :])
+        return values
+
+    def __getitem__(self, doc_id: str) -> str:
+        body, *edits = self._records(doc_id)
+        text = str(body, "utf-8")
+        if edits:
+            text = fold_edits(text, [_decode_edits(value) for value in edits])
+        return text
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._index))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._index
+
+    def size_of(self, doc_id: str) -> int:
+        """Returns the encoded body size without touching the body."""
+        return self._index[doc_id].size
+
+    def version_of(self, doc_id: str) -> int:
+        return self._index[doc_id].version
+
+    # Maintenance
+
+    def write_hint(self) -> None:
+        """Snapshots the key index so the next open can skip replaying the log."""
+        with self._lock:
+            self._file.flush()
+            parts = [_HINT_MAGIC, _HINT_HEADER.pack(self._active, self._tail, len(self._index))]
+            for doc_id, entry in self._index.items():
+                key = doc_id.encode("utf-8")
+                parts.append(_HINT_ENTRY.pack(len(key), *entry[:5], len(entry.edits)))
+                parts.append(key)
+                parts.extend(_HINT_EDIT.pack(*location) for location in entry.edits)
+
+            hint_path = os.path.join(self.path, _HINT_FILE)
+            tmp_path = hint_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(b"".join(parts))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, hint_path)
+            self._dirty_hint = False
+
+    def _count_bytes(self) -> None:
+        """Recounts the bytes in the segments and how many of them are superseded."""
+        with self._lock:
+            self._file.flush()
+            self._total_bytes = sum(os.path.getsize(self._segment_path(segment)) for segment in self._segments())
+            live = sum(_entry_bytes(len(doc_id.encode("utf-8")), entry) for doc_id, entry in self._index.items())
+            self._dead_bytes = self._total_bytes - live
+
+    def _maybe_compact(self) -> None:
+        """Starts a background compaction once enough of the log is superseded."""
+        with self._lock:
+            if self.compact_ratio is None or (self._compactor is not None and self._compactor.is_alive()):
+                return
+            if self._dead_bytes < max(self.segment_size, self.compact_ratio * self._total_bytes):
+                return
+            self._compactor = threading.Thread(target=self._compact_in_background, name="store-compaction", daemon=True)
+            self._compactor.start()
+
+    def _compact_in_background(self) -> None:
+        try:
+            before = self._total_bytes
+            self.compact()
+            logger.info(f"Compacted document store at {self.path} from {before} to {self._total_bytes} bytes")
+        except Exception:
+            logger.exception(f"Compacting document store at {self.path} failed")
+
+    def compact(self) -> None:
+        """
+        Rewrites live documents into fresh segments, with their edits folded
+        into a full body, and deletes the old segments. Documents are copied
+        one at a time, and other writers can go on while the copies are synced.
+        Only one compaction runs at a time.
+        """
+        with self._compacting:
+            self._compact()
+
+    def _compact(self) -> None:
+        with self._lock:
+            old_segments = self._segments()
+            self._rotate()
+            first_new = self._active
+            doc_ids = list(self._index)
+
+        seq = 0
+        for doc_id in doc_ids:
+            with self._lock:
+                entry = self._index.get(doc_id)
+                if entry is None or entry.segment >= first_new:
+                    continue  # deleted or rewritten since compaction started
+                seq = self._write([(doc_id, _FLAG_PUT, self[doc_id].encode("utf-8"))], versions=[entry.version])
+        self._commit(seq)
+
+        with self._lock:
+            self._rotate()
+            for segment in old_segments:
+                self._drop_map(segment)
+                os.remove(self._segment_path(segment))
+            self.write_hint()
+            self._count_bytes()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            if self._dirty_hint:
+                self.write_hint()
+
+    def close(self) -> None:
+        # Let a background compaction finish; it needs the open segment.
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            if self._file.closed:
+                return
+            self.flush()
+            self._file.close()
+            for segment in list(self._maps):
+                self._drop_map(segment)
+            # Closing the file releases the directory lock.
+            self._lock_file.close()
+
+
+def open_store(
+    path: Optional[str] = None,
+    seed: Optional[dict[str, str]] = None,
+    segment_size: int = 64 * 1024 * 1024,
+    compact_ratio: Optional[float] = 0.5,
+) -> DocumentStore:
+    """
+    Opens the configured document store. Without a path documents live in
+    memory only. ``seed`` populates a store that is empty.
+    """
+    store: DocumentStore
+    if path:
+        store = LogDocumentStore(path, segment_size=segment_size, compact_ratio=compact_ratio)
+    else:
+        store = MemoryDocumentStore()
+
+    if seed and len(store) == 0:
+        store.put_many(seed.items())
+
+    return store
@@ -0,0 +1,108 @@
+import asyncio
+import weakref
+from typing import Optional
+from urllib.parse import quote
+
+from mcp import types
+from mcp.server.lowlevel import Server
+from mcp.server.session import ServerSession
+
+from ..logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DOCUMENTS_URI = "docs://documents"
+
+
+def _document_key(uri: str) -> Optional[str]:
+    """The quoted document ID a ``docs://documents/{doc_id}/...`` URI points into."""
+    if not uri.startswith(DOCUMENTS_URI + "/"):
+        return None
+    return uri[len(DOCUMENTS_URI) + 1 :].split("/", 1)[0]
+
+
+def advertise_subscriptions(server: Server) -> None:
+    """
+    Makes ``server`` announce ``resources.subscribe`` during initialization.
+    The low-level server always reports it as False, even with subscribe
+    handlers registered, so clients that check it would never subscribe.
+    """
+    get_capabilities = server.get_capabilities
+
+    def with_subscribe(*args, **kwargs) -> types.ServerCapabilities:
+        capabilities = get_capabilities(*args, **kwargs)
+        if capabilities.resources is not None and types.SubscribeRequest in server.request_handlers:
+            capabilities.resources.subscribe = True
+        return capabilities
+
+    server.get_capabilities = with_subscribe
+
+
+class ResourceSubscriptions:
+    """
+    Sessions subscribed to resource URIs, and the ``resources/updated``
+    notifications sent to them.
+
+    A change to a document notifies subscribers of its URI and of every URI
+    beneath it (``docs://documents/{doc_id}/...``). Subscribed URIs are also
+    indexed by document, so a change only looks at that document's URIs.
+    Notifications are sent from background tasks, since document listeners
+    are called synchronously.
+    """
+
+    def __init__(self):
+        self._sessions: dict[str, weakref.WeakSet[ServerSession]] = {}
+        # Quoted document ID -> subscribed URIs for that document
+        self._documents: dict[str, set[str]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def subscribe(self, uri: str, session: ServerSession) -> None:
+        self._sessions.setdefault(uri, weakref.WeakSet()).add(session)
+        key = _document_key(uri)
+        if key is not None:
+            self._documents.setdefault(key, set()).add(uri)
+
+    def unsubscribe(self, uri: str, session: ServerSession) -> None:
+        sessions = self._sessions.get(uri)
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del self._sessions[uri]
+                self._forget(uri)
+
+    def _forget(self, uri: str) -> None:
+        key = _document_key(uri)
+        uris = self._documents.get(key)
+        if uris is not None:
+            uris.discard(uri)
+            if not uris:
+                del self._documents[key]
+
+    def subscribers(self, uri: str) -> list[ServerSession]:
+        return list(self._sessions.get(uri, ()))
+
+    def notify(self, *uris: str) -> None:
+        """Schedules ``resources/updated`` for each subscribed URI in ``uris``."""
+        targets = [(uri, session) for uri in uris for session in self.subscribers(uri)]
+        if not targets:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called outside the server (e.g. from a script); nobody can be listening.
+            return
+        task = loop.create_task(self._send(targets))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def document_changed(self, doc_id: str) -> None:
+        self.notify(*self._documents.get(quote(doc_id, safe=""), ()))
+
+    async def _send(self, targets: list[tuple[str, ServerSession]]) -> None:
+        for uri, session in targets:
+            try:
+                await session.send_resource_updated(uri)
+            except Exception as e:
+                # The session is gone; forget its subscriptions.
+                logger.debug(f"Dropping subscription to {uri}: {e!r}")
+                self.unsubscribe(uri, session)
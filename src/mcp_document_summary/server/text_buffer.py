@@ -0,0 +1,209 @@
+import random
+from typing import Iterator, Optional
+
+
+class _Piece:
+    """
+    Immutable treap node holding one piece: the span ``source[start:end]``.
+
+    Nodes are ordered by document position and balanced by a random priority.
+    Edits copy only the nodes on the path they touch, so older roots stay valid.
+    """
+
+    __slots__ = ("source", "start", "end", "priority", "left", "right", "length")
+
+    def __init__(
+        self,
+        source: str,
+        start: int,
+        end: int,
+        priority: float,
+        left: Optional["_Piece"],
+        right: Optional["_Piece"],
+    ):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.priority = priority
+        self.left = left
+        self.right = right
+        self.length = (end - start) + _length(left) + _length(right)
+
+    def with_children(self, left: Optional["_Piece"], right: Optional["_Piece"]) -> "_Piece":
+        return _Piece(self.source, self.start, self.end, self.priority, left, right)
+
+
+def _length(node: Optional[_Piece]) -> int:
+    return node.length if node is not None else 0
+
+
+def _merge(a: Optional[_Piece], b: Optional[_Piece]) -> Optional[_Piece]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.priority > b.priority:
+        return a.with_children(a.left, _merge(a.right, b))
+    return b.with_children(_merge(a, b.left), b.right)
+
+
+def _split(node: Optional[_Piece], pos: int) -> tuple[Optional[_Piece], Optional[_Piece]]:
+    """Splits a tree into the first ``pos`` characters and the rest."""
+    if node is None:
+        return None, None
+
+    left_len = _length(node.left)
+    piece_len = node.end - node.start
+
+    if pos <= left_len:
+        a, b = _split(node.left, pos)
+        return a, node.with_children(b, node.right)
+
+    if pos >= left_len + piece_len:
+        a, b = _split(node.right, pos - left_len - piece_len)
+        return node.with_children(node.left, a), b
+
+    # The split point falls inside this node's piece: cut it in two.
+    cut = node.start + (pos - left_len)
+    head = _Piece(node.source, node.start, cut, node.priority, node.left, None)
+    tail = _Piece(node.source, cut, node.end, node.priority, None, node.right)
+    return head, tail
+
+
+def _pieces(node: Optional[_Piece]) -> Iterator[tuple[str, int, int]]:
+    stack: list[_Piece] = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        if node.end > node.start:
+            yield node.source, node.start, node.end
+        node = node.right
+
+
+class PieceTable:
+    """
+    Editable text stored as a balanced tree of pieces over immutable strings.
+
+    Inserting, deleting or replacing a range costs O(log p) in the number of
+    pieces and never copies the existing text. The full string is only built
+    by ``text()``, which caches it until the next edit. ``snapshot()`` is O(1)
+    because edits never mutate nodes that are already shared.
+    """
+
+    def __init__(self, text: str = ""):
+        self._root: Optional[_Piece] = (
+            _Piece(text, 0, len(text), random.random(), None, None) if text else None
+        )
+        self._text: Optional[str] = text
+
+    def __len__(self) -> int:
+        return _length(self._root)
+
+    def __str__(self) -> str:
+        return self.text()
+
+    @property
+    def piece_count(self) -> int:
+        return sum(1 for _ in _pieces(self._root))
+
+    def pieces(self) -> Iterator[tuple[str, int, int]]:
+        return _pieces(self._root)
+
+    def snapshot(self) -> "PieceTable":
+        copy = PieceTable.__new__(PieceTable)
+        copy._root = self._root
+        copy._text = self._text
+        return copy
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(source[start:end] for source, start, end in _pieces(self._root))
+        return self._text
+
+    def slice(self, start: int, end: int) -> str:
+        """Returns ``text()[start:end]`` without materializing the whole document."""
+        start = max(0, min(start, len(self)))
+        end = max(start, min(end, len(self)))
+        if self._text is not None:
+            return self._text[start:end]
+
+        _, rest = _split(self._root, start)
+        middle, _ = _split(rest, end - start)
+        return "".join(source[s:e] for source, s, e in _pieces(middle))
+
+    # Edits
+
+    def replace_range(self, pos: int, length: int, text: str) -> None:
+        if pos < 0 or length < 0 or pos + length > len(self):
+            raise IndexError(f"Range {pos}:{pos + length} is outside the document")
+
+        left, rest = _split(self._root, pos)
+        _, right = _split(rest, length)
+        if text:
+            left = _merge(left, _Piece(text, 0, len(text), random.random(), None, None))
+        self._root = _merge(left, right)
+        self._text = None
+
+    def insert(self, pos: int, text: str) -> None:
+        self.replace_range(pos, 0, text)
+
+    def delete(self, pos: int, length: int) -> None:
+        self.replace_range(pos, length, "")
+
+    # Search
+
+    def find_all(self, sub: str) -> Iterator[int]:
+        """
+        Yields the start of every non-overlapping occurrence of ``sub``, left
+        to right, matching ``str.replace`` semantics. Pieces are searched in
+        place; only matches straddling a piece boundary build a small window.
+        """
+        if not sub:
+            raise ValueError("Search string must not be empty")
+
+        if self._text is not None:
+            i = self._text.find(sub)
+            while i != -1:
+                yield i
+                i = self._text.find(sub, i + len(sub))
+            return
+
+        m = len(sub)
+        offset = 0
+        next_allowed = 0
+        tail = ""
+
+        for source, start, end in _pieces(self._root):
+            if tail:
+                window = tail + source[start : min(end, start + m - 1)]
+                i = window.find(sub)
+                while i != -1 and i < len(tail):
+                    found = offset - len(tail) + i
+                    if found >= next_allowed:
+                        yield found
+                        next_allowed = found + m
+                    i = window.find(sub, i + 1)
+
+            i = source.find(sub, start + max(0, next_allowed - offset), end)
+            while i != -1:
+                found = offset + (i - start)
+                yield found
+                next_allowed = found + m
+                i = source.find(sub, i + m, end)
+
+            if m > 1:
+                tail = (tail + source[max(start, end - (m - 1)) : end])[-(m - 1) :]
+            offset += end - start
+
+    def replace_all(self, old: str, new: str) -> list[int]:
+        """
+        Replaces every occurrence of ``old`` with ``new`` and returns the
+        positions (in the original text) that were replaced.
+        """
+        positions = list(self.find_all(old))
+        # Apply right to left so earlier positions stay valid.
+        for pos in reversed(positions):
+            self.replace_range(pos, len(old), new)
+        return positions
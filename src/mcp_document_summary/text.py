@@ -0,0 +1,9 @@
+import re
+
+# A word, as matched by the search index and the retrieval of document excerpts
+WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased words of ``text``, in order."""
+    return [m.group().lower() for m in WORD.finditer(text)]
@@ -0,0 +1,83 @@
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+
+@dataclass
+class Span:
+    name: str
+    start: float  # Unix time
+    duration: float  # seconds
+    attributes: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class Trace:
+    """Timing spans recorded during one conversation turn."""
+
+    def __init__(self, conversation: str, turn: int):
+        self.conversation = conversation
+        self.turn = turn
+        self.start = time.time()
+        self.spans: list[Span] = []
+
+    def rows(self) -> list[dict]:
+        return [
+            {
+                "conversation": self.conversation,
+                "turn": self.turn,
+                "name": span.name,
+                "start": round(span.start, 6),
+                "duration_ms": round(span.duration * 1000, 3),
+                "error": span.error,
+                **({"attributes": span.attributes} if span.attributes else {}),
+            }
+            for span in self.spans
+        ]
+
+    def write_jsonl(self, path: str) -> None:
+        """Appends one JSON line per span to ``path``."""
+        with open(path, "a", encoding="utf-8") as f:
+            for row in self.rows():
+                f.write(json.dumps(row, default=str) + "\n")
+
+
+# The turn being traced in the current task; tasks started during the turn inherit it.
+_current: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def trace_turn(conversation: str, turn: int) -> Iterator[Trace]:
+    """Collects the spans recorded anywhere below this block into one ``Trace``."""
+    trace = Trace(conversation, turn)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[None]:
+    """Times the block as a span of the current turn; does nothing outside a turn."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+
+    start, wall = time.perf_counter(), time.time()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        trace.spans.append(Span(name, wall, time.perf_counter() - start, attributes, error))
@@ -0,0 +1,68 @@
+import pytest
+
+from mcp_document_summary.core.fake_openai import ScriptedOpenAITransport, scripted_conversation
+from mcp_document_summary.core.openai import OpenAIClient
+from mcp_document_summary.server.corpus_replace import CorpusReplacer
+from mcp_document_summary.server.documents import DocumentManager
+from mcp_document_summary.server.listing import DocumentListing
+from mcp_document_summary.server.storage import MemoryDocumentStore
+
+
+@pytest.fixture
+def docs(request) -> DocumentManager:
+    """A manager over notes.md; parametrize indirectly with a dict of DocumentManager options."""
+    store = MemoryDocumentStore({"notes.md": "# Notes\n\nThe first draft.\n\n## Later\n\nMore draft text.\n"})
+    return DocumentManager(store, **getattr(request, "param", {}))
+
+
+@pytest.fixture
+def replacer(request):
+    """A replacer over a small report corpus; parametrize indirectly with a dict of CorpusReplacer options."""
+    store = MemoryDocumentStore({
+        "reports/q1.md": "Revenue grew. Costs grew too.\n",
+        "reports/q2.md": "Revenue fell.\n",
+        "notes.txt": "grew, GREW, grew\n",
+    })
+    replacer = CorpusReplacer(DocumentManager(store), **getattr(request, "param", {}))
+    yield replacer
+    # Shuts down the worker pool of a parallel replacer
+    replacer.close()
+
+
+@pytest.fixture
+def listing(request) -> DocumentListing:
+    """A listing of 252 documents; parametrize indirectly with a dict of DocumentListing options."""
+    store = MemoryDocumentStore({f"doc_{i:03}.md": f"Body {i}" for i in range(250)})
+    store["Reports/Q1.md"] = "Résumé"
+    store["reports/q2.txt"] = "Text"
+    return DocumentListing(DocumentManager(store), **getattr(request, "param", {}))
+
+
+@pytest.fixture
+def transport(request) -> ScriptedOpenAITransport:
+    """Answers with the steps given as the indirect parameter; see ``scripted_conversation``."""
+    return ScriptedOpenAITransport(scripted_conversation(request.param))
+
+
+@pytest.fixture
+def service(transport) -> OpenAIClient:
+    return OpenAIClient(model="gpt-4o", api_key="test", transport=transport)
+
+
+@pytest.fixture
+def server_documents(monkeypatch):
+    """Gives the MCP server a fresh copy of the sample documents, restored after the test."""
+    from mcp_document_summary.server import server
+    from mcp_document_summary.server.search import DocumentSearch
+
+    docs = DocumentManager(MemoryDocumentStore(dict(server.SAMPLE_DOCUMENTS)))
+    search = DocumentSearch(docs.ids, docs.read)
+    docs.add_listener(search.mark_changed)
+    docs.add_listener(server.SUBSCRIPTIONS.document_changed)
+    monkeypatch.setattr(server, "DOCUMENTS", docs)
+    monkeypatch.setattr(server, "SEARCH", search)
+    monkeypatch.setattr(server, "LISTING", DocumentListing(docs))
+    replacer = CorpusReplacer(docs)
+    monkeypatch.setattr(server, "REPLACER", replacer)
+    yield docs
+    replacer.close()
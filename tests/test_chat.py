@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from openai.types.chat import ChatCompletion
+
+from mcp_document_summary.core.chat import Chat
+from mcp_document_summary.core.openai import OpenAIClient
+
+
+def make_completion(text: str) -> ChatCompletion:
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": text},
+        }],
+    })
+
+
+class SlowOpenAI(OpenAIClient):
+    def __init__(self):
+        super().__init__(model="gpt-4o", api_key="test")
+
+    async def achat(self, messages, **kwargs):
+        await asyncio.sleep(0.2)
+        return make_completion(f"echo: {messages[-1]['content']}")
+
+
+def test_concurrent_conversations_do_not_block_each_other():
+    async def run_all():
+        service = SlowOpenAI()
+        chats = [Chat(openai_service=service, clients={}) for _ in range(5)]
+        start = time.perf_counter()
+        answers = await asyncio.gather(*(chat.run(f"q{i}") for i, chat in enumerate(chats)))
+        return answers, time.perf_counter() - start
+
+    answers, elapsed = asyncio.run(run_all())
+    assert answers == [f"echo: q{i}" for i in range(5)]
+    assert elapsed < 0.6
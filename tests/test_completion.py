@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from mcp import types
+from prompt_toolkit.document import Document
+
+from mcp_document_summary.core.cli import CliApp, UnifiedCompleter
+from mcp_document_summary.core.completion import PrefixIndex
+
+
+def completions(completer: UnifiedCompleter, text: str) -> list[str]:
+    return [c.text for c in completer.get_completions(Document(text), None)]
+
+
+def test_prefix_lookup_ignores_case_and_stays_sorted():
+    index = PrefixIndex(["Report.md", "readme.txt", "notes.md", "reports/q1.md"])
+    assert index.prefix("RE") == ["readme.txt", "Report.md", "reports/q1.md"]
+    assert index.prefix("report", limit=1) == ["Report.md"]
+    assert index.prefix("x") == []
+    assert index.prefix("") == ["notes.md", "readme.txt", "Report.md", "reports/q1.md"]
+
+
+def test_incremental_updates():
+    index = PrefixIndex(f"doc_{i:03}.md" for i in range(100))
+    index.update([f"doc_{i:03}.md" for i in range(1, 100)] + ["extra.md"])
+    assert "doc_000.md" not in index and "extra.md" in index
+    assert index.prefix("doc_00") == [f"doc_00{i}.md" for i in range(1, 10)]
+    assert index.fuzzy("tra") == ["extra.md"]
+
+    index.remove("extra.md")
+    index.add("Zeta.md")
+    assert index.fuzzy("ETA") == ["Zeta.md"]
+    assert len(index) == 100
+
+
+def test_fuzzy_matches_follow_prefix_matches():
+    index = PrefixIndex(["q1.md", "reports/q1.md", "archive/q1-old.md", "q2.md"])
+    assert index.complete("q1") == ["q1.md"]
+    assert index.complete("q1", fuzzy=True) == ["q1.md", "archive/q1-old.md", "reports/q1.md"]
+    assert index.complete("q1", limit=2, fuzzy=True) == ["q1.md", "archive/q1-old.md"]
+
+
+def test_completer_completes_mentions_and_command_arguments():
+    completer = UnifiedCompleter()
+    completer.update_prompts([types.Prompt(name="summarize", arguments=[types.PromptArgument(name="doc_id")])])
+    completer.update_resources(["review.md", "Report.pdf", "schedule.docx"])
+
+    assert completions(completer, "compare @re") == ["Report.pdf", "review.md"]
+    assert completions(completer, "/summarize ") == ["Report.pdf", "review.md", "schedule.docx"]
+    assert completions(completer, "/summarize sch") == ["schedule.docx"]
+    assert completions(completer, "/sum") == ["summarize"]
+
+
+def test_cli_refreshes_completions_when_the_document_list_changes():
+    class FakeClient:
+        def __init__(self):
+            self.handlers = []
+
+        def add_notification_handler(self, handler):
+            self.handlers.append(handler)
+
+    class FakeChat:
+        def __init__(self):
+            self.doc_client = FakeClient()
+            self.ids = ["a.md"]
+            self.reads = 0
+
+        async def list_docs_ids(self, limit=None):
+            self.reads += 1
+            await asyncio.sleep(0)
+            return list(self.ids)[:limit]
+
+    async def scenario():
+        chat = FakeChat()
+        cli = CliApp(chat)
+        await cli.refresh_resources()
+        assert completions(cli.completer, "@") == ["a.md"]
+
+        chat.ids.append("b.md")
+        updated = types.ResourceUpdatedNotification(
+            method="notifications/resources/updated", params=types.ResourceUpdatedNotificationParams(uri="docs://documents")
+        )
+        # A burst of notifications is coalesced into at most one more read
+        for _ in range(5):
+            for handler in chat.doc_client.handlers:
+                handler(updated)
+        await cli._refresh
+        assert completions(cli.completer, "@") == ["a.md", "b.md"]
+        assert chat.reads <= 3
+
+        other = SimpleNamespace(params=SimpleNamespace(uri="docs://documents/a.md"))
+        for handler in chat.doc_client.handlers:
+            handler(other)
+        assert cli._refresh.done()
+
+    asyncio.run(scenario())
+
+
+def test_slow_server_falls_back_to_the_known_ids():
+    class SlowChat:
+        doc_client = SimpleNamespace(add_notification_handler=lambda handler: None)
+
+        async def list_docs_page(self, prefix="", limit=100):
+            await asyncio.sleep(5)
+            return {"documents": [{"id": "reports/late.md"}], "next_cursor": None}
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        cli = CliApp(SlowChat())
+        cli._loop = loop
+        cli.completer.update_resources(["reports/q1.md"], complete=False)
+
+        start = time.perf_counter()
+        assert completions(cli.completer, "@reports/") == ["reports/q1.md"]
+        assert time.perf_counter() - start < 2
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from mcp_document_summary.server.corpus_replace import CorpusReplacer, find_edits
+from mcp_document_summary.server.documents import DocumentManager
+from mcp_document_summary.server.storage import MemoryDocumentStore
+
+
+@pytest.mark.parametrize(
+    "text, pattern, replacement, regex, ignore_case",
+    [
+        ("aaaa", "aa", "b", False, False),
+        ("Grew, grew, GREW", "grew", "rose", False, True),
+        ("2024-01-31 and 2025-12-01", r"(\d+)-(\d+)-(\d+)", r"\3/\2/\1", True, False),
+        ("key=value", r"(?P<k>\w+)=(?P<v>\w+)", r"\g<v>=\g<k>", True, False),
+        ("a.b.c", ".", "-", False, False),
+    ],
+)
+def test_find_edits_match_str_replace_and_re_sub(text, pattern, replacement, regex, ignore_case):
+    import re
+
+    expected = (
+        re.sub(pattern if regex else re.escape(pattern), replacement, text, flags=re.IGNORECASE if ignore_case else 0)
+        if regex or ignore_case
+        else text.replace(pattern, replacement)
+    )
+    result = text
+    for position, length, new in reversed(find_edits(text, pattern, replacement, regex, ignore_case)):
+        result = result[:position] + new + result[position + length:]
+    assert result == expected
+
+
+def test_invalid_patterns_are_rejected(replacer):
+    with pytest.raises(ValueError):
+        asyncio.run(replacer.replace("", "x"))
+    with pytest.raises(ValueError, match="Invalid regular expression"):
+        asyncio.run(replacer.replace("(", "x", regex=True))
+
+
+def test_replace_edits_matching_documents_once_each(replacer):
+    docs = replacer.documents
+    result = asyncio.run(replacer.replace("grew", "rose", doc_glob="reports/*"))
+
+    assert result.documents_scanned == 2
+    assert result.matches == {"reports/q1.md": (2, 2)}
+    assert docs.read("reports/q1.md") == "Revenue rose. Costs rose too.\n"
+    assert docs.version("reports/q2.md") == 1
+    assert docs.read("notes.txt") == "grew, GREW, grew\n"
+
+    # The whole replacement is one version, undone in one step
+    docs.undo("reports/q1.md")
+    assert docs.read("reports/q1.md") == "Revenue grew. Costs grew too.\n"
+
+
+def test_dry_run_counts_without_editing(replacer):
+    docs = replacer.documents
+    result = asyncio.run(replacer.replace("grew", "rose", ignore_case=True, dry_run=True))
+
+    assert result.matches == {"reports/q1.md": (2, 1), "notes.txt": (3, 1)}
+    assert result.total_replacements == 5
+    assert all(docs.version(doc_id) == 1 for doc_id in docs.ids())
+
+
+@pytest.mark.parametrize("replacer", [{"workers": 2, "parallel_threshold": 0}], indirect=True)
+def test_large_corpora_are_scanned_by_the_process_pool(replacer):
+    docs = replacer.documents
+    result = asyncio.run(replacer.replace(r"Revenue (\w+)", r"Sales \1", regex=True))
+
+    assert result.parallel
+    assert docs.read("reports/q1.md").startswith("Sales grew.")
+    assert docs.read("reports/q2.md") == "Sales fell.\n"
+
+
+def test_documents_edited_during_the_scan_are_scanned_again(replacer):
+    docs = replacer.documents
+    scan = replacer._scan
+
+    async def scan_while_editing(*args):
+        found = await scan(*args)
+        docs.apply_edits("reports/q1.md", [(0, 0, "grew ")])
+        docs.apply_edits("reports/q2.md", [(0, 0, "grew ")])
+        return found
+
+    replacer._scan = scan_while_editing
+    result = asyncio.run(replacer.replace("grew", "rose"))
+
+    assert docs.read("reports/q1.md") == "rose Revenue rose. Costs rose too.\n"
+    assert docs.read("reports/q2.md") == "rose Revenue fell.\n"
+    assert result.matches["reports/q1.md"] == (3, 3)
+    assert result.matches["reports/q2.md"] == (1, 3)
+
+
+@pytest.mark.parametrize("replacer", [{"batch_size": 20}], indirect=True)
+def test_documents_are_read_in_bounded_batches(replacer):
+    docs = replacer.documents
+    versions = {}
+    batches = replacer._batches(docs.ids(), versions)
+
+    first = next(batches)
+    assert [len(text) for _doc_id, text in first] == [len(docs.read(first[0][0]))]
+    assert len(versions) == 1  # later documents are not read until the next batch is needed
+    rest = list(batches)
+    assert sum(len(batch) for batch in [first, *rest]) == 3
+    assert versions == {doc_id: 1 for doc_id in docs.ids()}
+
+
+@pytest.mark.parametrize("replacer", [{"workers": 2, "parallel_threshold": 0, "batch_size": 1}], indirect=True)
+def test_parallel_scan_streams_batches_to_the_pool(replacer):
+    result = asyncio.run(replacer.replace("grew", "rose"))
+
+    assert result.parallel
+    assert result.matches == {"reports/q1.md": (2, 2), "notes.txt": (2, 2)}
+
+
+def test_edits_are_written_as_one_batch_synced_off_the_event_loop():
+    import threading
+
+    class RecordingStore(MemoryDocumentStore):
+        def __init__(self, documents):
+            super().__init__(documents)
+            self.batches = []
+            self.sync_threads = []
+
+        def apply_edits_many(self, items, durable=True):
+            items = list(items)
+            self.batches.append((sorted(doc_id for doc_id, _edits, _size in items), durable))
+            super().apply_edits_many(items, durable)
+
+        def sync(self):
+            self.sync_threads.append(threading.current_thread())
+
+    store = RecordingStore({"a.md": "grew", "b.md": "fell", "c.md": "grew grew"})
+    docs = DocumentManager(store)
+    result = asyncio.run(CorpusReplacer(docs).replace("grew", "rose"))
+
+    assert result.matches == {"a.md": (1, 2), "c.md": (2, 2)}
+    assert store.batches == [(["a.md", "c.md"], False)]
+    assert len(store.sync_threads) == 1 and store.sync_threads[0] is not threading.main_thread()
+    assert docs.read("c.md") == store["c.md"] == "rose rose"
@@ -0,0 +1,179 @@
+import random
+
+import pytest
+
+from mcp_document_summary.server.documents import DocumentManager, VersionConflict
+from mcp_document_summary.server.storage import LogDocumentStore, MemoryDocumentStore
+
+
+def test_snapshot_reads_are_isolated_from_later_edits(docs):
+    version, snapshot = docs.snapshot("notes.md")
+    assert version == 1
+
+    docs.replace("notes.md", "draft", "version")
+    assert docs.version("notes.md") == 2
+    assert "draft" in snapshot.text()
+
+    assert docs.read("notes.md", version=1) == snapshot.text()
+    assert docs.read_range("notes.md", 9, 15, version=1)[2] == "The first draft"
+    assert docs.read_units("notes.md", "section", 1, version=1)[2] == "## Later\n\nMore draft text.\n"
+    assert docs.count("notes.md", "paragraph", version=1) == 4
+    assert docs.read_range("notes.md", 9, 17)[2] == "The first version"
+
+
+def test_expected_version_rejects_stale_edits(docs):
+    docs.replace("notes.md", "first", "second", expected_version=1)
+
+    with pytest.raises(VersionConflict) as conflict:
+        docs.replace("notes.md", "second", "third", expected_version=1)
+    assert conflict.value.current == 2
+    assert "third" not in docs.read("notes.md")
+
+    with pytest.raises(VersionConflict):
+        docs.replace_many("notes.md", [("draft", "copy")], expected_version=1)
+    assert docs.replace_many("notes.md", [("draft", "copy")], expected_version=2) == [2]
+    assert docs.version("notes.md") == 3
+
+
+def test_versions_continue_after_a_restart(tmp_path):
+    docs = DocumentManager(LogDocumentStore(str(tmp_path)))
+    docs.put_many([("notes.md", "The first draft.")])
+    docs.replace("notes.md", "first", "second")
+    docs.close()
+
+    # A client holding version 2 from before the restart must not pass a stale check.
+    docs = DocumentManager(LogDocumentStore(str(tmp_path)))
+    assert docs.version("notes.md") == 2
+    docs.replace("notes.md", "second", "third", expected_version=2)
+    assert docs.version("notes.md") == 3
+    with pytest.raises(VersionConflict):
+        docs.replace("notes.md", "third", "fourth", expected_version=2)
+    with pytest.raises(ValueError, match="versions 2 to 3"):
+        docs.read("notes.md", version=1)
+    docs.close()
+
+
+@pytest.mark.parametrize("docs", [{"max_history": 2}], indirect=True)
+def test_only_recent_versions_are_kept(docs):
+    for word in ("one", "two", "three"):
+        docs.apply_edits("notes.md", [(0, 0, word)])
+
+    assert docs.read("notes.md", version=3).startswith("two")
+    with pytest.raises(ValueError, match="versions 2 to 4"):
+        docs.read("notes.md", version=1)
+
+
+@pytest.mark.parametrize("docs", [{"checkpoint_interval": 3}], indirect=True)
+def test_every_kept_version_is_reconstructed_exactly(docs):
+    rng = random.Random(7)
+    texts = {1: docs.read("notes.md")}
+
+    for _ in range(40):
+        length = len(docs.buffer("notes.md"))
+        edits, pos = [], 0
+        while pos < length and len(edits) < 3:
+            pos = rng.randint(pos, length)
+            size = rng.randint(0, min(5, length - pos))
+            edits.append((pos, size, rng.choice(["", "x", "new text", "\n\n# H\n"])))
+            pos += size + 1
+        docs.apply_edits("notes.md", edits)
+        texts[docs.version("notes.md")] = docs.buffer("notes.md").text()
+
+    for version, text in texts.items():
+        assert docs.read("notes.md", version=version) == text
+
+
+def test_undo_redo_and_revert(docs):
+    original = docs.read("notes.md")
+    docs.replace("notes.md", "first", "second")
+    docs.replace("notes.md", "draft", "copy")
+    edited = docs.read("notes.md")
+
+    assert docs.undo("notes.md") == 4
+    assert "second draft" in docs.read("notes.md")
+    assert docs.undo("notes.md") == 5
+    assert docs.read("notes.md") == original
+    with pytest.raises(ValueError, match="Nothing to undo"):
+        docs.undo("notes.md")
+
+    docs.redo("notes.md")
+    docs.redo("notes.md")
+    assert docs.read("notes.md") == edited
+    assert [r.kind for r in docs.history.revisions("notes.md")] == ["edit", "edit", "undo", "undo", "redo", "redo"]
+
+    # A new edit clears the redo stack; reverting is itself undoable.
+    docs.undo("notes.md")
+    docs.replace("notes.md", "Notes", "Log")
+    assert not docs.history.can_redo("notes.md")
+    docs.revert_to_version("notes.md", 1)
+    assert docs.read("notes.md") == original
+    docs.undo("notes.md")
+    assert "# Log" in docs.read("notes.md")
+
+
+def test_history_memory_tracks_edit_size():
+    store = MemoryDocumentStore({"big.txt": "abcdefghij" * 100_000})
+    docs = DocumentManager(store)
+    for i in range(100):
+        docs.apply_edits("big.txt", [(i * 1000, 3, "XYZW")])
+
+    stored = sum(
+        len(text) for r in docs.history.revisions("big.txt") for _p, _l, text in r.edits + r.reverse
+    )
+    assert stored == 100 * 7
+    assert docs.read("big.txt", version=1) == "abcdefghij" * 100_000
+
+
+def test_edits_reach_the_store_before_returning(docs):
+    docs.replace("notes.md", "draft", "copy")
+    assert docs.store["notes.md"].count("copy") == 2
+
+
+def test_edits_to_a_log_store_write_only_the_changed_ranges(tmp_path):
+    store = LogDocumentStore(str(tmp_path))
+    store["big.md"] = "word " * 20_000
+    docs = DocumentManager(store)
+    segment = next(tmp_path.glob("*.seg"))
+    store.flush()
+    before = segment.stat().st_size
+
+    for i in range(20):
+        docs.apply_edits("big.md", [(i * 5, 4, "WORD")])
+    store.flush()
+    assert segment.stat().st_size - before < 2000
+    assert docs.read("big.md") == store["big.md"]
+    docs.close()
+
+
+def test_batched_edits_skip_stale_documents_and_fail_together():
+    docs = DocumentManager(MemoryDocumentStore({"a.md": "one", "b.md": "two"}))
+    docs.apply_edits("b.md", [(0, 3, "TWO")])
+
+    conflicts = docs.apply_edits_many([("a.md", [(0, 3, "ONE")], 1), ("b.md", [(0, 3, "2")], 1)])
+    assert conflicts == ["b.md"]
+    assert docs.read("a.md") == "ONE" and docs.version("a.md") == 2
+    assert docs.read("b.md") == "TWO" and docs.version("b.md") == 2
+    assert docs.undo("a.md") == 3 and docs.read("a.md") == "one"
+
+    class FullDisk(MemoryDocumentStore):
+        def apply_edits_many(self, items, durable=True):
+            raise OSError("No space left on device")
+
+    docs = DocumentManager(FullDisk({"a.md": "one", "b.md": "two"}))
+    with pytest.raises(OSError):
+        docs.apply_edits_many([("a.md", [(0, 3, "ONE")], 1), ("b.md", [(0, 3, "TWO")], 1)])
+    assert docs.read("a.md") == "one" and docs.read("b.md") == "two"
+    assert docs.version("a.md") == 1 and not docs.history.can_undo("a.md")
+
+
+def test_failed_store_write_leaves_the_document_unchanged():
+    class FullDisk(MemoryDocumentStore):
+        def apply_edits(self, doc_id, edits, size):
+            raise OSError("No space left on device")
+
+    docs = DocumentManager(FullDisk({"notes.md": "The first draft."}))
+    with pytest.raises(OSError):
+        docs.replace("notes.md", "first", "second")
+    assert docs.read("notes.md") == "The first draft."
+    assert docs.version("notes.md") == 1
+    assert not docs.history.can_undo("notes.md")
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+
+from mcp_document_summary.core.chat import Chat
+from tests.test_tools import FakeClient
+
+
+@pytest.mark.parametrize("transport", [[
+    {"tool_calls": [
+        {"name": "read_doc_contents", "arguments": {"doc_id": "a.md"}},
+        {"name": "read_doc_contents", "arguments": {"doc_id": "b.md"}},
+    ]},
+    {"content": "done"},
+]], indirect=True)
+def test_scripted_conversation_drives_tool_calls_and_records_phases(service, transport):
+    transport.latency = 0.01
+    client = FakeClient("read_doc_contents", read_only=["read_doc_contents"])
+    chat = Chat(openai_service=service, clients={"doc": client})
+
+    answer = asyncio.run(chat.run("compare a and b"))
+
+    assert answer == "done"
+    assert client.calls == [("read_doc_contents", {"doc_id": "a.md"}), ("read_doc_contents", {"doc_id": "b.md"})]
+    assert len(transport.requests) == 2
+    assert [m["role"] for m in transport.requests[1]["messages"]] == ["user", "assistant", "tool", "tool"]
+
+    phases = chat.timings.as_dict()
+    assert phases["llm"]["count"] == 2
+    assert phases["llm"]["seconds"] >= 0.02
+    assert phases["tool_execution"]["count"] == 1
+    assert "tool_routing" in phases
+
+
+@pytest.mark.parametrize("transport", [[{"content": "first"}]], indirect=True)
+def test_script_restarts_on_each_user_turn_and_sync_chat_works(service, transport):
+
+    async def two_turns():
+        chat = Chat(openai_service=service, clients={})
+        return [await chat.run("one"), await chat.run("two")]
+
+    assert asyncio.run(two_turns()) == ["first", "first"]
+    response = service.chat(messages=[{"role": "user", "content": "hi"}])
+    assert service.text_from_message(response) == "first"
+    assert len(transport.requests) == 3
+
+
+@pytest.mark.parametrize("transport", [[
+    {"tool_calls": [{"name": "edit_document", "arguments": {"doc_id": "a.md"}}]},
+    {"content": "done"},
+]], indirect=True)
+def test_turn_spans_are_recorded_and_exported(service, tmp_path, monkeypatch):
+    from mcp_document_summary.config import settings
+
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(settings, "trace_spans_path", str(path))
+    chat = Chat(openai_service=service, clients={"doc": FakeClient("edit_document")})
+
+    asyncio.run(chat.run("edit a"))
+
+    names = [span.name for span in chat.last_trace.spans]
+    assert names.count("llm") == 2
+    assert "tool_list" in names
+    assert "tool_call" in names
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [row["name"] for row in rows] == names
+    assert all(row["conversation"] == chat.conversation_id and row["turn"] == 1 for row in rows)
+
+
+@pytest.mark.parametrize("transport", [[{"content": "hi"}]], indirect=True)
+def test_sync_chat_records_an_llm_span(service):
+    from mcp_document_summary.tracing import trace_turn
+
+    with trace_turn("conversation", 1) as trace:
+        service.chat(messages=[{"role": "user", "content": "hi"}])
+    assert [(span.name, span.attributes) for span in trace.spans] == [
+        ("llm", {"model": "gpt-4o", "messages": 1, "tools": 0})
+    ]
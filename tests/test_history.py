@@ -0,0 +1,144 @@
+import asyncio
+from types import SimpleNamespace
+
+from mcp_document_summary.core.history import HistoryManager
+from mcp_document_summary.core.tokens import estimate_messages_tokens, estimate_tokens
+
+
+class FakeOpenAI:
+    def __init__(self):
+        self.calls = []
+
+    async def achat(self, messages, system=None, temperature=1.0, **kwargs):
+        self.calls.append(messages)
+        return SimpleNamespace(text="The user asked about report.md; it was edited.")
+
+    def text_from_message(self, response):
+        return response.text
+
+
+def tool_turn(i: int, output: str) -> list[dict]:
+    return [
+        {"role": "user", "content": f"question {i}"},
+        {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{"id": f"call_{i}", "type": "function", "function": {"name": "read", "arguments": "{}"}}],
+        },
+        {"role": "tool", "tool_call_id": f"call_{i}", "content": output},
+        {"role": "assistant", "content": f"answer {i}"},
+    ]
+
+
+def assert_tool_pairs_valid(messages: list[dict]) -> None:
+    pending = set()
+    for message in messages:
+        if message["role"] == "tool":
+            assert message["tool_call_id"] in pending
+            pending.discard(message["tool_call_id"])
+        else:
+            assert not pending
+            pending = {call["id"] for call in message.get("tool_calls") or []}
+    assert not pending
+
+
+def test_under_budget_is_untouched():
+    messages = tool_turn(0, "short")
+    history = HistoryManager(max_tokens=1000)
+    assert asyncio.run(history.compact(messages)) == tool_turn(0, "short")
+
+
+def test_old_tool_outputs_are_elided_first():
+    messages = tool_turn(0, "x " * 2000) + tool_turn(1, "y " * 2000) + tool_turn(2, "z")
+    history = HistoryManager(max_tokens=1500, keep_turns=2)
+    asyncio.run(history.compact(messages))
+
+    assert messages[2]["content"].startswith("[Tool output removed")
+    assert messages[6]["content"] == "y " * 2000  # inside the kept turns
+    assert estimate_messages_tokens(messages) <= 1500
+    assert_tool_pairs_valid(messages)
+
+
+def test_old_documents_are_replaced_with_references():
+    body = "lorem ipsum " * 1000
+    messages = [
+        {"role": "user", "content": f'Look at this\n<document id="report.md">\n{body}\n</document>\n'},
+        {"role": "assistant", "content": "ok"},
+        {"role": "user", "content": "and now?"},
+    ]
+    history = HistoryManager(max_tokens=200, keep_turns=1, policies=["documents"])
+    asyncio.run(history.compact(messages))
+
+    assert body not in messages[0]["content"]
+    assert '<document id="report.md" omitted="true">' in messages[0]["content"]
+    assert messages[2]["content"] == "and now?"
+
+
+def test_summarize_folds_old_turns_into_one_message():
+    service = FakeOpenAI()
+    messages = tool_turn(0, "a " * 500) + tool_turn(1, "b " * 500) + tool_turn(2, "c")
+    history = HistoryManager(max_tokens=100, keep_turns=1, policies=["summarize"], openai_service=service)
+    asyncio.run(history.compact(messages))
+
+    assert len(service.calls) == 1
+    assert messages[0]["content"].startswith("<conversation_summary>")
+    assert messages[1:] == tool_turn(2, "c")
+    assert_tool_pairs_valid(messages)
+
+
+def test_summarized_transcript_fits_its_budget():
+    service = FakeOpenAI()
+    earlier = {"role": "user", "content": "<conversation_summary>\nEarlier work on notes.md.\n</conversation_summary>"}
+    messages = [earlier]
+    for i in range(20):
+        messages += tool_turn(i, "x " * 2000)
+    history = HistoryManager(
+        max_tokens=100, keep_turns=1, policies=["summarize"], openai_service=service, summary_max_tokens=400
+    )
+    asyncio.run(history.compact(messages))
+
+    transcript = service.calls[0][0]["content"]
+    assert estimate_tokens(transcript) <= 400 + 20
+    assert transcript.startswith("user: <conversation_summary>")
+    assert "[Earlier messages omitted]" in transcript
+    assert "answer 18" in transcript
+
+
+def test_summarize_without_client_drops_old_turns():
+    messages = tool_turn(0, "a " * 500) + tool_turn(1, "b")
+    history = HistoryManager(max_tokens=100, keep_turns=1, policies=["summarize"])
+    asyncio.run(history.compact(messages))
+    assert messages == tool_turn(1, "b")
+
+
+def test_current_turn_tool_outputs_are_elided_as_last_resort():
+    # One long tool loop: only earlier results of the same turn can be shortened.
+    messages = tool_turn(0, "x " * 3000)[:3] + tool_turn(1, "latest")[1:3]
+    history = HistoryManager(max_tokens=200, keep_turns=1)
+    asyncio.run(history.compact(messages))
+
+    assert messages[2]["content"].startswith("[Tool output removed")
+    assert messages[4]["content"] == "latest"
+    assert_tool_pairs_valid(messages)
+
+
+def test_default_policies_make_no_model_calls():
+    service = FakeOpenAI()
+    messages = tool_turn(0, "a " * 2000) + tool_turn(1, "b " * 2000) + tool_turn(2, "c")
+    history = HistoryManager(max_tokens=100, keep_turns=1, openai_service=service)
+    asyncio.run(history.compact(messages))
+
+    assert service.calls == []
+    assert messages[0] == tool_turn(0, "")[0]  # old turns are elided, not folded away
+
+
+def test_system_prompt_and_tools_count_against_the_budget():
+    tools = [{"type": "function", "function": {"name": "read", "description": "Reads a document " * 100}}]
+    messages = tool_turn(0, "a " * 300) + tool_turn(1, "b")
+    history = HistoryManager(max_tokens=400, keep_turns=1)
+
+    asyncio.run(history.compact(messages))
+    assert messages == tool_turn(0, "a " * 300) + tool_turn(1, "b")
+
+    asyncio.run(history.compact(messages, system="You edit documents.", tools=tools))
+    assert messages[2]["content"].startswith("[Tool output removed")
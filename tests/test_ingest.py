@@ -0,0 +1,104 @@
+import asyncio
+import os
+import zipfile
+
+import pytest
+
+from mcp_document_summary.server.documents import DocumentManager
+from mcp_document_summary.server.ingest import Ingestor, extract_text
+from mcp_document_summary.server.storage import MemoryDocumentStore
+
+DOCX_BODY = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>
+<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>Schedule</w:t></w:r></w:p>
+<w:p><w:r><w:t xml:space="preserve">Milestones </w:t></w:r><w:r><w:t>and</w:t><w:tab/><w:t>timelines.</w:t></w:r></w:p>
+<w:p></w:p>
+<w:p><w:r><w:t>Delivery in May.</w:t></w:r></w:p>
+</w:body></w:document>"""
+
+
+def write_docx(path: str) -> None:
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", DOCX_BODY)
+
+
+def make_tree(root) -> None:
+    (root / "reports").mkdir()
+    (root / ".hidden").mkdir()
+    (root / "notes.md").write_text("# Notes\n\nFirst draft.\n", encoding="utf-8")
+    (root / "reports" / "q1.txt").write_text("Revenue grew.\n", encoding="utf-8")
+    (root / ".hidden" / "secret.txt").write_text("skip me", encoding="utf-8")
+    (root / "image.png").write_bytes(b"\x89PNG")
+    write_docx(str(root / "reports" / "schedule.docx"))
+
+
+def test_docx_paragraphs_and_headings_are_extracted(tmp_path):
+    write_docx(str(tmp_path / "a.docx"))
+    text = extract_text("a.docx", (tmp_path / "a.docx").read_bytes())
+    assert text == "# Schedule\n\nMilestones and\ttimelines.\n\nDelivery in May."
+
+
+def test_ingest_adds_supported_files_by_relative_path(tmp_path):
+    make_tree(tmp_path)
+    docs = DocumentManager(MemoryDocumentStore())
+    announced = []
+    ingestor = Ingestor(docs, workers=1, batch_files=2, on_added=announced.extend)
+
+    result = asyncio.run(ingestor.ingest(str(tmp_path), prefix="import/"))
+
+    assert sorted(result.added) == ["import/notes.md", "import/reports/q1.txt", "import/reports/schedule.docx"]
+    assert sorted(announced) == sorted(result.added)
+    assert result.files == 3 and not result.failed
+    assert docs.read("import/reports/q1.txt") == "Revenue grew.\n"
+    assert docs.read("import/reports/schedule.docx").startswith("# Schedule\n\n")
+
+
+def test_reingest_skips_unchanged_files_and_versions_changed_ones(tmp_path):
+    make_tree(tmp_path)
+    docs = DocumentManager(MemoryDocumentStore())
+    manifest = str(tmp_path / "state" / "manifest.json")
+    asyncio.run(Ingestor(docs, manifest_path=manifest, workers=1).ingest(str(tmp_path)))
+
+    # Same size and mtime: skipped without reading. Touched but identical: skipped by hash.
+    os.utime(tmp_path / "notes.md", ns=(0, 10**18))
+    (tmp_path / "reports" / "q1.txt").write_text("Revenue fell.\n", encoding="utf-8")
+    result = asyncio.run(Ingestor(docs, manifest_path=manifest, workers=1).ingest(str(tmp_path)))
+
+    assert result.added == [] and result.updated == ["reports/q1.txt"]
+    assert result.unchanged == 2
+    assert docs.version("notes.md") == 1
+    assert docs.read("reports/q1.txt") == "Revenue fell.\n"
+    assert docs.version("reports/q1.txt") == 2
+    docs.undo("reports/q1.txt")
+    assert docs.read("reports/q1.txt") == "Revenue grew.\n"
+
+
+def test_ingest_in_worker_processes_reports_failures(tmp_path):
+    make_tree(tmp_path)
+    (tmp_path / "broken.docx").write_bytes(b"not a zip file")
+    docs = DocumentManager(MemoryDocumentStore())
+
+    result = asyncio.run(Ingestor(docs, workers=2, batch_files=1).ingest(str(tmp_path)))
+
+    assert len(result.added) == 3
+    assert list(result.failed) == ["broken.docx"]
+    assert "broken.docx" not in docs
+    assert result.summary()["failed"] == 1
+
+
+def test_files_enter_the_manifest_only_after_their_documents_are_written(tmp_path):
+    class FullDisk(MemoryDocumentStore):
+        def put_many(self, items):
+            raise OSError("No space left on device")
+
+    make_tree(tmp_path)
+    docs = DocumentManager(FullDisk())
+    ingestor = Ingestor(docs, workers=1)
+    with pytest.raises(OSError):
+        asyncio.run(ingestor.ingest(str(tmp_path)))
+    assert ingestor.manifest == {}
+
+    docs = DocumentManager(MemoryDocumentStore())
+    ingestor.documents = docs
+    result = asyncio.run(ingestor.ingest(str(tmp_path)))
+    assert len(result.added) == 3
@@ -0,0 +1,149 @@
+import asyncio
+from urllib.parse import quote, urlencode
+
+import pytest
+
+from mcp_document_summary.client.mcp_client import MCPClient
+from mcp_document_summary.core.cli import UnifiedCompleter
+from mcp_document_summary.core.cli_chat import CliChat
+from mcp_document_summary.core.openai import OpenAIClient
+from mcp_document_summary.server.listing import DocumentListing
+from mcp_document_summary.server.server import mcp
+
+
+def all_pages(listing: DocumentListing, cursor=None, **kwargs) -> list[list[str]]:
+    pages = []
+    while True:
+        page = listing.page(cursor=cursor, **kwargs)
+        pages.append([entry["id"] for entry in page["documents"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_document_once_in_order(listing):
+    pages = all_pages(listing, limit=100)
+    ids = [doc_id for page in pages for doc_id in page]
+    assert [len(page) for page in pages] == [100, 100, 52]
+    assert ids == sorted(ids, key=lambda doc_id: (doc_id.lower(), doc_id))
+    assert len(set(ids)) == 252
+
+
+def test_prefix_ignores_case_and_glob_filters(listing):
+    assert all_pages(listing, prefix="REPORTS/") == [["Reports/Q1.md", "reports/q2.txt"]]
+    assert all_pages(listing, prefix="doc_24") == [[f"doc_24{i}.md" for i in range(10)]]
+    assert all_pages(listing, glob="*.txt") == [["reports/q2.txt"]]
+
+
+@pytest.mark.parametrize("listing", [{"max_scan": 50}], indirect=True)
+def test_sparse_globs_return_partial_pages_with_a_cursor(listing):
+    pages = all_pages(listing, glob="doc_*5.md", limit=100)
+    assert len(pages) == 6
+    assert [doc_id for page in pages for doc_id in page] == [f"doc_{i:03}.md" for i in range(5, 250, 10)]
+
+
+def test_entries_carry_size_version_and_modified_time(listing):
+    docs = listing.documents
+    entry = listing.page(prefix="reports/q1")["documents"][0]
+    assert entry == {"id": "Reports/Q1.md", "size": len("Résumé".encode("utf-8")), "version": 1, "modified": None}
+
+    docs.replace("Reports/Q1.md", "é", "e")
+    entry = listing.page(prefix="reports/q1")["documents"][0]
+    assert entry["size"] == 6 and entry["version"] == 2 and entry["modified"] is not None
+
+
+def test_documents_added_between_pages_are_listed_after_the_cursor(listing):
+    docs = listing.documents
+    first = listing.page(limit=10)
+    docs.put_many([("doc_000a.md", "new"), ("zzz.md", "new")])
+    rest = all_pages(listing, cursor=first["next_cursor"], limit=1000)[0]
+    assert "zzz.md" in rest and "doc_000a.md" not in rest  # sorts before the cursor
+
+
+def test_invalid_requests_are_rejected(listing):
+    with pytest.raises(ValueError):
+        listing.page(limit=0)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        listing.page(cursor="%%%")
+
+
+def test_client_pages_through_the_listing_resource(server_documents):
+    async def run():
+        server_documents.put_many([("nested/dir/notes.md", "Nested notes")])
+        async with MCPClient(server=mcp) as client:
+            chat = CliChat(doc_client=client, clients={}, openai_service=OpenAIClient(model="gpt-4o", api_key="test"))
+            page = await chat.list_docs_page(limit=3)
+            assert len(page["documents"]) == 3 and page["next_cursor"]
+            assert set(page["documents"][0]) == {"id", "size", "version", "modified"}
+
+            ids = [entry["id"] async for entry in chat.iter_docs(page_size=4)]
+            assert ids == sorted(server_documents.ids(), key=lambda doc_id: (doc_id.lower(), doc_id))
+            assert await chat.list_docs_ids(limit=5) == ids[:5]
+
+            # IDs containing "/" are read through percent-encoded URIs
+            assert await chat.get_doc_content("nested/dir/notes.md") == "Nested notes"
+            context = await chat._extract_resources("what is in @nested/dir/notes.md and @missing.md")
+            assert '<document id="nested/dir/notes.md">' in context and "missing.md" not in context
+
+    asyncio.run(run())
+
+
+def test_completer_fetches_prefixes_when_the_corpus_was_not_loaded_whole():
+    server_ids = sorted(f"doc_{i}.md" for i in range(1000))
+    requests = []
+
+    def fetch(prefix):
+        requests.append(prefix)
+        matches = [doc_id for doc_id in server_ids if doc_id.startswith(prefix)]
+        return matches[:100], len(matches) <= 100
+
+    completer = UnifiedCompleter(fetch=fetch)
+    completer.update_resources(server_ids[:10], complete=False)
+
+    assert [c.text for c in completer._resource_completions("doc_99")][:2] == ["doc_99.md", "doc_990.md"]
+    assert [c.text for c in completer._resource_completions("doc_995")] == ["doc_995.md"]
+    # doc_99 returned every match, so longer prefixes are answered locally
+    assert requests == ["doc_99"]
+
+    completer.update_resources(server_ids)
+    list(completer._resource_completions("doc_5"))
+    assert requests == ["doc_99"]
+
+
+def test_mentions_are_fetched_directly_without_listing(server_documents):
+    import itertools
+
+    variants = ["".join(letters) + ".md" for letters in itertools.product(*zip("notes", "NOTES"))]
+    server_documents.put_many([(doc_id, f"Body of {doc_id}") for doc_id in variants])
+
+    async def run():
+        async with MCPClient(server=mcp) as client:
+            chat = CliChat(doc_client=client, clients={}, openai_service=OpenAIClient(model="gpt-4o", api_key="test"))
+
+            async def list_docs_page(*args, **kwargs):
+                raise AssertionError("a mention should not list documents")
+
+            chat.list_docs_page = list_docs_page
+            assert await chat._find_doc("notes.md") == "Body of notes.md"  # sorts after the 31 other case variants
+            assert await chat._find_doc("notes.txt") is None
+            context = await chat._extract_resources("compare @NOTES.md with @notes.txt")
+            assert '<document id="NOTES.md">' in context and "notes.txt" not in context
+            reply = await chat._turn("/summarize missing.md")
+            assert "missing.md not found" in reply
+
+    asyncio.run(run())
+
+
+def test_documents_resource_returns_only_the_first_page(server_documents):
+    server_documents.put_many([(f"doc_{i:03}.md", "Body") for i in range(150)])
+
+    async def run():
+        async with MCPClient(server=mcp) as client:
+            first = await client.read_resource("docs://documents")
+            assert len(first["documents"]) == 100 and first["next_cursor"]
+            query = quote(urlencode({"cursor": first["next_cursor"], "limit": 1000}), safe="")
+            rest = await client.read_resource(f"docs://documents/page/{query}")
+            ids = [entry["id"] for entry in first["documents"] + rest["documents"]]
+            assert sorted(ids) == sorted(server_documents.ids()) and rest["next_cursor"] is None
+
+    asyncio.run(run())
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from mcp_document_summary.core.llm_cache import ResponseCache, request_key
+from mcp_document_summary.core.openai import OpenAIClient
+from tests.test_chat import make_completion
+
+
+def test_request_key_is_stable_across_dict_order():
+    a = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0}
+    b = {"temperature": 0, "messages": [{"content": "hi", "role": "user"}], "model": "m"}
+    assert request_key(a) == request_key(b)
+
+def test_lru_evicts_by_size():
+    payload_size = len(make_completion("x" * 100).model_dump_json())
+    cache = ResponseCache(max_bytes=payload_size * 2)
+    for key in ("a", "b", "c"):
+        cache.put(key, make_completion("x" * 100))
+    assert cache.get("a") is None
+    assert cache.get("c").choices[0].message.content == "x" * 100
+    assert cache.stats["evictions"] == 1
+
+def test_disk_tier_survives_restart_and_expires(tmp_path):
+    ResponseCache(directory=str(tmp_path)).put("k", make_completion("cached"))
+
+    cache = ResponseCache(directory=str(tmp_path), ttl=60)
+    assert cache.get("k").choices[0].message.content == "cached"
+    assert cache.stats["disk_hits"] == 1
+
+    expired = ResponseCache(directory=str(tmp_path), ttl=0.01)
+    time.sleep(0.02)
+    assert expired.get("k") is None
+
+def test_openai_client_uses_cache_only_for_deterministic_requests():
+    calls = []
+
+    def create(**params):
+        calls.append(params)
+        return make_completion(f"answer {len(calls)}")
+
+    service = OpenAIClient(model="gpt-4o", api_key="test", cache=ResponseCache())
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    messages = [{"role": "user", "content": "hi"}]
+
+    assert service.text_from_message(service.chat(messages, temperature=0)) == "answer 1"
+    assert service.text_from_message(service.chat(messages, temperature=0)) == "answer 1"
+    assert service.text_from_message(service.chat(messages)) == "answer 2"
+    assert len(calls) == 2
+    assert service.cache.stats["bypasses"] == 1
+
+def test_disk_tier_evicts_least_recently_used_files(tmp_path):
+    payload_size = len(json.dumps({"created": 0.0, "response": make_completion("x").model_dump_json()}))
+    cache = ResponseCache(directory=str(tmp_path), disk_max_bytes=payload_size * 2 + 50)
+    cache.put("a1", make_completion("x"))
+    cache.put("b1", make_completion("x"))
+    cache.clear()
+    assert cache.get("a1") is not None  # a1 is now more recently used than b1
+    cache.put("c1", make_completion("x"))
+
+    assert sorted(path.stem for path in tmp_path.glob("*/*.json")) == ["a1", "c1"]
+    assert cache.stats["disk_evictions"] == 1
+
+    # The order survives a restart through the files' modification times
+    reopened = ResponseCache(directory=str(tmp_path), disk_max_bytes=payload_size * 2 + 50)
+    os.utime(tmp_path / "a1" / "a1.json", (time.time() + 10, time.time() + 10))
+    reopened.put("d1", make_completion("x"))
+    assert sorted(path.stem for path in tmp_path.glob("*/*.json")) == ["a1", "d1"]
+
+def test_async_access_reads_and_writes_the_disk_tier(tmp_path):
+    async def run():
+        cache = ResponseCache(directory=str(tmp_path))
+        await cache.aput("k", make_completion("cached"))
+        cache.clear()
+        return await cache.aget("k"), await cache.aget("missing")
+
+    hit, miss = asyncio.run(run())
+    assert hit.choices[0].message.content == "cached" and miss is None
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import subprocess
+import sys
+from contextlib import AsyncExitStack
+
+from mcp_document_summary.client.mcp_client import MCPClient
+from mcp_document_summary.config import settings
+from mcp_document_summary.main import parse_args, start
+from mcp_document_summary.server.server import mcp
+from mcp_document_summary.server.storage import LogDocumentStore
+
+
+def test_in_process_server_needs_no_subprocess():
+    async def run():
+        async with MCPClient(server=mcp) as client:
+            listing = await client.read_resource("docs://documents")
+            assert "review.md" in [entry["id"] for entry in listing["documents"]]
+            result = await client.call_tool("read_documents_contents", {"doc_id": "review.md"})
+            assert "stakeholder" in result.content[0].text
+
+    asyncio.run(run())
+
+
+def test_start_connects_in_process_by_default():
+    async def run():
+        async with AsyncExitStack() as stack:
+            cli = await start(parse_args([]), stack)
+            assert cli.agent.doc_client.name.startswith("in-process")
+            assert "review.md" in cli.resources
+            assert any(prompt.name == "summarize" for prompt in cli.prompts)
+
+    asyncio.run(run())
+
+
+def test_start_explains_a_store_held_by_a_running_server(tmp_path, monkeypatch, caplog):
+    # Stands in for an SSE server that has the store open; the in-process server must import afresh
+    running = LogDocumentStore(str(tmp_path))
+    monkeypatch.setattr(settings, "document_store_path", str(tmp_path))
+    monkeypatch.delitem(sys.modules, "mcp_document_summary.server.server")
+
+    async def run():
+        async with AsyncExitStack() as stack:
+            return await start(parse_args([]), stack)
+
+    try:
+        assert asyncio.run(run()) is None
+    finally:
+        running.close()
+    assert "--url" in caplog.text
+
+
+def test_openai_sdk_is_not_imported_at_startup():
+    code = "import sys, mcp_document_summary.main; print('openai' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env={**os.environ, "OPENAI_API_KEY": "test"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,22 @@
+import pytest
+
+from mcp_document_summary.server.matcher import AhoCorasick
+
+def test_finds_all_patterns_in_one_pass():
+    matcher = AhoCorasick(["he", "she", "his", "hers"])
+    matches = sorted(matcher.iter_matches(["ushers"]))
+    assert matches == [(1, 1), (2, 0), (2, 3)]
+
+def test_leftmost_longest_non_overlapping():
+    matcher = AhoCorasick(["ab", "abc", "bcd"])
+    assert matcher.find_non_overlapping(["xabcd abcd"]) == [(1, 1), (6, 1)]
+
+def test_matches_span_chunks():
+    matcher = AhoCorasick(["safety"])
+    assert matcher.find_non_overlapping(["the saf", "e", "ty team"]) == [(4, 0)]
+
+def test_rejects_duplicate_and_empty_patterns():
+    with pytest.raises(ValueError):
+        AhoCorasick(["a", "a"])
+    with pytest.raises(ValueError):
+        AhoCorasick([""])
@@ -0,0 +1,114 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import anyio
+import pytest
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_client_server_memory_streams
+
+from mcp_document_summary.client.mcp_client import MCPClient
+
+server = FastMCP("test")
+
+
+@server.tool()
+def echo(text: str) -> str:
+    return text
+
+
+class MemoryClient(MCPClient):
+    """Connects to an in-process server, optionally failing the first few attempts."""
+
+    def __init__(self, fail_first=0, delay=0.0, server=server, **kwargs):
+        kwargs.setdefault("url", "memory://test")
+        kwargs.setdefault("backoff_seconds", 0.0)
+        super().__init__(**kwargs)
+        self.server = server._mcp_server
+        self.fail_first = fail_first
+        self.delay = delay
+        self.opened = 0
+        self.server_writers = []
+
+    @asynccontextmanager
+    async def _connect_streams(self):
+        self.opened += 1
+        await asyncio.sleep(self.delay)
+        if self.opened <= self.fail_first:
+            raise OSError("connection refused")
+
+        async with create_client_server_memory_streams() as (client_streams, server_streams):
+            self.server_writers.append(server_streams[1])
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(
+                    lambda: self.server.run(*server_streams, self.server.create_initialization_options())
+                )
+                try:
+                    yield client_streams
+                finally:
+                    tg.cancel_scope.cancel()
+
+    def _transport(self):
+        return self._connect_streams()
+
+
+def test_call_and_cleanup():
+    async def run():
+        async with MemoryClient() as client:
+            result = await client.call_tool("echo", {"text": "hi"})
+            assert result.content[0].text == "hi"
+            assert client.connect_seconds is not None
+            assert client.stats()["reconnects"] == 0
+
+    asyncio.run(run())
+
+
+def test_connect_retries_with_backoff():
+    async def run():
+        async with MemoryClient(fail_first=2, max_retries=3) as client:
+            assert client.opened == 3
+            assert [tool.name for tool in await client.list_tools()] == ["echo"]
+
+        client = MemoryClient(fail_first=5, max_retries=1)
+        with pytest.raises(ConnectionError):
+            await client.connect()
+        assert client.opened == 2
+
+    asyncio.run(run())
+
+
+def test_reconnects_after_dropped_connection():
+    async def run():
+        async with MemoryClient() as client:
+            await client.list_tools()
+            # The transport reports a broken connection through the read stream.
+            await client.server_writers[0].send(OSError("stream reset"))
+            await asyncio.sleep(0.05)
+
+            tools = await client.list_tools()
+            assert [tool.name for tool in tools] == ["echo"]
+            assert client.reconnects == 1
+            assert client.opened == 2
+
+    asyncio.run(run())
+
+
+def test_pool_connects_concurrently_and_round_robins():
+    async def run():
+        client = MemoryClient(pool_size=3, delay=0.2)
+        await client.connect()
+        try:
+            assert client.opened == 3
+            assert client.connect_seconds < 0.5
+            sessions = {id(client.session()) for _ in range(3)}
+            assert len(sessions) == 3
+            results = await asyncio.gather(*(client.call_tool("echo", {"text": str(i)}) for i in range(6)))
+            assert [r.content[0].text for r in results] == [str(i) for i in range(6)]
+        finally:
+            await client.cleanup()
+
+    asyncio.run(run())
+
+
+def test_pool_requires_url():
+    with pytest.raises(ValueError):
+        MCPClient(command="python", pool_size=2)
@@ -0,0 +1,58 @@
+import asyncio
+
+from starlette.testclient import TestClient
+
+from mcp_document_summary.server.metrics import ServerMetrics
+from mcp_document_summary.server.server import METRICS, mcp
+
+from tests.test_mcp_client import MemoryClient
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = ServerMetrics(buckets=(0.01, 0.1))
+    metrics.observe("tool", "edit_document", 0.005, bytes_in=10, bytes_out=20)
+    metrics.observe("tool", "edit_document", 0.05)
+    metrics.observe("tool", "edit_document", 1.0, error=True)
+    metrics.add_gauges(lambda: {"mcp_documents": ("Documents in the store.", 3)})
+
+    text = metrics.render()
+    assert 'mcp_request_duration_seconds_bucket{kind="tool",name="edit_document",le="0.01"} 1' in text
+    assert 'mcp_request_duration_seconds_bucket{kind="tool",name="edit_document",le="0.1"} 2' in text
+    assert 'mcp_request_duration_seconds_bucket{kind="tool",name="edit_document",le="+Inf"} 3' in text
+    assert 'mcp_request_duration_seconds_count{kind="tool",name="edit_document"} 3' in text
+    assert 'mcp_request_errors_total{kind="tool",name="edit_document"} 1' in text
+    assert 'mcp_payload_bytes_total{kind="tool",name="edit_document",direction="out"} 20' in text
+    assert "# TYPE mcp_documents gauge\nmcp_documents 3" in text
+
+
+def test_server_requests_are_recorded():
+    before_reads = METRICS.count("resource", "docs://documents/{doc_id}")
+    before_errors = METRICS._errors.get(("tool", "read_documents_contents"), 0)
+    before_unknown = METRICS.count("tool", "unknown")
+
+    async def run():
+        async with MemoryClient(server=mcp) as client:
+            await client.call_tool("read_documents_contents", {"doc_id": "review.md"})
+            await client.call_tool("read_documents_contents", {"doc_id": "missing.md"})
+            await client.read_resource("docs://documents/review.md")
+            for name in ("no_such_tool", "another_made_up_tool"):
+                try:
+                    await client.call_tool(name, {})
+                except Exception:
+                    pass
+
+    asyncio.run(run())
+    assert METRICS.count("tool", "unknown") == before_unknown + 2
+    assert not any(name == "no_such_tool" for _kind, name in METRICS._histograms)
+    assert METRICS.count("resource", "docs://documents/{doc_id}") == before_reads + 1
+    assert METRICS._errors[("tool", "read_documents_contents")] == before_errors + 1
+    assert METRICS._bytes_out[("resource", "docs://documents/{doc_id}")] > 0
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    with TestClient(mcp.sse_app()) as http:
+        response = http.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE mcp_request_duration_seconds histogram" in response.text
+    assert "mcp_documents " in response.text
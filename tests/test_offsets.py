@@ -0,0 +1,61 @@
+import random
+
+from mcp_document_summary.server.offsets import OffsetIndex, _OffsetList
+
+TEXT = "# Intro\nhello\n\n## Details\nline one\nline two\n\n# End\nbye"
+
+def apply(text, edits):
+    for pos, length, new in reversed(edits):
+        text = text[:pos] + new + text[pos + length :]
+    return text
+
+def test_structure():
+    index = OffsetIndex(TEXT)
+    assert index.count("line") == 9
+    assert index.count("paragraph") == 3
+    assert [level for _offset, level in index.headings] == [1, 2, 1]
+    start, end = index.span("section", 0)
+    assert TEXT[start:end] == "# Intro\nhello\n\n## Details\nline one\nline two\n\n"
+    start, end = index.span("line", 4, 2)
+    assert TEXT[start:end] == "line one\nline two\n"
+
+def test_incremental_update_matches_rebuild():
+    index = OffsetIndex(TEXT)
+    edits = [(7, 1, " again\n\n"), (14, 1, ""), (44, 0, "## Late\n")]
+    text = apply(TEXT, edits)
+    index.update(edits, lambda start, end: text[start:end])
+
+    rebuilt = OffsetIndex(text)
+    assert index.lines == rebuilt.lines
+    assert index.paragraphs == rebuilt.paragraphs
+    assert index.headings == rebuilt.headings
+    assert index.length == len(text)
+
+def test_byte_offsets_round_down_to_characters():
+    text = "naïve café" * 1000
+    index = OffsetIndex(text)
+    read = lambda start, end: text[start:end]
+    assert index.char_offset(3, read) == 2
+    assert index.char_offset(4, read) == 3
+    assert index.byte_length(read) == len(text.encode("utf-8"))
+    assert index.char_offset(len(text.encode("utf-8")) - 1, read) == len(text) - 1
+
+def test_random_edits_match_rebuild_across_blocks(monkeypatch):
+    monkeypatch.setattr(_OffsetList, "BLOCK", 4)
+    rng = random.Random(3)
+    text = "\n".join(rng.choice(["# A", "## B", "", "text", "more text"]) for _ in range(200))
+    index = OffsetIndex(text)
+    read = lambda start, end: text[start:end]
+
+    for _ in range(200):
+        pos = rng.randint(0, len(text))
+        length = rng.randint(0, min(30, len(text) - pos))
+        edits = [(pos, length, rng.choice(["", "x", "\n", "\n\n## C\n", "line\nline\n"]))]
+        text = apply(text, edits)
+        index.update(edits, read)
+
+        rebuilt = OffsetIndex(text)
+        assert index.lines == rebuilt.lines
+        assert index.paragraphs == rebuilt.paragraphs
+        assert index.headings == rebuilt.headings
+        assert index.length == len(text)
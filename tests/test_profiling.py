@@ -0,0 +1,82 @@
+import asyncio
+import pstats
+import threading
+import time
+
+from mcp_document_summary.core.chat import Chat
+from mcp_document_summary.profiling import Profiler, profile_requests
+from mcp_document_summary.server.server import mcp
+
+from tests.test_chat import SlowOpenAI
+from tests.test_mcp_client import MemoryClient
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+
+def test_sampler_inspects_tasks_only_on_the_loop_thread(tmp_path, monkeypatch):
+    threads = set()
+    all_tasks = asyncio.all_tasks
+
+    def recording_all_tasks(loop=None):
+        threads.add(threading.get_ident())
+        return all_tasks(loop)
+
+    monkeypatch.setattr(asyncio, "all_tasks", recording_all_tasks)
+    profiler = Profiler(mode="sampling", output_dir=str(tmp_path), interval_ms=1)
+
+    async def run():
+        with profiler.profile("sleep"):
+            await asyncio.gather(asyncio.sleep(0.05), asyncio.sleep(0.05))
+        return threading.get_ident()
+
+    assert threads == {asyncio.run(run())}
+
+def test_deterministic_profile_is_written_only_for_slow_blocks(tmp_path):
+    profiler = Profiler(mode="deterministic", output_dir=str(tmp_path), threshold_ms=50)
+
+    with profiler.profile("fast"):
+        busy(0.001)
+    with profiler.profile("slow"):
+        busy(0.1)
+
+    assert len(profiler.written) == 1
+    assert profiler.written[0].endswith(".pstats")
+    stats = pstats.Stats(profiler.written[0])
+    assert any(name == "busy" for (_file, _line, name) in stats.stats)
+
+
+def test_sampling_profile_shows_where_the_turn_awaits(tmp_path):
+    profiler = Profiler(mode="sampling", output_dir=str(tmp_path), interval_ms=2)
+    chat = Chat(openai_service=SlowOpenAI(), clients={})
+    chat.profiler = profiler
+
+    assert asyncio.run(chat.run("hello")) == "echo: hello"
+
+    assert len(profiler.written) == 1
+    with open(profiler.written[0]) as f:
+        lines = f.read().splitlines()
+    assert lines
+    assert any("achat (test_chat.py" in line for line in lines)
+
+
+def test_server_requests_are_profiled(tmp_path):
+    profiler = Profiler(mode="deterministic", output_dir=str(tmp_path), prefix="server")
+    handlers = dict(mcp._mcp_server.request_handlers)
+    profile_requests(mcp._mcp_server, profiler)
+
+    async def run():
+        async with MemoryClient(server=mcp) as client:
+            await client.call_tool("read_documents_contents", {"doc_id": "review.md"})
+
+    try:
+        asyncio.run(run())
+    finally:
+        mcp._mcp_server.request_handlers.clear()
+        mcp._mcp_server.request_handlers.update(handlers)
+
+    assert [path for path in profiler.written if "tools_call-read_documents_contents" in path]
@@ -0,0 +1,131 @@
+import asyncio
+
+from mcp_document_summary.client.resource_cache import ResourceCache
+from mcp_document_summary.core.cli_chat import CliChat
+from mcp_document_summary.core.openai import OpenAIClient
+from mcp_document_summary.server.server import mcp
+
+from tests.test_mcp_client import MemoryClient, server as echo_server
+
+
+class CountingClient(MemoryClient):
+    def __init__(self, **kwargs):
+        super().__init__(server=mcp, **kwargs)
+        self.reads = []
+
+    async def read_resource(self, uri):
+        self.reads.append(uri)
+        return await super().read_resource(uri)
+
+
+def test_unchanged_documents_are_served_from_cache():
+    async def run():
+        async with CountingClient() as client:
+            cache = ResourceCache(client)
+            first = await cache.read("docs://documents/review.md")
+            second = await cache.read("docs://documents/review.md")
+            assert first == second
+            assert client.reads == ["docs://documents/review.md"]
+            assert cache.stats["hits"] == 1
+
+    asyncio.run(run())
+
+
+def test_edit_invalidates_cached_document():
+    async def run():
+        async with CountingClient() as client:
+            cache = ResourceCache(client)
+            original = await cache.read("docs://documents/design.md")
+
+            await client.call_tool("edit_document", {"doc_id": "design.md", "old_str": "design", "new_str": "layout"})
+            await asyncio.sleep(0.05)
+
+            edited = await cache.read("docs://documents/design.md")
+            assert "layout" in edited
+            assert len(client.reads) == 2
+            assert cache.version("docs://documents/design.md") == 1
+
+            await client.call_tool("edit_document", {"doc_id": "design.md", "old_str": "layout", "new_str": "design"})
+            await asyncio.sleep(0.05)
+            assert await cache.read("docs://documents/design.md") == original
+
+    asyncio.run(run())
+
+
+def test_least_recently_read_documents_are_evicted_over_the_budget():
+    async def run():
+        async with CountingClient() as client:
+            cache = ResourceCache(client, max_bytes=160)
+            review, schedule, design = (f"docs://documents/{doc_id}" for doc_id in ("review.md", "schedule.docx", "design.md"))
+            await cache.read(review)
+            await cache.read(schedule)
+            await cache.read(review)  # now the most recently used
+            await cache.read(design)
+
+            assert review in cache and design in cache and schedule not in cache
+            assert cache.stats["evictions"] == 1 and cache._size <= 160
+            await cache.read(schedule)
+            assert client.reads.count(schedule) == 2
+
+            cache.max_bytes = 10
+            await cache.read("docs://documents/summary.txt")
+            assert "docs://documents/summary.txt" not in cache
+
+    asyncio.run(run())
+
+
+def test_update_during_read_is_not_cached():
+    async def run():
+        async with CountingClient() as client:
+            cache = ResourceCache(client)
+            uri = "docs://documents/summary.txt"
+            await cache.read(uri)
+            cache.invalidate(uri)
+
+            read_resource = client.read_resource
+
+            async def racing_read(target):
+                value = await read_resource(target)
+                cache.invalidate(target)
+                return value
+
+            client.read_resource = racing_read
+            await cache.read(uri)
+            client.read_resource = read_resource
+
+            await cache.read(uri)
+            assert client.reads.count(uri) == 3
+
+    asyncio.run(run())
+
+
+def test_servers_without_subscriptions_are_read_through():
+    async def run():
+        async with MemoryClient(server=echo_server) as client:
+            cache = ResourceCache(client)
+            calls = []
+
+            async def read_resource(uri):
+                calls.append(uri)
+                return "text"
+
+            client.read_resource = read_resource
+            assert await cache.read("memo://a") == "text"
+            assert await cache.read("memo://a") == "text"
+            assert calls == ["memo://a", "memo://a"]
+
+    asyncio.run(run())
+
+
+def test_mentions_are_fetched_once():
+    async def run():
+        async with CountingClient() as client:
+            chat = CliChat(doc_client=client, clients={}, openai_service=OpenAIClient(model="gpt-4o", api_key="test"))
+            context = await chat._extract_resources("compare @review.md and @schedule.docx")
+            assert '<document id="review.md">' in context and '<document id="schedule.docx">' in context
+            reads = len(client.reads)
+
+            await chat._extract_resources("again @review.md @schedule.docx")
+            assert len(client.reads) == reads
+
+    asyncio.run(run())
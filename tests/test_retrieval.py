@@ -0,0 +1,82 @@
+import re
+
+from mcp_document_summary.core.history import HistoryManager
+from mcp_document_summary.core.retrieval import ChunkIndex, ContextPacker
+from mcp_document_summary.core.tokens import estimate_tokens
+
+FILLER = "The committee met and discussed routine matters of little consequence. " * 4
+
+
+def make_document(topics: list[str]) -> str:
+    return "\n\n".join(f"Section {i}. {FILLER}{topic}" for i, topic in enumerate(topics))
+
+
+def test_chunks_matching_the_query_rank_first():
+    text = make_document(["Budget overview.", "Turbine vibration exceeded limits.", "Staffing plan.", "Turbine repair cost."])
+    index = ChunkIndex(text, chunk_tokens=100)
+    assert len(index) == 4
+
+    ranked = index.ranked({"turbine", "vibration"})
+    assert [i for _score, i in ranked[:2]] == [1, 3]
+    assert ranked[0][0] > ranked[1][0] > 0
+    # Without matching terms the document order is kept
+    assert [i for _score, i in index.ranked({"nothing"})] == [0, 1, 2, 3]
+
+
+def test_small_documents_are_included_whole():
+    packer = ContextPacker(max_tokens=1000)
+    context = packer.pack("what is in @a.md", [("a.md", "Short text.")])
+    assert context == '\n<document id="a.md">\nShort text.\n</document>\n'
+    assert packer.stats["index_builds"] == 0
+
+
+def test_large_documents_are_packed_into_the_budget():
+    topics = [f"Topic {i}." for i in range(60)]
+    topics[41] = "The turbine failed inspection."
+    big = make_document(topics)
+    other = make_document([f"Other {i}." for i in range(60)])
+    packer = ContextPacker(max_tokens=600, chunk_tokens=100)
+
+    context = packer.pack("why did the @big.md turbine fail", [("big.md", big), ("other.md", other)])
+
+    assert estimate_tokens(context) < 700
+    assert "The turbine failed inspection." in context
+    assert re.search(r'<document id="big.md" excerpt="\d+ of 60 parts">\n', context)
+    assert "\n[...]\n" in context
+    # Every mentioned document keeps at least its best chunk
+    assert '<document id="other.md" excerpt="' in context and "Other " in context
+
+
+
+def test_documents_packed_in_full_use_the_plain_tag():
+    big = make_document([f"Topic {i}." for i in range(60)])
+    packer = ContextPacker(max_tokens=600, chunk_tokens=100)
+
+    context = packer.pack("compare @big.md with @small.md", [("big.md", big), ("small.md", "Short text.")])
+
+    assert '<document id="big.md" excerpt="' in context
+    assert '\n<document id="small.md">\nShort text.\n</document>\n' in context
+
+def test_indexes_are_reused_until_the_text_changes():
+    text = make_document([f"Topic {i}." for i in range(30)])
+    packer = ContextPacker(max_tokens=300, chunk_tokens=100)
+    packer.pack("topic", [("a.md", text)])
+    packer.pack("topic 3", [("a.md", text)])
+    assert packer.stats == {"index_hits": 1, "index_builds": 1}
+
+    packer.pack("topic", [("a.md", text + " Edited.")])
+    assert packer.stats["index_builds"] == 2
+
+
+def test_packed_documents_can_be_elided_from_history():
+    import asyncio
+
+    packer = ContextPacker(max_tokens=300, chunk_tokens=100)
+    context = packer.pack("topic", [("a.md", make_document([f"Topic {i}." for i in range(30)]))])
+    messages = [
+        {"role": "user", "content": f"Look at this{context}"},
+        {"role": "assistant", "content": "ok"},
+        {"role": "user", "content": "and now?"},
+    ]
+    asyncio.run(HistoryManager(max_tokens=50, keep_turns=1, policies=["documents"]).compact(messages))
+    assert '<document id="a.md" omitted="true">' in messages[0]["content"]
@@ -0,0 +1,63 @@
+import time
+
+from mcp_document_summary.server.documents import DocumentManager
+from mcp_document_summary.server.search import DocumentSearch, InvertedIndex
+from mcp_document_summary.server.storage import MemoryDocumentStore
+
+def test_bm25_ranks_denser_matches_first():
+    index = InvertedIndex()
+    index.add("a.md", "load testing of the load path under load")
+    index.add("b.md", "a short note about load")
+    index.add("c.md", "nothing relevant here")
+
+    total, hits = index.search("load")
+    assert total == 2
+    assert [hit.doc_id for hit in hits] == ["a.md", "b.md"]
+    assert hits[0].matches[0] == (0, 4)
+
+def test_phrase_query_requires_consecutive_words():
+    index = InvertedIndex()
+    index.add("a.md", "peak operating conditions")
+    index.add("b.md", "operating at peak")
+
+    total, hits = index.search('"peak operating"')
+    assert total == 1
+    assert hits[0].doc_id == "a.md"
+    assert hits[0].matches == [(0, 14)]
+
+def test_changed_documents_are_reindexed_individually():
+    docs = {"a.md": "alpha beta", "b.md": "gamma"}
+    search = DocumentSearch(lambda: list(docs), docs.__getitem__)
+    assert search.search("beta")[0] == 1
+
+    docs["a.md"] = "alpha delta"
+    search.mark_changed("a.md")
+    assert search.search("beta")[0] == 0
+    assert search.search("delta")[1][0].doc_id == "a.md"
+
+    del docs["b.md"]
+    search.mark_changed("b.md")
+    assert search.search("gamma")[0] == 0
+
+
+def test_index_is_built_and_updated_on_a_background_thread():
+    store = MemoryDocumentStore({"a.md": "alpha beta", "b.md": "gamma"})
+    docs = DocumentManager(store)
+    search = DocumentSearch(docs.ids, store.__getitem__)
+    docs.add_listener(search.mark_changed)
+    search.start()
+    try:
+        assert search._built.wait(5) and len(search.index) == 2  # before any query
+
+        docs.replace("a.md", "beta", "delta")
+        for _ in range(500):
+            if "delta" in search.index._postings:
+                break
+            time.sleep(0.01)
+        assert search.index.search("delta")[0] == 1 and search.index.search("beta")[0] == 0
+
+        docs.replace("b.md", "gamma", "epsilon")
+        assert search.search("epsilon")[1][0].doc_id == "b.md"  # a query never sees stale results
+    finally:
+        search.close()
+    assert not search._worker.is_alive()
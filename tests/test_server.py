@@ -1,7 +1,16 @@
-from mcp_document_summary.server.server import list_docs, fetch_doc, read_document, edit_document
+import asyncio
+
+import pytest
+
+from mcp_document_summary.server.documents import VersionConflict
+from mcp_document_summary.server.server import (
+    list_docs, fetch_doc, read_document, edit_document, batch_edit_document, Replacement,
+    read_document_range, read_document_part, search_documents,
+    undo, revert_to_version, document_history, replace_in_documents, ingest_documents,
+)
 
 def test_list_docs():
-    docs = list_docs()
+    docs = [entry["id"] for entry in list_docs()["documents"]]
     assert len(docs) > 0
     assert "inspection.md" in docs
 
@@ -13,13 +22,112 @@ def test_read_document():
     content = read_document("inspection.md")
     assert "inspection" in content
 
-def test_edit_document():
+def test_edit_document(server_documents):
     # Test editing a document (in memory)
     original_content = read_document("inspection.md")
     edit_document("inspection.md", "safety", "security")
     new_content = read_document("inspection.md")
     assert "security" in new_content
     assert "safety" not in new_content
-    
-    # Cleanup (revert change for other tests if needed, though in-memory persistence is acceptable for unit test sequence here)
-    edit_document("inspection.md", "security", "safety")
+
+def test_batch_edit_document(server_documents):
+    result = batch_edit_document(
+        "analysis.pdf",
+        [Replacement(old_str="load", new_str="stress"), Replacement(old_str="peak", new_str="maximum")],
+    )
+    assert [r["count"] for r in result["replacements"]] == [1, 1]
+    assert result["version"] > 1
+    assert read_document("analysis.pdf") == "The analysis examines stress performance under maximum operating conditions."
+
+def test_read_document_range_pages_through_document():
+    content = read_document("schedule.docx")
+    pages = []
+    offset = 0
+    while offset is not None:
+        page = read_document_range("schedule.docx", offset, 20, "char")
+        pages.append(page["text"])
+        offset = page["next_offset"]
+    assert "".join(pages) == content
+
+def test_read_document_part():
+    part = read_document_part("design.md", "line", 0, 1)
+    assert part["text"] == read_document("design.md")
+    assert part["total"] == 1
+
+def test_search_documents():
+    result = search_documents('"peak operating"', 5)
+    assert [r["doc_id"] for r in result["results"]] == ["analysis.pdf"]
+    match = result["results"][0]["matches"][0]
+    assert read_document("analysis.pdf")[match["offset"] : match["offset"] + match["length"]] == "peak operating"
+
+def test_edit_document_compare_and_swap(server_documents):
+    start = read_document_range("maintenance.docx", 0, 5, "char")["version"]
+    result = edit_document("maintenance.docx", "records", "logs", expected_version=start)
+    assert result == {"doc_id": "maintenance.docx", "version": start + 1, "replacements": 1}
+
+    # A second writer that read the old version is rejected instead of overwriting.
+    with pytest.raises(VersionConflict):
+        edit_document("maintenance.docx", "service", "repair", expected_version=start)
+
+    old = read_document_range("maintenance.docx", 0, 100, "char", version=start)
+    assert "records" in old["text"] and old["version"] == start
+
+def test_undo_revert_and_history(server_documents):
+    original = read_document("compliance.pdf")
+    start = document_history("compliance.pdf", 5)["version"]
+
+    edit_document("compliance.pdf", "regulatory", "legal")
+    edit_document("compliance.pdf", "status", "state")
+    assert undo("compliance.pdf")["version"] == start + 3
+    assert read_document("compliance.pdf") == original.replace("regulatory", "legal")
+
+    revert_to_version("compliance.pdf", start)
+    assert read_document("compliance.pdf") == original
+
+    history = document_history("compliance.pdf", 2)
+    assert [r["kind"] for r in history["revisions"]] == ["revert", "undo"]
+    assert history["can_undo"] and history["can_redo"] is False
+
+
+def test_replace_in_documents_dry_run_then_apply(server_documents):
+    preview = asyncio.run(replace_in_documents("THE", "a", doc_glob="*.docx", regex=False, ignore_case=True, dry_run=True, max_listed=100))
+    assert preview["dry_run"] and preview["documents_matched"] >= 1
+    versions = {d["doc_id"]: d["version"] for d in preview["documents"]}
+
+    result = asyncio.run(replace_in_documents("THE", "a", doc_glob="*.docx", regex=False, ignore_case=True, dry_run=False, max_listed=100))
+    assert result["total_replacements"] == preview["total_replacements"]
+    for d in result["documents"]:
+        assert d["version"] == versions[d["doc_id"]] + 1
+        assert "the" not in read_document(d["doc_id"]).lower()
+
+def test_server_advertises_resource_subscriptions():
+    from mcp_document_summary.server.server import mcp
+
+    capabilities = mcp._mcp_server.create_initialization_options().capabilities
+    assert capabilities.resources.subscribe is True
+
+def test_document_change_notifies_only_that_documents_uris():
+    from mcp_document_summary.server.subscriptions import ResourceSubscriptions
+
+    subscriptions = ResourceSubscriptions()
+    notified = []
+    subscriptions.notify = lambda *uris: notified.extend(uris)
+    session = type("Session", (), {})()
+    for uri in ("docs://documents/a.md", "docs://documents/a.md/line/3", "docs://documents/a.mdx", "docs://documents"):
+        subscriptions.subscribe(uri, session)
+
+    subscriptions.document_changed("a.md")
+    assert sorted(notified) == ["docs://documents/a.md", "docs://documents/a.md/line/3"]
+
+def test_ingest_documents_is_disabled_without_an_ingest_root(tmp_path, monkeypatch):
+    from mcp_document_summary.config import settings
+
+    (tmp_path / "secret.md").write_text("not for clients")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "ingest_root", None)
+    with pytest.raises(ValueError, match="disabled"):
+        asyncio.run(ingest_documents(".", ""))
+
+    monkeypatch.setattr(settings, "ingest_root", str(tmp_path / "inbox"))
+    with pytest.raises(ValueError, match="outside the ingest root"):
+        asyncio.run(ingest_documents("..", ""))
@@ -0,0 +1,234 @@
+import threading
+
+import pytest
+
+from mcp_document_summary.server.storage import DocumentStore, LogDocumentStore, MemoryDocumentStore, StoreLocked, open_store
+
+def test_memory_store_seed():
+    store = open_store(seed={"a.md": "alpha"})
+    assert isinstance(store, MemoryDocumentStore)
+    assert store["a.md"] == "alpha"
+
+def test_stores_must_track_versions():
+    class Unversioned(DocumentStore):
+        __getitem__ = __setitem__ = __delitem__ = __iter__ = __len__ = None
+
+    with pytest.raises(TypeError, match="version_of"):
+        Unversioned()
+
+def test_log_store_persists_across_reopen(tmp_path):
+    store = LogDocumentStore(str(tmp_path))
+    store["a.md"] = "alpha"
+    store.put_many([("b.md", "beta"), ("c.md", "gamma ✓")])
+    store["a.md"] = "alpha v2"
+    del store["b.md"]
+    store.close()
+
+    reopened = LogDocumentStore(str(tmp_path))
+    assert sorted(reopened) == ["a.md", "c.md"]
+    assert reopened["a.md"] == "alpha v2"
+    assert reopened["c.md"] == "gamma ✓"
+    reopened.close()
+
+def test_log_store_versions_survive_reopen_and_compaction(tmp_path):
+    store = LogDocumentStore(str(tmp_path))
+    store["a.md"] = "alpha"
+    store["a.md"] = "alpha v2"
+    store.write_hint()
+    store["a.md"] = "alpha v3"
+    store["b.md"] = "beta"
+    store.close()
+
+    reopened = LogDocumentStore(str(tmp_path))
+    assert reopened.version_of("a.md") == 3
+    assert reopened.version_of("b.md") == 1
+    reopened.compact()
+    reopened["a.md"] = "alpha v4"
+    reopened.close()
+
+    compacted = LogDocumentStore(str(tmp_path))
+    assert compacted.version_of("a.md") == 4
+    assert compacted.version_of("b.md") == 1
+    compacted.close()
+
+def test_log_store_replays_tail_after_hint(tmp_path):
+    store = LogDocumentStore(str(tmp_path))
+    store["a.md"] = "alpha"
+    store.write_hint()
+    store["b.md"] = "beta"
+    # Simulate a crash: the process goes away without closing, so the hint does not cover "b.md"
+    store._file.close()
+    store._lock_file.close()
+
+    reopened = LogDocumentStore(str(tmp_path))
+    assert reopened["b.md"] == "beta"
+    reopened.close()
+
+def test_log_store_refuses_a_second_open(tmp_path):
+    store = LogDocumentStore(str(tmp_path))
+    with pytest.raises(StoreLocked):
+        LogDocumentStore(str(tmp_path))
+    store.close()
+    LogDocumentStore(str(tmp_path)).close()
+
+def test_memory_store_queues_edits_until_read():
+    store = MemoryDocumentStore({"a.md": "alpha beta"})
+    store.apply_edits("a.md", [(0, 5, "ALPHA"), (6, 4, "bêta")], 11)
+    store.apply_edits("a.md", [(10, 0, "!")], 12)
+    assert store._pending["a.md"]
+    assert store.size_of("a.md") == 12 and store.version_of("a.md") == 3
+    assert store["a.md"] == "ALPHA bêta!"
+    assert not store._pending
+
+def test_log_store_appends_only_the_edits(tmp_path):
+    store = LogDocumentStore(str(tmp_path))
+    store["a.md"] = "x" * 10_000
+    segment = next(tmp_path.glob("*.seg"))
+    before = segment.stat().st_size
+    for i in range(10):
+        store.apply_edits("a.md", [(i, 1, "é")], 10_000 + i + 1)
+    store.flush()
+    assert segment.stat().st_size - before < 1000
+
+    expected = "é" * 10 + "x" * 9_990
+    assert store["a.md"] == expected
+    assert store.size_of("a.md") == len(expected.encode("utf-8"))
+    assert store.version_of("a.md") == 11
+    store.close()
+
+    reopened = LogDocumentStore(str(tmp_path))
+    assert reopened["a.md"] == expected and reopened.version_of("a.md") == 11
+    reopened.close()
+    (tmp_path / "index.hint").unlink()
+    replayed = LogDocumentStore(str(tmp_path))
+    assert replayed["a.md"] == expected and replayed.size_of("a.md") == len(expected.encode("utf-8"))
+    replayed.close()
+
+def test_log_store_writes_edit_batches_together(tmp_path):
+    store = LogDocumentStore(str(tmp_path))
+    store.put_many([("a.md", "alpha " * 20), ("b.md", "beta " * 20)])
+    store.apply_edits_many([("a.md", [(0, 1, "A")], 120), ("b.md", [(0, 1, "B")], 100)], durable=False)
+    assert len(store._index["a.md"].edits) == len(store._index["b.md"].edits) == 1
+    assert store.version_of("a.md") == store.version_of("b.md") == 2
+    store.sync()
+    store._file.close()  # crash right after the sync
+    store._lock_file.close()
+
+    reopened = LogDocumentStore(str(tmp_path))
+    assert (reopened["a.md"], reopened["b.md"]) == ("Alpha " + "alpha " * 19, "Beta " + "beta " * 19)
+    reopened.close()
+
+def test_log_store_checkpoints_long_edit_chains(tmp_path):
+    store = LogDocumentStore(str(tmp_path))
+    store["a.md"] = "0" * 10_000
+    for i in range(store.CHECKPOINT_EDITS):
+        store.apply_edits("a.md", [(i, 1, "1")], 10_000)
+    assert len(store._index["a.md"].edits) < store.CHECKPOINT_EDITS - 1
+    assert store["a.md"] == "1" * store.CHECKPOINT_EDITS + "0" * (10_000 - store.CHECKPOINT_EDITS)
+
+    store.compact()
+    assert store._index["a.md"].edits == ()
+    assert store.version_of("a.md") == store.CHECKPOINT_EDITS + 1
+    store.close()
+
+def test_log_store_truncates_torn_record(tmp_path):
+    store = LogDocumentStore(str(tmp_path))
+    store["a.md"] = "alpha"
+    store.close()
+
+    segment = next(tmp_path.glob("*.seg"))
+    with open(segment, "ab") as f:
+        f.write(b"\x00\x01\x02")
+    (tmp_path / "index.hint").unlink()
+
+    reopened = LogDocumentStore(str(tmp_path))
+    assert reopened["a.md"] == "alpha"
+    reopened["b.md"] = "beta"
+    reopened.close()
+    assert LogDocumentStore(str(tmp_path))["b.md"] == "beta"
+
+def test_log_store_rotation_and_compaction(tmp_path):
+    store = LogDocumentStore(str(tmp_path), segment_size=256)
+    for i in range(20):
+        store["doc.md"] = f"revision {i} " * 5
+    assert len(list(tmp_path.glob("*.seg"))) > 1
+
+    store.compact()
+    assert store["doc.md"] == "revision 19 " * 5
+    assert len(list(tmp_path.glob("*.seg"))) <= 2
+    store.close()
+
+    assert LogDocumentStore(str(tmp_path))["doc.md"] == "revision 19 " * 5
+
+def test_log_store_reclaims_superseded_records_on_its_own(tmp_path):
+    def disk_usage():
+        return sum(segment.stat().st_size for segment in tmp_path.glob("*.seg"))
+
+    store = LogDocumentStore(str(tmp_path), segment_size=4096, compact_ratio=None)
+    for i in range(200):
+        store["doc.md"] = f"revision {i:03} " * 20
+    store.close()
+    assert disk_usage() > 50_000
+
+    # Over the ratio when opened: compacted in the background
+    store = LogDocumentStore(str(tmp_path), segment_size=4096)
+    store.close()
+    assert disk_usage() < 4096
+
+    # And again once enough writes have been superseded
+    store = LogDocumentStore(str(tmp_path), segment_size=4096)
+    for i in range(200, 400):
+        store["doc.md"] = f"revision {i:03} " * 20
+    store.close()
+    assert disk_usage() < 3 * 4096
+
+    reopened = LogDocumentStore(str(tmp_path))
+    assert reopened["doc.md"] == "revision 399 " * 20
+    assert reopened.version_of("doc.md") == 400
+    reopened.close()
+
+def test_log_store_truncates_at_corrupted_record(tmp_path):
+    store = LogDocumentStore(str(tmp_path))
+    store["a.md"] = "alpha"
+    store["b.md"] = "beta"
+    store["c.md"] = "gamma"
+    store.close()
+
+    # Flip a byte of b.md's body; its length is intact
+    segment = next(tmp_path.glob("*.seg"))
+    data = bytearray(segment.read_bytes())
+    data[data.index(b"beta")] ^= 0xFF
+    segment.write_bytes(bytes(data))
+
+    reopened = LogDocumentStore(str(tmp_path))
+    with pytest.raises(OSError, match="Corrupted record"):
+        reopened["b.md"]  # still indexed by the hint, but the read checks the CRC
+    reopened.close()
+
+    (tmp_path / "index.hint").unlink()
+    replayed = LogDocumentStore(str(tmp_path))
+    assert sorted(replayed) == ["a.md"]
+    replayed.close()
+
+def test_log_store_compacts_while_other_threads_write(tmp_path):
+    store = LogDocumentStore(str(tmp_path), segment_size=512)
+    for i in range(50):
+        store[f"doc{i}.md"] = f"body {i} " * 10
+
+    def write():
+        for i in range(200):
+            store[f"doc{i % 50}.md"] = f"edit {i} " * 10
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    for _ in range(5):
+        store.compact()
+    writer.join(timeout=10)
+    assert not writer.is_alive()
+
+    expected = {f"doc{i % 50}.md": f"edit {i} " * 10 for i in range(200)}
+    assert {doc_id: store[doc_id] for doc_id in store} == expected
+    store.close()
+    reopened = LogDocumentStore(str(tmp_path))
+    assert {doc_id: reopened[doc_id] for doc_id in reopened} == expected
+    reopened.close()
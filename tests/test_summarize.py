@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+
+from mcp_document_summary.core.summarize import SummaryPipeline, split_into_chunks
+from mcp_document_summary.core.tokens import estimate_tokens
+
+
+class FakeOpenAI:
+    """Echoes a short summary and records how many calls overlap."""
+
+    def __init__(self):
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def achat(self, messages, system=None, temperature=1.0, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return SimpleNamespace(text=f"summary {self.calls}")
+
+    def text_from_message(self, response):
+        return response.text
+
+
+def test_split_into_chunks_respects_budget():
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 50 for i in range(40))
+    chunks = split_into_chunks(text, 200)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+    assert "".join(chunks) == text
+
+def test_pipeline_maps_concurrently_and_reduces_to_one_summary():
+    service = FakeOpenAI()
+    pipeline = SummaryPipeline(service, chunk_tokens=100, fan_out=3, reduce_group=4)
+    text = "\n\n".join("word " * 70 for _ in range(16))
+
+    summary = asyncio.run(pipeline.summarize(text, doc_id="long.md"))
+
+    assert summary.startswith("summary")
+    # 16 map calls, then 4 + 1 reduce calls
+    assert service.calls == 21
+    assert service.max_active == 3
@@ -0,0 +1,32 @@
+from mcp_document_summary.server.text_buffer import PieceTable
+
+def test_range_edits():
+    buffer = PieceTable("The quick brown fox")
+    buffer.replace_range(4, 5, "slow")
+    buffer.insert(0, ">> ")
+    buffer.delete(len(buffer) - 4, 4)
+    assert buffer.text() == ">> The slow brown"
+    assert buffer.slice(3, 11) == "The slow"
+
+def test_replace_all_matches_str_replace():
+    text = "aaa ab aab"
+    buffer = PieceTable(text)
+    buffer.replace_range(1, 0, "")
+    buffer.replace_range(4, 2, "ab")
+    # Force the piece-walking search path across several pieces
+    buffer._text = None
+    assert buffer.replace_all("aa", "b") == [0, 7]
+    assert buffer.text() == text.replace("aa", "b")
+
+def test_match_across_piece_boundary():
+    buffer = PieceTable("safe")
+    buffer.insert(4, "ty team")
+    buffer._text = None
+    assert list(buffer.find_all("safety")) == [0]
+
+def test_snapshot_is_unaffected_by_later_edits():
+    buffer = PieceTable("one two three")
+    snapshot = buffer.snapshot()
+    buffer.replace_all("two", "2")
+    assert snapshot.text() == "one two three"
+    assert buffer.text() == "one 2 three"
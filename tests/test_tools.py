@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+import time
+
+from mcp.types import CallToolResult, TextContent, Tool, ToolAnnotations, ToolListChangedNotification
+from openai.types.chat import ChatCompletion
+
+from mcp_document_summary.core.tools import ToolCatalog, ToolManager
+
+
+class FakeClient:
+    def __init__(self, *tool_names, read_only=(), delay=0.0):
+        self.tool_names = list(tool_names)
+        self.read_only = set(read_only)
+        self.delay = delay
+        self.list_calls = 0
+        self.calls = []
+        self.events = []
+        self.handlers = []
+
+    def add_notification_handler(self, handler):
+        self.handlers.append(handler)
+
+    async def list_tools(self):
+        self.list_calls += 1
+        return [
+            Tool(
+                name=name,
+                description=name,
+                inputSchema={"type": "object"},
+                annotations=ToolAnnotations(readOnlyHint=name in self.read_only),
+            )
+            for name in self.tool_names
+        ]
+
+    async def call_tool(self, tool_name, tool_input):
+        self.calls.append((tool_name, tool_input))
+        self.events.append(("start", tool_name, tool_input.get("doc_id")))
+        await asyncio.sleep(self.delay)
+        self.events.append(("end", tool_name, tool_input.get("doc_id")))
+        return CallToolResult(content=[TextContent(type="text", text=f"{tool_name} ok")])
+
+
+def tool_call_completion(*calls) -> ChatCompletion:
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "tool_calls",
+            "message": {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+                    for i, (name, args) in enumerate(calls)
+                ],
+            },
+        }],
+    })
+
+
+def test_catalog_lists_once_and_routes_by_name():
+    docs, other = FakeClient("read", "edit"), FakeClient("search", "read")
+    catalog = ToolCatalog({"docs": docs, "other": other})
+
+    async def run():
+        for _ in range(3):
+            await ToolManager.get_all_tools(catalog)
+        return await ToolManager.execute_tool_requests(
+            catalog, tool_call_completion(("search", {}), ("read", {"doc_id": "a"}))
+        )
+
+    results = asyncio.run(run())
+    assert [r["content"] for r in results] == ["search ok", "read ok"]
+    assert (docs.list_calls, other.list_calls) == (1, 1)
+    assert docs.calls == [("read", {"doc_id": "a"})]
+    assert catalog.collisions == {"read": ["docs", "other"]}
+
+def test_catalog_refreshes_after_list_changed_notification():
+    client = FakeClient("read")
+    catalog = ToolCatalog({"docs": client})
+
+    async def run():
+        await catalog.tools()
+        client.tool_names.append("search")
+        assert await catalog.route("search") is None
+        for handler in client.handlers:
+            handler(ToolListChangedNotification(method="notifications/tools/list_changed"))
+        return await catalog.route("search")
+
+    assert asyncio.run(run()) is client
+    assert client.list_calls == 2
+
+def test_parallel_calls_overlap_across_documents():
+    client = FakeClient("read", read_only=["read"], delay=0.1)
+    catalog = ToolCatalog({"docs": client})
+    completion = tool_call_completion(*[("read", {"doc_id": f"d{i}"}) for i in range(10)])
+
+    start = time.perf_counter()
+    results = asyncio.run(ToolManager.execute_tool_requests(catalog, completion))
+    elapsed = time.perf_counter() - start
+
+    assert [r["tool_call_id"] for r in results] == [f"call_{i}" for i in range(10)]
+    assert elapsed < 0.5
+
+def test_calls_on_the_same_document_are_ordered_around_writes():
+    client = FakeClient("read", "edit", read_only=["read"], delay=0.02)
+    catalog = ToolCatalog({"docs": client})
+    completion = tool_call_completion(
+        ("read", {"doc_id": "a"}),
+        ("edit", {"doc_id": "a"}),
+        ("read", {"doc_id": "a"}),
+        ("read", {"doc_id": "b"}),
+    )
+
+    asyncio.run(ToolManager.execute_tool_requests(catalog, completion))
+    events = client.events
+
+    # The edit starts only after the first read of "a" ends, and the second read waits for the edit.
+    assert events.index(("end", "read", "a")) < events.index(("start", "edit", "a"))
+    assert events.index(("end", "edit", "a")) < len(events) - 1 - events[::-1].index(("start", "read", "a"))
+    # The read of "b" does not wait for anything.
+    assert events.index(("start", "read", "b")) < events.index(("end", "read", "a"))